@@ -4,6 +4,7 @@ from tracardi.domain.event_metadata import EventMetadata, EventTime
 from tracardi.process_engine.action.v1.increase_views_action import IncreaseViewsAction
 from tracardi.domain.profile import Profile
 from tracardi.service.plugin.service.plugin_runner import run_plugin
+from tracardi.service.tracker import get_profile_delta
 
 
 def test_plugin_increase_views():
@@ -23,3 +24,21 @@ def test_plugin_increase_views():
 
 
 
+
+
+def test_plugin_increase_views_triggers_destinations():
+    event = Event(
+        id='1',
+        type='text',
+        metadata=EventMetadata(time=EventTime()),
+        session=EventSession(id='1'),
+        source=Entity(id='1')
+    )
+    profile = Profile(id="1")
+    profile.reset_changes()
+
+    result = run_plugin(IncreaseViewsAction, {}, {}, profile=profile, event=event)
+
+    profile_delta = get_profile_delta(profile, result.profile)
+    assert profile_delta
+    assert profile_delta.to_dict() == {"stats.views": {"old": 0, "new": 1}}
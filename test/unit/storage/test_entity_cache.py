@@ -0,0 +1,110 @@
+import asyncio
+
+from tracardi.domain.profile import Profile
+from tracardi.domain.storage_record import RecordMetadata
+from tracardi.service.storage.entity_cache import EntityCache
+
+
+class RedisMock:
+
+    class Client:
+
+        def __init__(self, keys, expires):
+            self.keys = keys
+            self.expires = expires
+            self.calls = 0
+
+        async def get(self, key):
+            self.calls += 1
+            value = self.keys.get(key)
+            return value.encode() if value is not None else None
+
+        async def set(self, key, value, ex=None):
+            self.keys[key] = value
+            self.expires[key] = ex
+
+        async def delete(self, key):
+            self.keys.pop(key, None)
+
+    class Pipeline:
+
+        def __init__(self, client):
+            self.client = client
+            self.commands = []
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        def __getattr__(self, item):
+            async def queue(*args, **kwargs):
+                self.commands.append((getattr(self.client, item), args, kwargs))
+            return queue
+
+        async def execute(self):
+            return [await command(*args, **kwargs) for command, args, kwargs in self.commands]
+
+    def __init__(self):
+        self.keys = {}
+        self.expires = {}
+        self.client = self.Client(self.keys, self.expires)
+
+    def pipeline(self, transaction=True):
+        return self.Pipeline(self.client)
+
+
+def test_entity_cache_returns_cached_entity_with_index():
+    redis = RedisMock()
+    cache = EntityCache("profile", Profile, local_size=10, ttl=60, redis=redis)
+
+    async def main():
+        profile = Profile(id="1")
+        profile.set_meta_data(RecordMetadata(id="1", index="profile-index-1"))
+        await cache.set(profile)
+        return await cache.get("1"), await cache.get("2")
+
+    profile, missing = asyncio.run(main())
+    assert profile.id == "1"
+    assert profile.get_meta_data().index == "profile-index-1"
+    assert missing is None
+
+
+def test_entity_cache_invalidates_local_copy_on_other_worker_write():
+    redis = RedisMock()
+    worker_1 = EntityCache("profile", Profile, local_size=10, ttl=60, redis=redis)
+    worker_2 = EntityCache("profile", Profile, local_size=10, ttl=60, redis=redis)
+
+    async def main():
+        await worker_1.set(Profile(id="1", segments=["a"]))
+        assert (await worker_2.get("1")).segments == ["a"]
+
+        await worker_1.set(Profile(id="1", segments=["b"]))
+        assert (await worker_2.get("1")).segments == ["b"]
+
+        await worker_1.delete("1")
+        assert await worker_2.get("1") is None
+
+    asyncio.run(main())
+
+
+def test_entity_cache_local_hit_reads_only_version():
+    redis = RedisMock()
+    cache = EntityCache("session", Profile, local_size=10, ttl=60, redis=redis)
+
+    async def main():
+        await cache.set(Profile(id="1"))
+        redis.client.calls = 0
+        await cache.get("1")
+
+    asyncio.run(main())
+    assert redis.client.calls == 1
+
+
+def test_entity_cache_keys_expire():
+    redis = RedisMock()
+    cache = EntityCache("profile", Profile, local_size=10, ttl=60, redis=redis)
+
+    asyncio.run(cache.set(Profile(id="1")))
+    assert redis.expires == {"profile-cache:1": 60, "profile-cache-version:1": 60}
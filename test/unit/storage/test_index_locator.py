@@ -0,0 +1,108 @@
+import asyncio
+
+import elasticsearch
+import pytest
+
+from tracardi.exceptions.exception import DuplicatedRecordException
+from tracardi.service.storage.elastic_storage import ElasticStorage
+from tracardi.service.storage.index_locator import index_locator
+
+
+class ElasticClientMock:
+
+    def __init__(self, documents):
+        self.documents = documents  # index -> id -> document
+        self.calls = []
+
+    async def get(self, index, id):
+        self.calls.append(("get", index))
+        if id not in self.documents.get(index, {}):
+            raise elasticsearch.exceptions.NotFoundError(404, "not_found")
+        return {"_id": id, "_index": index, "_source": self.documents[index][id]}
+
+    async def mget(self, docs):
+        self.calls.append(("mget", [doc['_index'] for doc in docs]))
+        result = []
+        for doc in docs:
+            source = self.documents.get(doc['_index'], {}).get(doc['_id'])
+            if source is None:
+                result.append({"_id": doc['_id'], "_index": doc['_index'], "found": False})
+            else:
+                result.append({"_id": doc['_id'], "_index": doc['_index'], "found": True, "_source": source})
+        return {"docs": result}
+
+    async def search(self, index, query):
+        self.calls.append(("search", index))
+        if 'ids' in query['query']:
+            ids = query['query']['ids']['values']
+        else:
+            ids = [query['query']['term']['_id']]
+        hits = [{"_id": id, "_index": _index, "_source": documents[id]}
+                for id in ids for _index, documents in self.documents.items() if id in documents]
+        return {"hits": {"total": {"value": len(hits)}, "hits": hits}}
+
+
+def _storage(documents):
+    storage = ElasticStorage("session")
+    storage.write_behind = False
+    storage.storage = ElasticClientMock(documents)
+    return storage
+
+
+def test_load_uses_get_on_located_index():
+    index_locator.clear()
+    storage = _storage({"session-2022-1": {"1": {"id": "1"}}})
+
+    async def main():
+        first = await storage.load("1")
+        second = await storage.load("1")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.get_meta_data().index == "session-2022-1"
+    assert second.get_meta_data().index == "session-2022-1"
+    assert storage.storage.calls == [("search", storage.index.get_index_alias()), ("get", "session-2022-1")]
+
+
+def test_load_falls_back_to_search_on_stale_location():
+    index_locator.clear()
+    storage = _storage({"session-2022-2": {"1": {"id": "1"}}})
+    alias = storage.index.get_index_alias()
+    index_locator.remember(alias, "1", "session-2022-1")
+
+    record = asyncio.run(storage.load("1"))
+    assert record.get_meta_data().index == "session-2022-2"
+    assert storage.storage.calls == [("get", "session-2022-1"), ("search", alias)]
+    assert index_locator.locate(alias, "1") == "session-2022-2"
+
+
+def test_load_many_uses_mget_for_known_indices():
+    index_locator.clear()
+    storage = _storage({
+        "session-2022-1": {"1": {"id": "1"}},
+        "session-2022-2": {"2": {"id": "2"}, "3": {"id": "3"}}
+    })
+    alias = storage.index.get_index_alias()
+    index_locator.remember(alias, "2", "session-2022-2")
+
+    records = asyncio.run(storage.load_many(["1", "2", "3", "4"], indices={"1": "session-2022-1"}))
+    assert set(records.keys()) == {"1", "2", "3"}
+    assert records["3"].get_meta_data().index == "session-2022-2"
+    assert storage.storage.calls == [("mget", ["session-2022-1", "session-2022-2"]), ("search", alias)]
+
+    storage.storage.calls = []
+    asyncio.run(storage.load_many(["1", "2", "3"]))
+    assert storage.storage.calls == [("mget", ["session-2022-1", "session-2022-2", "session-2022-2"])]
+
+
+def test_load_with_check_duplicates_searches_even_if_located():
+    index_locator.clear()
+    storage = _storage({"session-2022-1": {"1": {"id": "1"}}, "session-2022-2": {"1": {"id": "1"}}})
+    alias = storage.index.get_index_alias()
+    index_locator.remember(alias, "1", "session-2022-1")
+
+    # Located GET sees only one record.
+    assert asyncio.run(storage.load("1")).get_meta_data().index == "session-2022-1"
+
+    with pytest.raises(DuplicatedRecordException):
+        asyncio.run(storage.load("1", check_duplicates=True))
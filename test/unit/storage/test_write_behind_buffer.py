@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+from elasticsearch.helpers import BulkIndexError
+from elasticsearch.serializer import JSONSerializer
+
+from tracardi.service.storage.write_behind_buffer import WriteBehindBuffer
+
+
+class ElasticClientMock:
+
+    class Transport:
+        serializer = JSONSerializer()
+
+    def __init__(self, failing_ids=None):
+        self.transport = self.Transport()
+        self.failing_ids = failing_ids or set()
+        self.requests = []
+
+    async def bulk(self, body, *args, **kwargs):
+        lines = [json.loads(line) for line in body.strip().split("\n")]
+        actions = lines[0::2]
+        self.requests.append(actions)
+        items = []
+        for action in actions:
+            _id = action['index']['_id']
+            if _id in self.failing_ids:
+                items.append({"index": {"_id": _id, "status": 400, "error": {"type": "mapper_parsing_exception"}}})
+            else:
+                items.append({"index": {"_id": _id, "status": 201}})
+        return {"errors": bool(self.failing_ids), "items": items}
+
+
+def _action(index, id):
+    return {"_index": index, "_id": id, "_source": {"id": id}}
+
+
+def test_write_behind_buffer_coalesces_concurrent_inserts():
+    client = ElasticClientMock()
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=0.01)
+
+    async def main():
+        return await asyncio.gather(
+            buffer.insert("session", [_action("session-1", "1")]),
+            buffer.insert("event", [_action("event-1", "2"), _action("event-1", "3")]),
+            buffer.insert("profile", [_action("profile-1", "4")]),
+        )
+
+    results = asyncio.run(main())
+
+    assert len(client.requests) == 1
+    assert [result.ids for result in results] == [["1"], ["2", "3"], ["4"]]
+    assert [result.saved for result in results] == [1, 2, 1]
+
+
+def test_write_behind_buffer_flushes_when_full():
+    client = ElasticClientMock()
+    buffer = WriteBehindBuffer(client, batch_size=2, flush_interval=10)
+
+    async def main():
+        return await asyncio.gather(
+            buffer.insert("event", [_action("event-1", "1")]),
+            buffer.insert("event", [_action("event-1", "2")]),
+        )
+
+    asyncio.run(asyncio.wait_for(main(), timeout=1))
+    assert len(client.requests) == 1
+
+
+def test_write_behind_buffer_reads_not_flushed_documents():
+    client = ElasticClientMock()
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=10, overlay_ttl=10)
+
+    async def main():
+        task = asyncio.create_task(buffer.insert("session", [_action("session-1", "1")]))
+        await asyncio.sleep(0)
+        assert len(client.requests) == 0
+        assert buffer.get("session", "1") == ("session-1", {"id": "1"})
+        assert buffer.get("session", "2") is None
+
+        await buffer.close()
+        await task
+        assert len(client.requests) == 1
+
+        # Still visible after flush until elastic refreshes the index.
+        assert buffer.get("session", "1") == ("session-1", {"id": "1"})
+
+    asyncio.run(main())
+
+
+def test_write_behind_buffer_raises_errors_only_for_failed_inserts():
+    client = ElasticClientMock(failing_ids={"2"})
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=0.01)
+
+    async def main():
+        return await asyncio.gather(
+            buffer.insert("event", [_action("event-1", "1")]),
+            buffer.insert("event", [_action("event-1", "2")]),
+            return_exceptions=True
+        )
+
+    ok, failed = asyncio.run(main())
+    assert ok.ids == ["1"]
+    assert isinstance(failed, BulkIndexError)
+    assert buffer.get("event", "2") is None
+
+
+def test_write_behind_buffer_evicts_document_before_direct_change():
+    client = ElasticClientMock()
+    buffer = WriteBehindBuffer(client, batch_size=100, flush_interval=10, overlay_ttl=10)
+
+    async def main():
+        task = asyncio.create_task(buffer.insert("session", [_action("session-1", "1")]))
+        await asyncio.sleep(0)
+
+        await buffer.evict("session", "1")
+        await task
+
+        # Buffered document is flushed before the change and is not read from overlay anymore.
+        assert len(client.requests) == 1
+        assert buffer.get("session", "1") is None
+
+    asyncio.run(main())
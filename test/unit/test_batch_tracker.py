@@ -0,0 +1,178 @@
+import asyncio
+
+from tracardi.domain.entity import Entity
+from tracardi.domain.event_source import EventSource
+from tracardi.domain.payload.tracker_payload import TrackerPayload
+from tracardi.domain.profile import Profile
+from tracardi.domain.session import Session, SessionMetadata
+from tracardi.service.batch_tracker import BatchTracker
+from tracardi.service.console_log import ConsoleLog
+
+
+class BatchTrackerMock(BatchTracker):
+
+    def __init__(self, concurrency, sessions, profiles):
+        super().__init__(concurrency)
+        self.sessions = sessions
+        self.profiles = profiles
+        self.loads = []
+        self.tracks = []
+        self.running = 0
+        self.max_running = 0
+        self.saved = None
+
+    async def _load_sessions(self, ids):
+        self.loads.append(("sessions", ids))
+        return {id: self.sessions[id] for id in ids if id in self.sessions}
+
+    async def _load_profiles(self, ids):
+        self.loads.append(("profiles", ids))
+        return {id: self.profiles[id] for id in ids if id in self.profiles}
+
+    async def _load_profile(self, id):
+        self.loads.append(("profile", id))
+        return None
+
+    async def _process(self, tracker_payload, source, profile_less, profile, session, ip, persist):
+        if tracker_payload.properties.get('fail'):
+            raise ValueError("Track failed")
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+        profile.traits.private['tracks'] = profile.traits.private.get('tracks', 0) + 1
+        profile.operation.update = True
+        self.tracks.append((tracker_payload.properties['n'], profile.id, session.id, session.operation.new))
+        await persist(ConsoleLog(), session, [], tracker_payload, profile)
+        return {"profile": profile.id}
+
+    async def _save(self, persistence):
+        self.saved = persistence
+
+
+def _session(id, profile_id):
+    return Session(id=id, profile=Entity(id=profile_id), metadata=SessionMetadata())
+
+
+def _payload(n, session_id, profile_id=None, source_id="source", **properties):
+    return TrackerPayload(
+        source=Entity(id=source_id),
+        session=Entity(id=session_id),
+        profile=Entity(id=profile_id) if profile_id else None,
+        properties={"n": n, **properties}
+    )
+
+
+def _track(tracker, payloads):
+    source = EventSource(id="source", type="rest")
+    return asyncio.run(tracker.track(payloads, ip="0.0.0.0", profile_less=False, allowed_bridges=["rest"],
+                                     internal_source=source))
+
+
+def test_batch_tracker_groups_payloads_by_profile():
+    tracker = BatchTrackerMock(
+        concurrency=10,
+        sessions={"s1": _session("s1", "p1"), "s2": _session("s2", "p1")},
+        profiles={"p1": Profile(id="p1"), "p2": Profile(id="p2")}
+    )
+
+    results = _track(tracker, [
+        _payload(0, "s1"),
+        _payload(1, "s3", profile_id="p2"),
+        _payload(2, "s2"),
+        _payload(3, "s1", source_id="other"),
+        _payload(4, "s3", profile_id="p2", fail=True),
+        _payload(5, "s3", profile_id="p2"),
+    ])
+
+    # One multi get of sessions and one of profiles.
+    assert tracker.loads == [("sessions", ["s1", "s3", "s2"]), ("profiles", ["p1", "p2"])]
+
+    # Order is preserved within profile. Later tracks see changes of the previous ones.
+    assert [track for track in tracker.tracks if track[1] == "p1"] == [(0, "p1", "s1", False), (2, "p1", "s2", False)]
+    assert [track for track in tracker.tracks if track[1] == "p2"] == [(1, "p2", "s3", True), (5, "p2", "s3", False)]
+    assert tracker.profiles["p1"].traits.private['tracks'] == 2
+
+    assert [result.result for result in results] == [{"profile": "p1"}, {"profile": "p2"}, {"profile": "p1"}, None,
+                                                     None, {"profile": "p2"}]
+    assert results[3].error == "Invalid event source `other`"
+    assert results[4].error == "Track failed"
+    assert all(result.time > 0 for result in results)
+
+    # Everything is saved once.
+    assert set(tracker.saved.profiles) == {"p1", "p2"}
+    assert set(tracker.saved.sessions) == {"s1", "s2", "s3"}
+    assert tracker.saved.new_sessions == {"s3"}
+    assert tracker.saved.sessions["s3"].profile.id == "p2"
+
+
+def test_batch_tracker_bounds_concurrency_of_groups():
+    profiles = {f"p{n}": Profile(id=f"p{n}") for n in range(6)}
+    sessions = {f"s{n}": _session(f"s{n}", f"p{n}") for n in range(6)}
+    tracker = BatchTrackerMock(concurrency=2, sessions=sessions, profiles=profiles)
+
+    results = _track(tracker, [_payload(n, f"s{n}") for n in range(6)])
+
+    assert all(result.error is None for result in results)
+    assert tracker.max_running == 2
+
+
+def test_batch_tracker_passes_ip_to_track_process(monkeypatch):
+    calls = []
+
+    async def invoke_track_process(tracker_payload, source, profile_less, profile, session, ip, persist=None):
+        calls.append((tracker_payload.properties['n'], ip))
+        await persist(ConsoleLog(), session, [], tracker_payload, profile)
+        return {}
+
+    monkeypatch.setattr("tracardi.service.batch_tracker.invoke_track_process", invoke_track_process)
+
+    class Tracker(BatchTrackerMock):
+        _process = BatchTracker._process
+
+    tracker = Tracker(concurrency=1, sessions={"s1": _session("s1", "p1")}, profiles={"p1": Profile(id="p1")})
+    source = EventSource(id="source", type="rest")
+    results = asyncio.run(tracker.track([_payload(0, "s1"), _payload(1, "s1")], ip=["1.1.1.1", "2.2.2.2"],
+                                        profile_less=False, allowed_bridges=["rest"], internal_source=source))
+
+    assert all(result.error is None for result in results)
+    assert calls == [(0, "1.1.1.1"), (1, "2.2.2.2")]
+
+
+def test_batch_tracker_locks_profiles_until_batch_is_saved(monkeypatch):
+    from tracardi.config import tracardi
+
+    log = []
+
+    class Synchronizer:
+
+        def __init__(self, profile, wait, max_repeats):
+            self.profile = profile
+
+        async def __aenter__(self):
+            log.append(("lock", self.profile.id))
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            log.append(("unlock", self.profile.id))
+
+    class Tracker(BatchTrackerMock):
+
+        async def _load_profiles(self, ids):
+            log.append(("load", ids))
+            return await super()._load_profiles(ids)
+
+        async def _save(self, persistence):
+            log.append(("save", sorted(persistence.profiles)))
+
+    monkeypatch.setattr("tracardi.service.batch_tracker.ProfileTracksSynchronizer", Synchronizer)
+    monkeypatch.setattr(tracardi, "sync_profile_tracks", True)
+
+    tracker = Tracker(concurrency=10, sessions={"s1": _session("s1", "p2")},
+                      profiles={"p1": Profile(id="p1"), "p2": Profile(id="p2")})
+    results = _track(tracker, [_payload(0, "s1"), _payload(1, "s2", profile_id="p1"), _payload(2, "s3")])
+
+    assert all(result.error is None for result in results)
+    assert log[:3] == [("lock", "p1"), ("lock", "p2"), ("load", ["p2", "p1"])]
+    assert log[3][0] == "save"
+    assert sorted(log[4:]) == [("unlock", "p1"), ("unlock", "p2")]
@@ -0,0 +1,75 @@
+from tracardi.domain.flow import Flow
+from tracardi.process_engine.action.v1.end_action import EndAction
+from tracardi.process_engine.action.v1.flow.start.start_action import StartAction
+from tracardi.process_engine.action.v1.increase_views_action import IncreaseViewsAction
+from tracardi.service.lru_cache import LRUCache
+from tracardi.service.wf.service.builders import action
+from tracardi.service.wf.domain.flow_history import FlowHistory
+from tracardi.service.wf.domain.work_flow import WorkFlow
+from tracardi.service.wf.service.compiled_flow_cache import compiled_flow_cache
+
+
+def _build_flow(revision=None):
+    start = action(StartAction)
+    increase_views = action(IncreaseViewsAction)
+    end = action(EndAction)
+
+    flow = Flow.build("Cached flow", id="1")
+    flow += start('payload') >> increase_views('payload')
+    flow += increase_views('payload') >> end('payload')
+    flow.set_revision(revision)
+    return flow
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1
+    cache['c'] = 3
+
+    assert 'b' not in cache
+    assert 'a' in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+def test_compiled_flow_cache_returns_fresh_graph_per_call():
+    compiled_flow_cache.clear()
+    workflow = WorkFlow(FlowHistory(history=[]))
+    flow = _build_flow(revision="rev-1")
+
+    graph1 = workflow.get_execution_graph(flow)
+    graph2 = workflow.get_execution_graph(flow)
+
+    assert len(compiled_flow_cache) == 1
+    assert [node.id for node in graph1.graph] == [node.id for node in graph2.graph]
+    assert graph1 is not graph2
+    assert graph1.graph[0] is not graph2.graph[0]
+
+    graph1.graph[0].object = "state"
+    assert graph2.graph[0].object is None
+    assert workflow.get_execution_graph(flow).graph[0].object is None
+
+
+def test_compiled_flow_cache_recompiles_new_revision():
+    compiled_flow_cache.clear()
+    workflow = WorkFlow(FlowHistory(history=[]))
+    flow = _build_flow(revision="rev-1")
+    workflow.get_execution_graph(flow)
+
+    flow.set_revision("rev-2")
+    workflow.get_execution_graph(flow)
+    assert len(compiled_flow_cache) == 1
+
+    compiled_flow_cache.invalidate(flow.id)
+    assert len(compiled_flow_cache) == 0
+
+
+def test_compiled_flow_cache_skips_flows_without_revision():
+    compiled_flow_cache.clear()
+    workflow = WorkFlow(FlowHistory(history=[]))
+    graph = workflow.get_execution_graph(_build_flow())
+
+    assert len(graph.graph) == 3
+    assert len(compiled_flow_cache) == 0
@@ -0,0 +1,60 @@
+import json
+from copy import deepcopy
+
+from tracardi.service.wf.utils.copy_on_write import copy_on_write
+
+
+def test_copy_on_write_does_not_change_original():
+    original = {"a": {"b": [1, {"c": 1}]}, "d": 1}
+    view = copy_on_write(original)
+
+    view["a"]["b"][1]["c"] = 2
+    view["a"]["b"].append(3)
+    view["d"] = 2
+    for _, value in view.items():
+        if isinstance(value, dict):
+            value["e"] = 1
+
+    assert original == {"a": {"b": [1, {"c": 1}]}, "d": 1}
+    assert view == {"a": {"b": [1, {"c": 2}, 3], "e": 1}, "d": 2}
+    assert json.loads(json.dumps(view)) == view
+
+
+def test_copy_on_write_shares_values_until_read():
+    nested = {"b": 1}
+    original = {"a": nested, "c": [nested]}
+    view = copy_on_write(original)
+
+    assert dict.__getitem__(view, "a") is nested
+    assert view["a"] is not nested
+    assert view["a"] is view["a"]
+    assert view["c"][0] is not nested
+
+
+def test_copy_on_write_keeps_assigned_values():
+    value = {"a": 1}
+    view = copy_on_write({})
+    view["x"] = value
+    value["a"] = 2
+
+    assert view["x"] is value
+    assert deepcopy(view) == {"x": {"a": 2}}
+    assert view.copy()["x"] is not value
+
+
+def test_copy_on_write_returns_immutable_values():
+    assert copy_on_write("a") == "a"
+    assert copy_on_write(None) is None
+
+
+def test_copy_on_write_copies_of_view_do_not_share_values():
+    original = {"a": {"b": 1}}
+
+    def kwargs(**data):
+        return data
+
+    for copy in (lambda view: dict(view), lambda view: {**view}, lambda view: kwargs(**view)):
+        copied = copy(copy_on_write(original))
+        copied["a"]["b"] = 2
+
+    assert original == {"a": {"b": 1}}
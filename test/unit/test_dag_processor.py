@@ -0,0 +1,85 @@
+from time import time
+
+import pytest
+
+from tracardi.service.wf.domain.connection import Connection
+from tracardi.service.wf.domain.dag_graph import DagGraph
+from tracardi.service.wf.domain.edge import Edge
+from tracardi.service.wf.domain.node import Node
+from tracardi.service.wf.utils.dag_error import DagCycleError
+from tracardi.service.wf.utils.dag_processor import DagProcessor
+
+
+def _node(id, start=False):
+    return Node(id=id, name=id, start=start, className="Action", module="module", inputs=["payload"],
+                outputs=["payload"])
+
+
+def _edge(source, target):
+    return Edge(id=f"{source}-{target}",
+                source=Connection(node_id=source, param="payload"),
+                target=Connection(node_id=target, param="payload"))
+
+
+def _diamond_flow(number_of_nodes, width=5):
+
+    """
+    Start node followed by layers of nodes. Every node is connected with every node of the next layer, so the
+    number of paths grows exponentially with the number of layers.
+    """
+
+    layers = [["start"]]
+    ids = [f"node-{n}" for n in range(number_of_nodes - 1)]
+    layers += [ids[n:n + width] for n in range(0, len(ids), width)]
+
+    nodes = [_node(id, start=id == "start") for layer in layers for id in layer]
+    edges = [_edge(source, target) for layer, next_layer in zip(layers, layers[1:])
+             for source in layer for target in next_layer]
+    return DagGraph(nodes=nodes, edges=edges)
+
+
+def test_dag_processor_sorts_nodes_and_sets_edges():
+    graph = DagGraph(
+        nodes=[_node("c"), _node("b"), _node("a", start=True), _node("d"), _node("not-connected")],
+        edges=[_edge("a", "b"), _edge("a", "c"), _edge("b", "d"), _edge("c", "d")]
+    )
+    exec_graph = DagProcessor(graph).make_execution_dag()
+
+    positions = {node.id: position for position, node in enumerate(exec_graph.graph)}
+    assert positions["a"] < positions["b"] < positions["d"]
+    assert positions["a"] < positions["c"] < positions["d"]
+    assert exec_graph.start_nodes == ["a"]
+
+    nodes = {node.id: node for node in exec_graph.graph}
+    assert len(nodes["a"].graph.out_edges) == 2
+    assert len(nodes["d"].graph.in_edges) == 2
+    assert len(nodes["d"].graph.out_edges) == 0
+    assert len(nodes["not-connected"].graph.in_edges) == 0
+
+
+def test_dag_processor_reports_cycle():
+    graph = DagGraph(
+        nodes=[_node("a", start=True), _node("b"), _node("c"), _node("d")],
+        edges=[_edge("a", "b"), _edge("b", "c"), _edge("c", "d"), _edge("d", "b")]
+    )
+
+    with pytest.raises(DagCycleError) as e:
+        DagProcessor(graph).make_execution_dag()
+
+    assert e.value.path == ["b", "c", "d", "b"]
+    assert "`b` -> `c` -> `d` -> `b`" in str(e.value)
+
+
+@pytest.mark.parametrize("number_of_nodes", [50, 100, 250, 500])
+def test_dag_processor_compiles_large_flows_in_linear_time(number_of_nodes):
+    graph = _diamond_flow(number_of_nodes)
+
+    start_time = time()
+    exec_graph = DagProcessor(graph).make_execution_dag()
+    compile_time = time() - start_time
+
+    print(f"Compiled flow of {number_of_nodes} nodes and {len(graph.edges)} edges in {compile_time:.4f}s")
+
+    assert len(exec_graph.graph) == number_of_nodes
+    assert exec_graph.graph[0].id == "start"
+    assert compile_time < 1
@@ -0,0 +1,138 @@
+import asyncio
+
+from tracardi.service.destination_queue import DestinationQueue, DestinationDelivery
+
+
+class ConnectorMock:
+
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def run_batch(self, deliveries):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("Destination not available")
+        self.batches.append([delivery.data for delivery in deliveries])
+
+
+def _delivery(data):
+    return DestinationDelivery(data, delta={}, profile=None, session=None, events=[])
+
+
+def test_destination_queue_sends_batches_per_destination():
+    connectors = {"1": ConnectorMock(), "2": ConnectorMock()}
+
+    async def get_connector(destination_id, debug):
+        return connectors.get(destination_id, None)
+
+    queue = DestinationQueue(get_connector, batch_size=3, linger=0.01, retries=0, backoff=0, max_size=100)
+
+    async def main():
+        for n in range(5):
+            assert queue.put("1", False, _delivery(n))
+        assert queue.put("2", False, _delivery("a"))
+        assert queue.put("3", False, _delivery("dropped"))
+        await queue.close()
+
+    asyncio.run(main())
+    assert connectors["1"].batches == [[0, 1, 2], [3, 4]]
+    assert connectors["2"].batches == [["a"]]
+
+
+def test_destination_queue_retries_failed_batch():
+    connector = ConnectorMock(fail_times=2)
+    gave_up = ConnectorMock(fail_times=10)
+
+    async def get_connector(destination_id, debug):
+        return connector if destination_id == "1" else gave_up
+
+    queue = DestinationQueue(get_connector, batch_size=10, linger=0, retries=2, backoff=0.001, max_size=100)
+
+    async def main():
+        queue.put("1", False, _delivery(1))
+        queue.put("2", False, _delivery(2))
+        await queue.close()
+
+    asyncio.run(main())
+    assert connector.batches == [[1]]
+    assert gave_up.batches == []
+    assert gave_up.fail_times == 7
+
+
+def test_destination_queue_drops_deliveries_when_full():
+
+    async def get_connector(destination_id, debug):
+        return ConnectorMock()
+
+    queue = DestinationQueue(get_connector, batch_size=10, linger=0, retries=0, backoff=0, max_size=1)
+
+    async def main():
+        assert queue.put("1", False, _delivery(1)) is True
+        assert queue.put("1", False, _delivery(2)) is False
+        await queue.close()
+
+    asyncio.run(main())
+
+
+def test_destination_queue_sends_queued_deliveries_on_elastic_client_close(monkeypatch):
+    from tracardi.service.storage import elastic_client
+    from tracardi.service.storage.elastic_client import ElasticClient, on_close
+
+    connector = ConnectorMock()
+
+    async def get_connector(destination_id, debug):
+        return connector
+
+    queue = DestinationQueue(get_connector, batch_size=10, linger=1, retries=0, backoff=0, max_size=100)
+    monkeypatch.setattr(elastic_client, "_close_callbacks", [])
+    on_close(queue.close)
+
+    async def main():
+        client = ElasticClient(hosts=["http://localhost:9200"])
+        queue.put("1", False, _delivery(1))
+        await client.close()
+
+    asyncio.run(main())
+
+    assert connector.batches == [[1]]
+    assert len(queue) == 0
+
+
+def test_destination_delivery_keeps_only_entity_ids():
+    from tracardi.domain.entity import Entity
+    from tracardi.domain.profile import Profile
+
+    delivery = DestinationDelivery({"a": 1}, delta={}, profile=Profile(id="p1"), session=None,
+                                   events=[Entity(id="e1")])
+
+    assert type(delivery.profile) is Entity and delivery.profile.id == "p1"
+    assert delivery.session is None
+    assert [event.id for event in delivery.events] == ["e1"]
+
+
+def test_destination_manager_reports_deliveries_dropped_by_full_queue(monkeypatch):
+    import pytest
+    from tracardi.config import tracardi
+    from tracardi.domain.destination import Destination, DestinationConfig
+    from tracardi.domain.entity import Entity
+    from tracardi.domain.profile import Profile
+    from tracardi.process_engine.destination.connector import Connector
+    from tracardi.service import destination_manager
+
+    destination = Destination(id="1", name="Crm", destination=DestinationConfig(package="package.Connector"),
+                              resource=Entity(id="resource"), enabled=True)
+
+    async def get_destinations(load_destinations):
+        return [destination]
+
+    monkeypatch.setattr(tracardi, "destination_queue", True)
+    monkeypatch.setattr(tracardi, "postpone_destination_sync", 0)
+    monkeypatch.setattr(destination_manager.destination_registry, "get_destinations", get_destinations)
+    monkeypatch.setattr(destination_manager.destination_registry, "get_connector",
+                        lambda destination, debug: Connector(debug, None, destination))
+    monkeypatch.setattr(destination_manager.destination_queue, "put", lambda destination_id, debug, delivery: False)
+
+    manager = destination_manager.DestinationManager({}, Profile(id="p1"))
+    with pytest.raises(ValueError, match="Crm"):
+        asyncio.run(manager.send_data("p1", [], debug=False))
@@ -0,0 +1,35 @@
+import asyncio
+
+from tracardi.domain.destination import Destination, DestinationConfig
+from tracardi.domain.entity import Entity
+from tracardi.service.destination_registry import DestinationRegistry
+
+
+def _destination(id):
+    return Destination(id=id, name=id, destination=DestinationConfig(package="package.Connector"),
+                       resource=Entity(id="resource"), enabled=True)
+
+
+def test_destination_registry_reloads_destinations_after_invalidate():
+    registry = DestinationRegistry(ttl=3600)
+    stored = [_destination("1")]
+    loads = []
+
+    async def load_destinations():
+        loads.append(len(stored))
+        return list(stored), {}
+
+    async def main():
+        first = await registry.get_destinations(load_destinations)
+        stored.append(_destination("2"))
+        cached = await registry.get_destinations(load_destinations)
+        registry.invalidate()
+        reloaded = await registry.get_destinations(load_destinations)
+        return first, cached, reloaded
+
+    first, cached, reloaded = asyncio.run(main())
+
+    assert [destination.id for destination in first] == ["1"]
+    assert [destination.id for destination in cached] == ["1"]
+    assert [destination.id for destination in reloaded] == ["1", "2"]
+    assert loads == [1, 2]
@@ -1,4 +1,7 @@
-from tracardi.service.notation.dict_traverser import DictTraverser
+import json
+from datetime import datetime
+
+from tracardi.service.notation.dict_traverser import DictTraverser, compile_template
 from tracardi.service.notation.dot_accessor import DotAccessor
 
 
@@ -99,3 +102,21 @@ def test_dot_traverser_no_values_throw_error():
         assert False
     except KeyError:
         assert True
+
+
+def test_dot_traverser_compiles_template_once():
+    template = {"x": {"a?": "profile@a", "b": ["profile@b", 1]}}
+
+    plan = compile_template(template)
+    assert compile_template(json.dumps(template)) is plan
+    assert compile_template({"x": {"a?": "profile@a", "b": ["profile@b", 1]}}) is plan
+    assert [(keys, source, optional) for keys, source, optional in plan.instructions] == [
+        (["root", "x", "a"], "profile@a", True),
+        (["root", "x", "b", "0"], "profile@b", False),
+        (["root", "x", "b", "1"], 1, False)
+    ]
+
+    now = datetime.utcnow()
+    dot = DotAccessor(profile={"b": now}, event={})
+    result = DictTraverser(dot).reshape(reshape_template=plan)
+    assert result == {"x": {"b": [now, 1]}}
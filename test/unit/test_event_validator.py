@@ -0,0 +1,48 @@
+from tracardi.domain.event_payload_validator import EventTypeManager, ValidationSchema
+from tracardi.service import event_validator
+from tracardi.service.event_validator import validate, get_validators
+from tracardi.service.notation.dot_accessor import DotAccessor
+
+
+def _manager(schema):
+    return EventTypeManager(
+        name="test",
+        event_type="page-view",
+        validation=ValidationSchema(json_schema=schema, enabled=True)
+    )
+
+
+def test_should_validate_all_keys():
+    manager = _manager({
+        "event@properties.url": {"type": "string"},
+        "event@properties.count": {"type": "integer", "minimum": 1}
+    })
+
+    assert validate(DotAccessor(event={"properties": {"url": "a", "count": 1}}), manager) is True
+    assert validate(DotAccessor(event={"properties": {"url": "a", "count": 0}}), manager) is False
+    assert validate(DotAccessor(event={"properties": {"url": 1, "count": 1}}), manager) is False
+    assert validate(DotAccessor(event={"properties": {"url": "a"}}), manager) is False
+
+
+def test_should_compile_validators_once_per_schema_revision():
+    event_validator._validators.clear()
+    manager = _manager({"event@properties.url": {"type": "string"}})
+
+    compiled = get_validators(manager)
+    assert get_validators(_manager({"event@properties.url": {"type": "string"}})) is compiled
+    assert get_validators(_manager({"event@properties.url": {"type": "integer"}})) is not compiled
+    assert len(event_validator._validators) == 2
+
+
+def test_should_key_validators_by_schema_revision_of_cached_event_type():
+    event_validator._validators.clear()
+    manager = _manager({"event@properties.url": {"type": "string"}})
+    manager.set_schema_revision()
+    cached = EventTypeManager(**manager.dict())
+
+    assert cached.schema_revision == manager.schema_revision
+    assert get_validators(cached) is get_validators(manager)
+
+    manager.validation.json_schema = {"event@properties.url": {"type": "integer"}}
+    manager.set_schema_revision()
+    assert get_validators(manager) is not get_validators(cached)
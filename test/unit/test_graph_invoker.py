@@ -0,0 +1,133 @@
+import asyncio
+from time import time
+
+from tracardi.domain.entity import Entity
+from tracardi.domain.event import Event, EventMetadata
+from tracardi.domain.event_metadata import EventTime
+from tracardi.domain.flow import Flow
+from tracardi.domain.profile import Profile
+from tracardi.process_engine.action.v1.end_action import EndAction
+from tracardi.process_engine.action.v1.flow.start.start_action import StartAction
+from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData
+from tracardi.service.plugin.domain.result import Result
+from tracardi.service.plugin.runner import ActionRunner
+from tracardi.service.wf.domain.debug_info import DebugInfo, FlowDebugInfo
+from tracardi.service.wf.domain.flow_history import FlowHistory
+from tracardi.service.wf.domain.work_flow import WorkFlow
+from tracardi.service.storage import elastic_client
+from tracardi.service.wf.service.background_runner import background_runner
+from tracardi.service.wf.service.builders import action
+
+
+class SleepAction(ActionRunner):
+
+    finished = []
+    running = 0
+    max_running = 0
+
+    async def run(self, payload: dict, in_edge=None) -> Result:
+        SleepAction.running += 1
+        SleepAction.max_running = max(SleepAction.max_running, SleepAction.running)
+        await asyncio.sleep(0.05)
+        SleepAction.running -= 1
+        self.console.log(f"Slept in {self.node.id}")
+        SleepAction.finished.append(self.node.id)
+        return Result(port="payload", value=payload)
+
+
+def register() -> Plugin:
+    return Plugin(
+        start=False,
+        spec=Spec(
+            module=__name__,
+            className='SleepAction',
+            inputs=["payload"],
+            outputs=['payload'],
+            init=None,
+            version='0.1',
+            license="MIT",
+            author="Risto Kowaczewski"
+        ),
+        metadata=MetaData(
+            name='Sleep',
+            desc='Sleeps and returns payload.'
+        )
+    )
+
+
+def _build_flow():
+    start = action(StartAction)
+    branch_a = action(SleepAction)
+    branch_b = action(SleepAction)
+    end = action(EndAction)
+
+    flow = Flow.build("Branches", id="1")
+    flow += start('payload') >> branch_a('payload')
+    flow += start('payload') >> branch_b('payload')
+    flow += branch_a('payload') >> end('payload')
+    flow += branch_b('payload') >> end('payload')
+    return flow
+
+
+async def _run(flow, concurrency, background=False):
+    SleepAction.finished, SleepAction.running, SleepAction.max_running = [], 0, 0
+    event = Event(
+        id='1',
+        type='text',
+        metadata=EventMetadata(time=EventTime(), debug=not background),
+        source=Entity(id='1')
+    )
+    profile = Profile(id="1")
+    graph = WorkFlow.compile(flow)
+    graph.concurrency = concurrency
+    for node in graph.graph:
+        node.run_in_background = background and node.className == 'SleepAction'
+    debug_info = DebugInfo(timestamp=time(), flow=FlowDebugInfo(id=flow.id, name=flow.name), event=Entity(id='1'))
+    log_list = []
+    debug_info = await graph.init(debug_info, log_list, flow, FlowHistory(history=[]), event, None, profile, None, [])
+
+    debug_info, log_list, result_profile, _ = await graph.run({}, event, profile, None, debug_info, log_list)
+    return graph, debug_info, log_list, result_profile
+
+
+def test_graph_invoker_runs_independent_branches_concurrently():
+    flow = _build_flow()
+    graph, _, log_list, profile = asyncio.run(_run(flow, concurrency=4))
+
+    # Both branches were running at the same time.
+    assert SleepAction.max_running == 2
+    assert profile.id == "1"
+
+    # Logs are in graph order
+    sleep_logs = [log.message for log in log_list if log.message.startswith("Slept")]
+    assert sleep_logs == [f"Slept in {node.id}" for node in graph.graph[1:3]]
+
+
+def test_graph_invoker_runs_nodes_one_by_one_with_concurrency_of_one():
+    flow = _build_flow()
+    graph, _, log_list, _ = asyncio.run(_run(flow, concurrency=1))
+
+    assert SleepAction.max_running == 1
+    assert sorted(SleepAction.finished) == sorted(node.id for node in graph.graph[1:3])
+    assert not [log for log in log_list if log.type == 'error']
+
+
+def test_graph_invoker_runs_marked_nodes_in_background():
+    flow = _build_flow()
+
+    async def main():
+        graph, _, log_list, profile = await _run(flow, concurrency=4, background=True)
+
+        # Sleeping nodes and the end node run after the flow returned.
+        assert SleepAction.finished == []
+        assert not [log for log in log_list if log.message.startswith("Slept")]
+
+        await background_runner.join()
+        assert sorted(SleepAction.finished) == sorted(node.id for node in graph.graph[1:3])
+        assert len(background_runner) == 0
+
+    asyncio.run(main())
+
+
+def test_background_branches_are_awaited_on_shutdown():
+    assert background_runner.join in elastic_client._close_callbacks
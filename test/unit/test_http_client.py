@@ -0,0 +1,107 @@
+import asyncio
+
+from aiohttp import web
+
+from tracardi.service.storage import elastic_client
+from tracardi.service.storage.elastic_client import on_close
+from tracardi.service.tracardi_http_client import HttpClient, http_session_pool
+
+
+async def _start_server():
+    peers = []
+
+    async def handler(request):
+        peers.append(request.transport.get_extra_info('peername'))
+        return web.json_response({"auth": request.headers.get("Authorization"), "x": request.headers.get("X")})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/", peers
+
+
+def test_http_client_reuses_keep_alive_connection():
+
+    async def main():
+        runner, url, peers = await _start_server()
+        try:
+            results = []
+            for _ in range(3):
+                async with HttpClient(1, 200, headers={"Authorization": "token"}) as client:
+                    async with client.get(url, headers={"X": "1"}) as response:
+                        results.append(await response.json())
+
+            assert len(http_session_pool) == 1
+            assert len(set(peers)) == 1
+            assert results == [{"auth": "token", "x": "1"}] * 3
+        finally:
+            await http_session_pool.close()
+            await runner.cleanup()
+
+        assert len(http_session_pool) == 0
+
+    asyncio.run(main())
+
+
+def test_http_client_keeps_cookies_per_client():
+
+    async def main():
+        received = []
+
+        async def handler(request):
+            received.append(request.cookies.get("session"))
+            response = web.json_response({})
+            response.set_cookie("session", request.query.get("set", "none"))
+            return response
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        url = f"http://localhost:{runner.addresses[0][1]}/"
+        try:
+            async with HttpClient(1, 200) as client, HttpClient(1, 200) as other:
+                async with client.get(url + "?set=1"):
+                    pass
+                async with client.get(url):
+                    pass
+                async with other.get(url):
+                    pass
+        finally:
+            await http_session_pool.close()
+            await runner.cleanup()
+
+        # Cookie set for one client is sent only with its own requests.
+        assert received == [None, "1", None]
+
+    asyncio.run(main())
+
+
+def test_http_session_pool_is_closed_after_other_shutdown_callbacks(monkeypatch):
+    assert http_session_pool.close in elastic_client._last_close_callbacks
+
+    closed = []
+
+    async def close_queue():
+        closed.append("queue")
+
+    async def close_pool():
+        closed.append("pool")
+
+    monkeypatch.setattr(elastic_client, "_close_callbacks", [])
+    monkeypatch.setattr(elastic_client, "_last_close_callbacks", [])
+    on_close(close_pool, last=True)
+    on_close(close_queue)
+
+    async def main():
+        await elastic_client.ElasticClient(hosts=["http://localhost:9200"]).close()
+
+    asyncio.run(main())
+
+    assert closed == ["queue", "pool"]
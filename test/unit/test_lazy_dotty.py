@@ -0,0 +1,75 @@
+from dotty_dict import dotty, Dotty
+
+from tracardi.domain.profile import Profile
+from tracardi.domain.profile_traits import ProfileTraits
+from tracardi.service.notation.dot_accessor import DotAccessor
+from tracardi.service.notation.lazy_dotty import LazyDotty
+
+
+def _profile():
+    return Profile(
+        id="1",
+        traits=ProfileTraits(private={"email": "a@b.c", "list": [1, {"a": 2}], "none": None}, public={}),
+        segments=["a"]
+    )
+
+
+def test_lazy_dotty_reads_like_dotty():
+    profile = _profile()
+    lazy = LazyDotty(profile)
+    eager = dotty(profile.dict())
+
+    for path in ["id", "traits.private.email", "traits.private.list.1.a", "traits.private.list.0",
+                 "traits.private", "segments", "metadata.time.insert"]:
+        assert lazy[path] == eager[path], path
+        assert (path in lazy) == (path in eager), path
+
+    assert lazy["traits.private.none.deeper"] is None
+
+    for path in ["missing", "traits.missing", "traits.private.missing", "traits.private.email.x"]:
+        assert path not in lazy
+        assert lazy.get(path) is None
+
+    assert isinstance(lazy, Dotty)
+    assert not lazy.is_materialized()
+    assert dict(lazy.items()) == profile.dict()
+    assert lazy.is_materialized()
+
+
+def test_lazy_dotty_copies_branch_on_write():
+    profile = _profile()
+    lazy = LazyDotty(profile)
+
+    lazy["traits.private.email"] = "x@y.z"
+    lazy["new.key"] = 1
+    del lazy["segments"]
+
+    assert lazy["traits.private.email"] == "x@y.z"
+    assert lazy["new"] == {"key": 1}
+    assert "segments" not in lazy
+    assert not lazy.is_materialized()
+
+    # Model is not changed
+    assert profile.traits.private["email"] == "a@b.c"
+    assert profile.segments == ["a"]
+
+    data = dict(lazy.items())
+    assert data["traits"]["private"]["email"] == "x@y.z"
+    assert data["new"] == {"key": 1}
+    assert "segments" not in data
+    assert Profile(**lazy).traits.private["email"] == "x@y.z"
+
+
+def test_lazy_dot_accessor():
+    profile = _profile()
+    dot = DotAccessor(profile=profile, event={"type": "page-view"}, lazy=True)
+
+    assert dot["profile@traits.private.email"] == "a@b.c"
+    assert dot["event@type"] == "page-view"
+    assert "profile@traits.private.email" in dot
+    assert "profile@traits.private.phone" not in dot
+
+    dot["profile@traits.private.phone"] = "123"
+    assert dot["profile@traits.private.phone"] == "123"
+    assert "phone" not in profile.traits.private
+    assert dot["profile@..."]["traits"]["private"]["phone"] == "123"
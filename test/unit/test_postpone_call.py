@@ -5,26 +5,41 @@ from tracardi.service.postpone_call import PostponedCall
 from threading import Thread
 
 
+class PipelineMock:
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def execute(self):
+        return []
+
+
 class PostponeCacheMock:
 
     def __init__(self):
         self.cache = {}
 
-    def exists(self, profile_id):
-        return profile_id not in self.cache
+    def pipeline(self):
+        return PipelineMock()
+
+    async def exists(self, profile_id):
+        return profile_id in self.cache
 
-    def get(self, profile_id) -> bool:
+    async def get(self, profile_id) -> bool:
         if profile_id not in self.cache:
             self.cache[profile_id] = '1'
             return False
 
         return True
 
-    def set(self, profile_id):
+    async def set(self, profile_id, pipe=None):
         self.cache[profile_id] = '1'
 
-    def reset(self, profile_id):
-        del self.cache[profile_id]
+    async def reset(self, profile_id, pipe=None):
+        self.cache.pop(profile_id, None)
 
 
 class InstanceCacheMock:
@@ -32,21 +47,20 @@ class InstanceCacheMock:
     def __init__(self):
         self.cache = {}
 
-    def exists(self, profile_id):
-        return profile_id in self.cache
+    def pipeline(self):
+        return PipelineMock()
 
-    def get_instance(self, profile_id, instance_id) -> Optional[str]:
-        if not self.exists(profile_id):
-            self.cache[profile_id] = instance_id
-            return None
+    async def exists(self, profile_id):
+        return profile_id in self.cache
 
-        return self.cache[profile_id]
+    async def get_instance(self, profile_id) -> Optional[str]:
+        return self.cache.get(profile_id, None)
 
-    def set_instance(self, profile_id, instance_id):
+    async def set_instance(self, profile_id, instance_id, pipe=None):
         self.cache[profile_id] = instance_id
 
-    def reset(self, profile_id):
-        del self.cache[profile_id]
+    async def reset(self, profile_id, pipe=None):
+        self.cache.pop(profile_id, None)
 
 
 _global_postpone_flag = PostponeCacheMock()
@@ -67,7 +81,7 @@ def test_should_postpone_calls_on_different_instances():
         postpone.global_schedule_flag = _global_schedule_flag
         postpone.instance_cache = _instance_cache
         postpone.wait = 2
-        postpone.run(loop, force_recreate=True)
+        await postpone.run(loop, force_recreate=True)
         await asyncio.sleep(5)
 
     async def instance2(loop):
@@ -76,7 +90,7 @@ def test_should_postpone_calls_on_different_instances():
         postpone2.global_schedule_flag = _global_schedule_flag
         postpone2.instance_cache = _instance_cache
         postpone2.wait = 1
-        postpone2.run(loop, force_recreate=True)
+        await postpone2.run(loop, force_recreate=True)
         await asyncio.sleep(5)
 
     async def instance3(loop):
@@ -85,7 +99,7 @@ def test_should_postpone_calls_on_different_instances():
         postpone2.global_schedule_flag = _global_schedule_flag
         postpone2.instance_cache = _instance_cache
         postpone2.wait = 1
-        postpone2.run(loop, force_recreate=True)
+        await postpone2.run(loop, force_recreate=True)
         await asyncio.sleep(5)
 
     def main1():
@@ -131,3 +145,45 @@ def test_should_postpone_calls_on_different_instances():
     thread1.join()
     thread2.join()
     thread3.join()
+
+
+def test_should_clean_cache_in_one_pipeline():
+
+    class RecordingPipelineMock(PipelineMock):
+        executed = 0
+
+        async def execute(self):
+            RecordingPipelineMock.executed += 1
+            return []
+
+    calls = []
+
+    async def call(*args):
+        calls.append(args)
+
+    async def main():
+        postpone_flag = PostponeCacheMock()
+        schedule_flag = PostponeCacheMock()
+        instance_cache = InstanceCacheMock()
+        postpone_flag.pipeline = RecordingPipelineMock
+
+        postpone = PostponedCall("profile-id", call, "instance-1", "arg")
+        postpone.global_postpone_flag = postpone_flag
+        postpone.global_schedule_flag = schedule_flag
+        postpone.instance_cache = instance_cache
+        postpone.wait = 60
+
+        await postpone.run(asyncio.get_running_loop(), force_recreate=True)
+        assert schedule_flag.cache == {"profile-id": "1"}
+        assert instance_cache.cache == {"profile-id": "instance-1"}
+
+        await postpone._execute(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+
+        assert calls == [("arg",)]
+        assert RecordingPipelineMock.executed == 1
+        assert schedule_flag.cache == {}
+        assert instance_cache.cache == {}
+        assert postpone_flag.cache == {}
+
+    asyncio.run(main())
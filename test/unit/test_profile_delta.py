@@ -0,0 +1,84 @@
+from tracardi.domain.profile import Profile, ConsentRevoke
+from tracardi.service.profile_delta import diff, MISSING
+
+
+def test_diff_returns_changed_leaves_only():
+    old = {"a": {"b": 1, "c": [1, 2]}, "d": 1, "e": 1}
+    new = {"a": {"b": 2, "c": [2, 1]}, "d": 1, "f": 1}
+
+    assert sorted(diff(old, new)) == [("a.b", 1, 2), ("e", 1, MISSING), ("f", MISSING, 1)]
+
+
+def test_profile_tracks_assigned_fields():
+    profile = Profile(id="1", traits={"private": {"a": 1, "b": 1}})
+    profile.reset_changes()
+    assert not profile.has_changes()
+
+    profile.replace(Profile(id="1", traits={"private": {"a": 2, "b": 1}}, segments=["s"]))
+    profile.operation.update = True
+
+    delta = profile.get_changes()
+    assert delta.to_dict() == {
+        "traits.private.a": {"old": 1, "new": 2},
+        "segments": {"old": [], "new": ["s"]}
+    }
+    assert delta.changed_fields() == ["traits", "segments"]
+
+    profile.reset_changes()
+    assert not profile.has_changes()
+
+
+def test_profile_tracks_marked_in_place_changes():
+    profile = Profile(id="1")
+    profile.reset_changes()
+
+    profile.mark_changed("consents")
+    profile.consents["c"] = ConsentRevoke(revoke=None)
+
+    assert profile.get_changes().changed_paths() == ["consents.c"]
+
+
+def test_profile_reports_no_changes_when_values_are_the_same():
+    profile = Profile(id="1", segments=["a", "b"])
+    profile.reset_changes()
+    profile.segments = ["b", "a"]
+    profile.traits = profile.traits.copy(deep=True)
+
+    assert profile.has_changes()
+    assert not profile.get_changes()
+
+
+def test_profile_delta_applies_changes_on_other_profile():
+    profile = Profile(id="1", traits={"private": {"a": 1, "b": 1}})
+    profile.reset_changes()
+    profile.replace(Profile(id="1", traits={"private": {"a": 2}, "public": {"c": 1}}))
+
+    stored_profile = Profile(id="1", traits={"private": {"a": 1, "b": 1, "d": 1}}, segments=["s"])
+    result = profile.get_changes().apply(stored_profile)
+
+    assert result.traits.private == {"a": 2, "d": 1}
+    assert result.traits.public == {"c": 1}
+    assert result.segments == ["s"]
+
+
+def test_profile_tracks_changes_only_between_reset_and_get_changes():
+    profile = Profile(id="1", traits={"private": {"a": {"b": 1}}})
+    profile.segments = ["s"]
+    profile.mark_changed("traits")
+    assert not profile.has_changes()
+
+    profile.reset_changes()
+    traits = profile.traits
+    assert not profile.has_changes()
+
+    profile.mark_changed("traits")
+    traits.private['a']['b'] = 2
+    profile.increase_visits()
+
+    assert profile.get_changes().to_dict() == {
+        "traits.private.a.b": {"old": 1, "new": 2},
+        "stats.visits": {"old": 0, "new": 1}
+    }
+
+    profile.segments = []
+    assert profile.get_changes().changed_fields() == ["traits", "stats"]
@@ -0,0 +1,145 @@
+import asyncio
+
+from tracardi.service.storage.redis_client import AsyncRedisClient
+from tracardi.service.storage.redis_lock import RedisLock
+from tracardi.service.synchronizer import _LocalProfileLocks, ProfileTracksSynchronizer
+
+
+def test_local_profile_locks_serialize_same_profile():
+    locks = _LocalProfileLocks()
+    log = []
+
+    async def track(profile_id, name):
+        await locks.acquire(profile_id)
+        try:
+            log.append(f"{name}-start")
+            await asyncio.sleep(0.01)
+            log.append(f"{name}-end")
+        finally:
+            locks.release(profile_id)
+
+    async def main():
+        await asyncio.gather(track("1", "a"), track("1", "b"), track("2", "c"))
+
+    asyncio.run(main())
+
+    assert log.index("a-end") < log.index("b-start")
+    assert log.index("c-start") < log.index("a-end")
+    assert len(locks) == 0
+
+
+def test_local_profile_locks_know_waiters():
+    locks = _LocalProfileLocks()
+
+    async def main():
+        await locks.acquire("1")
+        assert not locks.has_waiters("1")
+        waiter = asyncio.create_task(locks.acquire("1"))
+        await asyncio.sleep(0)
+        assert locks.has_waiters("1")
+        locks.release("1")
+        await waiter
+        locks.release("1")
+
+    asyncio.run(main())
+    assert len(locks) == 0
+
+
+def test_synchronizer_does_not_lock_without_profile():
+    async def main():
+        async with ProfileTracksSynchronizer(None) as synchronizer:
+            return synchronizer.lock
+
+    assert asyncio.run(main()) is None
+
+
+class RedisMock:
+
+    def __init__(self):
+        self.keys = {}
+        self.scripts = []
+        self.extended = 0
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def register_script(self, script):
+        self.scripts.append(script)
+
+        async def release(keys, args):
+            if self.keys.get(keys[0]) == args[0]:
+                del self.keys[keys[0]]
+                return 1
+            return 0
+
+        async def extend(keys, args):
+            if self.keys.get(keys[0]) == args[0]:
+                self.extended += 1
+                return 1
+            return 0
+
+        return extend if 'pexpire' in script else release
+
+
+class AsyncRedisClientMock(AsyncRedisClient):
+
+    def __init__(self):
+        self.mock = RedisMock()
+        self.client = self.mock
+        self.keys = self.mock.keys
+        self._scripts = {}
+
+
+def test_redis_lock_is_released_only_by_owner_and_registers_script_once():
+    redis = AsyncRedisClientMock()
+
+    async def main():
+        lock = RedisLock("profile:1", ttl=1, redis=redis)
+        other = RedisLock("profile:1", ttl=1, redis=redis)
+        assert await lock.acquire(timeout=0)
+        assert not await other._try_acquire()
+        assert not await other.release()
+        assert await lock.release()
+        assert await other.acquire(timeout=0)
+        assert await other.release()
+
+    asyncio.run(main())
+
+    assert redis.keys == {}
+    assert len(redis.mock.scripts) == 1
+
+
+def test_redis_lock_is_extended_until_released():
+    redis = AsyncRedisClientMock()
+
+    async def main():
+        lock = RedisLock("profile:1", ttl=0.03, redis=redis)
+        assert await lock.acquire(timeout=0)
+        await asyncio.sleep(0.1)
+        assert redis.mock.extended >= 2
+        assert await lock.release()
+
+        extended = redis.mock.extended
+        await asyncio.sleep(0.05)
+        assert redis.mock.extended == extended
+
+    asyncio.run(main())
+
+    assert redis.keys == {}
+
+
+def test_profile_driver_hands_over_saved_profiles_of_synchronized_tracks(monkeypatch):
+    from tracardi.config import tracardi
+    from tracardi.service.storage.drivers.elastic import profile
+    from tracardi.service.storage.entity_cache import profile_cache, synced_profile_cache
+
+    monkeypatch.setattr(tracardi, "cache_profiles", False)
+    monkeypatch.setattr(tracardi, "sync_profile_tracks", False)
+    assert profile._get_cache() is None
+    monkeypatch.setattr(tracardi, "sync_profile_tracks", True)
+    assert profile._get_cache() is synced_profile_cache
+    monkeypatch.setattr(tracardi, "cache_profiles", True)
+    assert profile._get_cache() is profile_cache
@@ -0,0 +1,109 @@
+import asyncio
+
+from tracardi.service.resource_pool import ResourcePool
+
+
+class PoolMock:
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.closed = False
+
+
+class Dialer:
+
+    def __init__(self):
+        self.opened = []
+
+    def open(self, credentials):
+        async def _open():
+            await asyncio.sleep(0)
+            pool = PoolMock(credentials)
+            self.opened.append(pool)
+            return pool
+        return _open
+
+    @staticmethod
+    async def close(pool):
+        pool.closed = True
+
+
+def test_resource_pool_shares_pool_between_borrowers():
+    pools = ResourcePool(max_pools=10, idle_ttl=60)
+    dialer = Dialer()
+    credentials = {"host": "localhost"}
+
+    async def borrow():
+        async with pools.borrow("1", "mysql", credentials, dialer.open(credentials), dialer.close) as pool:
+            return pool
+
+    async def main():
+        return await asyncio.gather(*[borrow() for _ in range(5)])
+
+    result = asyncio.run(main())
+    assert len(dialer.opened) == 1
+    assert all(pool is dialer.opened[0] for pool in result)
+
+
+def test_resource_pool_closes_pool_on_credentials_change():
+    pools = ResourcePool(max_pools=10, idle_ttl=60)
+    dialer = Dialer()
+
+    async def main():
+        old = {"host": "old"}
+        new = {"host": "new"}
+        async with pools.borrow("1", "mysql", old, dialer.open(old), dialer.close) as old_pool:
+            async with pools.borrow("1", "mysql", new, dialer.open(new), dialer.close) as new_pool:
+                # Borrowed pool is closed when returned
+                assert old_pool.closed is False
+            assert new_pool.closed is False
+        assert old_pool.closed is True
+        assert len(pools) == 1
+
+        await pools.close("1")
+        assert new_pool.closed is True
+        assert len(pools) == 0
+
+    asyncio.run(main())
+
+
+def test_resource_pool_evicts_idle_and_least_recently_used_pools():
+    pools = ResourcePool(max_pools=2, idle_ttl=60)
+    dialer = Dialer()
+
+    async def borrow(resource_id):
+        credentials = {"id": resource_id}
+        async with pools.borrow(resource_id, "mongo", credentials, dialer.open(credentials), dialer.close) as pool:
+            return pool
+
+    async def main():
+        first = await borrow("1")
+        await borrow("2")
+        await borrow("3")
+        assert first.closed is True
+        assert len(pools) == 2
+
+        pools.idle_ttl = -1
+        await borrow("4")
+        assert len(pools) == 1
+        assert [pool.closed for pool in dialer.opened] == [True, True, True, False]
+
+    asyncio.run(main())
+
+
+def test_resource_pool_closes_idle_pools_on_timer():
+    pools = ResourcePool(max_pools=2, idle_ttl=0.01)
+    dialer = Dialer()
+    credentials = {"id": "1"}
+
+    async def main():
+        async with pools.borrow("1", "mongo", credentials, dialer.open(credentials), dialer.close):
+            pass
+        assert len(pools) == 1
+
+        # No other borrow is needed to close the idle pool.
+        await asyncio.sleep(0.1)
+        assert len(pools) == 0
+        assert dialer.opened[0].closed is True
+
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+import asyncio
+
+from tracardi.domain.rule import Rule
+from tracardi.service.rule_index import RuleIndex
+
+rules = [
+    {"id": "1", "name": "Page view", "event": {"type": "page-view"}, "flow": {"id": "f1", "name": "Flow"},
+     "source": {"id": "s1", "name": "Source"}},
+    {"id": "2", "name": "Disabled", "event": {"type": "page-view"}, "flow": {"id": "f1", "name": "Flow"},
+     "source": {"id": "s1", "name": "Source"}, "enabled": False},
+    {"id": "3", "name": "Other source", "event": {"type": "page-view"}, "flow": {"id": "f1", "name": "Flow"},
+     "source": {"id": "s2", "name": "Source"}},
+    {"id": "4", "name": "Invalid", "event": {"type": "purchase"}, "flow": {"id": "f1"},
+     "source": {"id": "s1", "name": "Source"}},
+]
+
+
+class RedisMock:
+
+    class Client:
+        def __init__(self):
+            self.marker = None
+
+        async def get(self, key):
+            return str(self.marker).encode() if self.marker is not None else None
+
+        async def incr(self, key):
+            self.marker = (self.marker or 0) + 1
+            return self.marker
+
+    def __init__(self):
+        self.client = self.Client()
+
+
+def test_rule_index_holds_validated_rules_by_source_and_event_type():
+    index = RuleIndex(sync_interval=60, redis=RedisMock())
+    calls = []
+
+    async def load_rules():
+        calls.append(1)
+        return rules
+
+    async def main():
+        first = await index.get("s1", ["page-view", "purchase", "other"], load_rules)
+        second = await index.get("s1", ["page-view"], load_rules)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 1
+    assert [rule.id for rule in first["page-view"]] == ["1"]
+    assert isinstance(first["page-view"][0], Rule)
+    # Invalid rule is kept as dict so the rules engine can report it.
+    assert first["purchase"] == [rules[3]]
+    assert first["other"] == []
+    assert second["page-view"] is first["page-view"]
+
+
+def test_rule_index_rebuilds_after_marker_change():
+    redis = RedisMock()
+    index = RuleIndex(sync_interval=0, redis=redis)
+    loaded = [rules[:1]]
+
+    async def load_rules():
+        return loaded[0]
+
+    async def main():
+        await index.get("s1", ["page-view"], load_rules)
+
+        # Rules changed by other process
+        loaded[0] = rules[:1] + [{**rules[2], "source": {"id": "s1", "name": "Source"}}]
+        await redis.client.incr(index.marker_key)
+
+        await index.get("s1", ["page-view"], load_rules)
+        await index._sync_task
+        return await index.get("s1", ["page-view"], load_rules)
+
+    result = asyncio.run(main())
+    assert [rule.id for rule in result["page-view"]] == ["1", "3"]
+
+
+def test_rule_index_upserts_own_changes():
+    index = RuleIndex(sync_interval=60, redis=RedisMock())
+    index.index(rules)
+    rule = Rule(**{**rules[0], "event": {"type": "purchase"}})
+
+    index.upsert(rule)
+    result = asyncio.run(index.get("s1", ["page-view", "purchase"], None))
+    assert result["page-view"] == []
+    assert rule in result["purchase"]
+
+    index.remove("1")
+    result = asyncio.run(index.get("s1", ["purchase"], None))
+    assert [item.get('id') for item in result["purchase"] if isinstance(item, dict)] == ["4"]
+    assert rule not in result["purchase"]
+
+
+def test_rule_index_reloads_periodically_without_marker_change():
+    index = RuleIndex(sync_interval=0, redis=RedisMock(), full_reload=2)
+    calls = []
+
+    async def load_rules():
+        calls.append(1)
+        return rules
+
+    async def main():
+        await index.get("s1", ["page-view"], load_rules)
+        for _ in range(4):
+            await index.get("s1", ["page-view"], load_rules)
+            await index._sync_task
+
+    asyncio.run(main())
+    # First load and then every second sync.
+    assert len(calls) == 3
+
+
+def test_load_enabled_rules_scans_all_pages(monkeypatch):
+    from tracardi.domain.storage_record import StorageRecord
+    from tracardi.service.storage.drivers.elastic import rule
+
+    queries = []
+
+    class StorageMock:
+
+        async def scan(self, query):
+            queries.append(query)
+            # More records than the former load limit.
+            for n in range(10500):
+                yield StorageRecord(id=str(n))
+
+    monkeypatch.setattr(rule, "storage_manager", lambda index: StorageMock())
+
+    records = asyncio.run(rule.load_enabled())
+
+    assert len(records) == 10500
+    assert queries == [{"query": {"query_string": {"query": "NOT enabled:false"}}}]
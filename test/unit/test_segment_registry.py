@@ -0,0 +1,162 @@
+import asyncio
+
+from tracardi.domain.profile import Profile
+from tracardi.domain.profile_traits import ProfileTraits
+from tracardi.service.segment_registry import SegmentRegistry
+
+segments = [
+    {"id": "1", "name": "Has age", "eventType": ["page-view", "purchase"], "condition": "profile@traits.private.age exists"},
+    {"id": "2", "name": "All events", "condition": "profile@traits.private.age > 10"},
+    {"id": "3", "name": "Disabled", "eventType": ["page-view"], "condition": "profile@id exists", "enabled": False},
+    {"id": "4", "name": "Invalid", "eventType": ["purchase"], "condition": "profile@id ==="},
+]
+
+
+class RedisMock:
+
+    class Client:
+        def __init__(self):
+            self.marker = None
+
+        async def get(self, key):
+            return str(self.marker).encode() if self.marker is not None else None
+
+        async def incr(self, key):
+            self.marker = (self.marker or 0) + 1
+            return self.marker
+
+    def __init__(self):
+        self.client = self.Client()
+
+
+def _segment(profile, registry, event_types):
+    async def main():
+        result = []
+        async for item in profile.segment(await registry.get(event_types, load_segments)):
+            result.append(item)
+        return result
+
+    calls = []
+
+    async def load_segments():
+        calls.append(1)
+        return segments
+
+    return asyncio.run(main()), calls
+
+
+def test_segment_registry_indexes_enabled_segments_by_event_type():
+    registry = SegmentRegistry(ttl=30, sync_interval=30, redis=RedisMock())
+    registry.index([])
+    assert registry.is_loaded()
+
+    async def main():
+        async def load_segments():
+            return segments
+
+        await registry.load(load_segments)
+        return await registry.get(["page-view", "other"], load_segments)
+
+    result = [(event_type, segment.id) for event_type, segment in asyncio.run(main())]
+    assert result == [("page-view", "has-age"), ("page-view", "all-events"), ("other", "all-events")]
+
+
+def test_profile_segmentation_loads_segments_once():
+    registry = SegmentRegistry(ttl=30, sync_interval=30, redis=RedisMock())
+    profile = Profile(id="1", traits=ProfileTraits(private={"age": 20}))
+
+    result, calls = _segment(profile, registry, ["page-view", "purchase"])
+    assert len(calls) == 1
+    assert ("page-view", "has-age", None) in result
+    assert ("purchase", "all-events", None) in result
+    assert set(profile.segments) == {"has-age", "all-events"}
+    assert "disabled" not in profile.segments
+
+    errors = [error for _, segment_id, error in result if error is not None]
+    assert len(errors) == 1
+    assert "invalid" in errors[0]
+
+    _, calls = _segment(profile, registry, ["purchase"])
+    assert len(calls) == 0
+
+
+def test_profile_segmentation_skips_not_matching_segments():
+    registry = SegmentRegistry(ttl=30, sync_interval=30, redis=RedisMock())
+    profile = Profile(id="1", traits=ProfileTraits(private={"age": 5}))
+
+    result, _ = _segment(profile, registry, ["page-view"])
+    assert result == [("page-view", "has-age", None)]
+    assert profile.segments == ["has-age"]
+
+
+def test_load_enabled_segments_scans_all_pages(monkeypatch):
+    from tracardi.domain.storage_record import StorageRecord
+    from tracardi.service.storage.drivers.elastic import segment
+
+    queries = []
+
+    class StorageMock:
+
+        async def scan(self, query):
+            queries.append(query)
+            # More records than fit in one search page.
+            for n in range(1500):
+                yield StorageRecord(id=str(n), name=f"Segment {n}", condition="profile@id exists")
+
+    monkeypatch.setattr(segment, "storage_manager", lambda index: StorageMock())
+
+    records = asyncio.run(segment.load_enabled())
+
+    assert len(records) == 1500
+    assert queries == [{"query": {"query_string": {"query": "NOT enabled:false"}}}]
+
+
+def test_segment_registry_reloads_after_marker_change():
+    redis = RedisMock()
+    registry = SegmentRegistry(ttl=30, sync_interval=0, redis=redis)
+    other = SegmentRegistry(ttl=30, sync_interval=0, redis=redis)
+    loaded = [segments[:1]]
+
+    async def load_segments():
+        return loaded[0]
+
+    async def get(registry):
+        result = await registry.get(["purchase"], load_segments)
+        if registry._refresh_task is not None:
+            await registry._refresh_task
+        return [segment.id for _, segment in await registry.get(["purchase"], load_segments)]
+
+    async def main():
+        assert await get(registry) == await get(other) == ["has-age"]
+
+        # Segment saved by other process.
+        loaded[0] = segments[:2]
+        await other.mark_changed()
+
+        return await get(registry), await get(other)
+
+    assert asyncio.run(main()) == (["has-age", "all-events"], ["has-age", "all-events"])
+
+
+def test_save_segment_refreshes_index_before_marking_change(monkeypatch):
+    from tracardi.service.storage.drivers.elastic import segment
+
+    calls = []
+
+    class StorageMock:
+
+        async def upsert(self, data):
+            calls.append("upsert")
+
+        async def refresh(self):
+            calls.append("refresh")
+
+    async def mark_changed():
+        calls.append("mark_changed")
+
+    monkeypatch.setattr(segment, "storage_manager", lambda index: StorageMock())
+    monkeypatch.setattr(segment.segment_registry, "mark_changed", mark_changed)
+
+    asyncio.run(segment.save({"id": "1"}))
+
+    assert calls == ["upsert", "refresh", "mark_changed"]
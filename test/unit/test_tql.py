@@ -6,7 +6,12 @@ from tracardi.domain.flow import Flow, FlowSchema
 from tracardi.domain.resource import Resource
 from tracardi.process_engine.tql.parser import Parser
 from tracardi.process_engine.tql.transformer.expr_transformer import ExprTransformer
+from tracardi.process_engine.tql.condition import Condition
+from tracardi.process_engine.tql.domain.missing_value import MissingValue
+from lark import Tree
 from lark.exceptions import VisitError
+from time import perf_counter
+import ast
 import pytest
 
 payload = {
@@ -38,7 +43,7 @@ event = Event(id="event-id",
               profile=profile,
               session=session,
               )
-flow = Flow(id="flow-id", name="flow", wf_schema=FlowSchema(version="0.g.0"))
+flow = Flow(id="flow-id", name="flow", wf_schema=FlowSchema(version="0.g.0"), type="collection")
 dot = DotAccessor(profile, session, payload, event, flow)
 
 parser = Parser(Parser.read('grammar/uql_expr.lark'), start='expr')
@@ -576,3 +581,170 @@ def test_should_use_exists_before_checking_the_missing_value_in_complex_conditio
     tree = parser.parse(
         "(payload@a.missing EXISTS AND datetime.offset(payload@a.missing, \"-1m\") < now()) OR payload@a.text EXISTS")
     assert ExprTransformer(dot=dot).transform(tree)
+
+
+def _tql_corpus():
+    # All conditions parsed in this test module.
+    with open(__file__) as f:
+        module = ast.parse(f.read())
+
+    corpus = []
+    for node in ast.walk(module):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and isinstance(node.func.value, ast.Name) and node.func.value.id == 'parser' \
+                and node.func.attr == 'parse' and node.args and isinstance(node.args[0], ast.Constant):
+            if node.args[0].value not in corpus:
+                corpus.append(node.args[0].value)
+    return corpus
+
+
+def _outcome(func):
+    try:
+        result = func()
+    except Exception as e:
+        return 'error', type(e)
+    if isinstance(result, MissingValue):
+        return 'missing', str(result)
+    return 'value', result
+
+
+def test_compiled_condition_returns_the_same_results_as_transformer():
+    condition = Condition()
+    corpus = _tql_corpus()
+    assert len(corpus) > 100
+
+    for query in corpus:
+        if 'now()' in query:
+            # Time dependent
+            continue
+        try:
+            tree = parser.parse(query)
+        except Exception:
+            continue
+
+        expected = _outcome(lambda: ExprTransformer(dot=dot).transform(tree))
+        assert _outcome(lambda: condition.compile(query)(dot)) == expected, query
+
+
+def test_compiled_condition_is_cached():
+    condition = Condition()
+    query = "payload@a.d.aa between 1 and 2 and payload@a.e == \"test\""
+    assert condition.compile(query) is condition.compile(query)
+    assert condition.parse(query) is condition.parse(query)
+
+
+def test_cached_and_compiled_condition_return_parse_result():
+    condition = Condition()
+    queries = [
+        "payload@a.d.aa between 1 and 2 and payload@a.e == \"test\" and payload@a.c NOT EMPTY",
+        "payload@a.d.aa between 5 and 6 or payload@a.e != \"test\"",
+    ]
+
+    for query in queries:
+        expected = ExprTransformer(dot=dot).transform(parser.parse(query))
+        # Repeated calls use cached tree and compiled closures.
+        for _ in range(2):
+            assert ExprTransformer(dot=dot).transform(condition.parse(query)) == expected, query
+            assert condition.compile(query)(dot) == expected, query
+
+
+def test_tql_evaluation_benchmark():
+    condition = Condition()
+    query = "payload@a.d.aa between 1 and 2 and payload@a.e == \"test\" and payload@a.c NOT EMPTY"
+    repeats = 200
+
+    start = perf_counter()
+    for _ in range(repeats):
+        assert ExprTransformer(dot=dot).transform(parser.parse(query))
+    parse_per_call = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(repeats):
+        assert ExprTransformer(dot=dot).transform(condition.parse(query))
+    cached_tree = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(repeats):
+        assert condition.compile(query)(dot)
+    compiled = perf_counter() - start
+
+    # Timings are only printed, they depend on the machine.
+    print(f"\nTQL x{repeats}: parse per call {parse_per_call:.4f}s, cached tree {cached_tree:.4f}s, "
+          f"compiled {compiled:.4f}s")
+
+
+lalr_parser = Parser(Parser.read('grammar/uql_expr_lalr.lark'),
+                     start='expr',
+                     parser='lalr',
+                     fallback=Parser.read('grammar/uql_expr.lark'))
+
+filter_parser = Parser(Parser.read('grammar/filter_condition.lark'), start='expr')
+filter_lalr_parser = Parser(Parser.read('grammar/filter_condition_lalr.lark'),
+                            start='expr',
+                            parser='lalr',
+                            fallback=Parser.read('grammar/filter_condition.lark'))
+
+filter_corpus = [
+    'a=1', 'a.b = 1 AND c=2', 'a=1 and b=2 and c=3', 'a=1 or b=2 or c=3', '(a=1 or b=2) and c=3',
+    'a=1 and (b=2 or c=3)', 'a between 1 and 2', 'a is null', 'a exists', 'a not exists', 'a = b',
+    'a = "x"', 'a=1.5', 'a=1e3', 'a=10m', 'a=true', 'a=null', 'a=[1,2]', 'a=[]', 'a = [1, "a", true]',
+    'a = datetime(1)', 'lower(a) = 1', 'a.b-c = x.y', 'a >= now()', 'a=abc', 'a=nullable', 'a=10x',
+    'a != 1.', 'a < .5', 'a = 1e-3', 'lower(a) = upper(b)', 'a between datetime(1) and 2', '((a=1))',
+    'a = 1 AND b not exists AND c is null', 'event.type = "page-view" and profile.id exists',
+    'a=true and b=false', 'a=1 and b=2 or c=3'
+]
+
+
+def _normalize(tree):
+    # Earley resolves ambiguous AND/OR chains in random associativity. Compare flattened chains.
+    if not isinstance(tree, Tree):
+        return tree
+    children = []
+    for child in tree.children:
+        child = _normalize(child)
+        if tree.data in ('and_expr', 'or_expr') and isinstance(child, Tree) and child.data == tree.data:
+            children.extend(child.children)
+        else:
+            children.append(child)
+    return Tree(tree.data, children)
+
+
+def _assert_same_trees(earley, lalr, corpus):
+    for query in corpus:
+        expected = _outcome(lambda: _normalize(earley.parse(query)))
+        if expected[0] == 'error':
+            # Both parsers must reject the query
+            assert _outcome(lambda: lalr.parse(query))[0] == 'error', query
+        else:
+            assert _outcome(lambda: _normalize(lalr.parse(query))) == expected, query
+
+
+def test_lalr_uql_grammar_returns_the_same_trees_as_earley():
+    _assert_same_trees(parser, lalr_parser, _tql_corpus())
+
+
+def test_lalr_filter_grammar_returns_the_same_trees_as_earley():
+    _assert_same_trees(filter_parser, filter_lalr_parser, filter_corpus)
+
+
+def test_lalr_grammar_parses_common_conditions_without_fallback():
+    lalr_parser.base_parser.parse("payload@a.b == 1 and (payload@a.c exists or payload@a.e != \"test\")")
+    filter_lalr_parser.base_parser.parse('event.type = "page-view" and (profile.id exists or a = 1)')
+
+
+def test_lalr_parser_returns_the_same_tree_as_earley_without_fallback():
+    query = "payload@a.d.aa == 1 and payload@a.e == \"test\" and payload@a.c NOT EMPTY"
+
+    assert _normalize(lalr_parser.base_parser.parse(query)) == _normalize(parser.parse(query))
+
+
+def test_compiled_tree_transforms_tree_without_lark_userfunc_api(monkeypatch):
+    from tracardi.process_engine.tql import compiler
+
+    monkeypatch.setattr(compiler, "_has_userfunc_api", False)
+    query = "payload@a.d.aa between 1 and 2 and payload@a.e == \"test\""
+    tree = parser.parse(query)
+
+    compiled = compiler.CompiledTree(tree, dynamic_tokens={'OP_FIELD'})
+
+    assert compiled(ExprTransformer(dot=dot)) == ExprTransformer(dot=dot).transform(tree)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from tracardi.domain.entity import Entity
+from tracardi.domain.payload.tracker_payload import TrackerPayload
+from tracardi.service.batch_tracker import BatchTrackResult
+from tracardi.service.track_queue import MemoryTrackQueue, TrackQueueConsumer
+
+
+class TrackerMock:
+
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.batches = []
+
+    async def track(self, tracker_payloads, ip, profile_less, allowed_bridges, internal_source=None):
+        self.batches.append([tracker_payload.properties['n'] for tracker_payload in tracker_payloads])
+        results = []
+        for tracker_payload in tracker_payloads:
+            if tracker_payload.properties.get('fail', 0) > self.fail_times:
+                results.append(BatchTrackResult(error="Track failed"))
+            else:
+                results.append(BatchTrackResult(result={}))
+        return results
+
+
+def _message(n, profile_id="p1", **properties):
+    tracker_payload = TrackerPayload(source=Entity(id="source"), session=Entity(id=f"s{n}"),
+                                     profile=Entity(id=profile_id), properties={"n": n, **properties})
+    return {"payload": json.loads(tracker_payload.json()), "ip": "0.0.0.0", "profile_less": False,
+            "allowed_bridges": ["rest"]}
+
+
+def test_track_queue_partitions_by_profile():
+    queue = MemoryTrackQueue(partitions=8)
+    payloads = [TrackerPayload(source=Entity(id="source"), session=Entity(id=f"s{n}"), profile=Entity(id="p1"))
+                for n in range(10)]
+
+    assert len({queue.get_partition(payload) for payload in payloads}) == 1
+    assert len({queue.get_partition(TrackerPayload(source=Entity(id="source"), profile=Entity(id=f"p{n}")))
+                for n in range(100)}) == 8
+
+
+def test_track_queue_consumer_acks_retries_and_dead_letters():
+    queue = MemoryTrackQueue(partitions=1)
+    tracker = TrackerMock()
+    consumer = TrackQueueConsumer(queue, batch_size=3, linger=0.01, retries=2, backoff=0, tracker=tracker)
+
+    async def track(tracker_payloads, *args, **kwargs):
+        results = await TrackerMock.track(tracker, tracker_payloads, *args, **kwargs)
+        # Retried messages fail less and less.
+        tracker.fail_times += 1
+        return results
+
+    tracker.track = track
+
+    async def main():
+        await queue.publish(0, _message(0))
+        await queue.publish(0, _message(1, fail=2))
+        await queue.publish(0, _message(2, fail=10))
+        await queue.publish(0, {"payload": {}})
+        await queue.publish(0, _message(3))
+
+        while queue.size(0) > 0:
+            await consumer.process(0, await queue.get_batch(0, consumer.batch_size, consumer.linger, timeout=0.1))
+
+    asyncio.run(main())
+
+    # Failed tracks are retried in place, before the next messages of the partition.
+    assert tracker.batches == [[0, 1, 2], [1, 2], [1, 2], [3]]
+    assert [message.body['payload']['properties']['n'] for message in queue.acked] == [0, 1, 3]
+    # Invalid message is dead lettered at once, failing track after retries.
+    dead_letters = [message.body['payload'].get('properties', None) for message in queue.dead_letters]
+    assert dead_letters == [{"n": 2, "fail": 10}, None]
+    assert queue.size(0) == 0
+
+
+def test_track_queue_consumer_keeps_collection_time():
+    queue = MemoryTrackQueue(partitions=1)
+    tracker = TrackerMock()
+    consumer = TrackQueueConsumer(queue, batch_size=10, linger=0, tracker=tracker)
+    message = _message(0)
+
+    tracker_payload = consumer._to_tracker_payload(message)
+
+    assert tracker_payload.metadata.time.insert.isoformat() == message['payload']['metadata']['time']['insert']
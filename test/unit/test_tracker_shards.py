@@ -0,0 +1,142 @@
+import asyncio
+import os
+from time import time
+
+from tracardi.service.tracker_shards import HashRing, TrackerShards, get_shard_key
+
+
+async def _track(key, number):
+    # Later requests take less time, so they would finish first if they were not processed in order.
+    await asyncio.sleep(0.1 / (number + 1))
+    return os.getpid(), key, number, time()
+
+
+def test_hash_ring_moves_few_keys_when_shard_is_added():
+    keys = [f"profile:{n}" for n in range(1000)]
+    ring = HashRing(4, replicas=64)
+    bigger_ring = HashRing(5, replicas=64)
+
+    shards = [ring.get(key) for key in keys]
+    assert set(shards) == {0, 1, 2, 3}
+    assert min(shards.count(shard) for shard in range(4)) > 150
+    assert shards == [HashRing(4, replicas=64).get(key) for key in keys]
+
+    moved = [key for key in keys if ring.get(key) != bigger_ring.get(key)]
+    assert all(bigger_ring.get(key) == 4 for key in moved)
+    assert len(moved) < 350
+
+
+def test_get_shard_key():
+    assert get_shard_key("1", "2") == "profile:1"
+    assert get_shard_key(None, "2") == "session:2"
+    assert get_shard_key(None, None) is None
+
+
+def test_tracker_shards_process_tracks_of_the_same_key_in_one_process_in_order():
+    shards = TrackerShards(2, replicas=64, handler=_track)
+
+    async def main():
+        requests = [(f"profile:{n % 4}", n) for n in range(20)]
+        return await asyncio.gather(*[shards.submit(key, key, number) for key, number in requests])
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        shards.close()
+
+    pids_by_key = {}
+    finish_times_by_key = {}
+    for pid, key, number, finish_time in results:
+        pids_by_key.setdefault(key, set()).add(pid)
+        finish_times_by_key.setdefault(key, []).append(finish_time)
+        assert pid != os.getpid()
+    assert all(len(pids) == 1 for pids in pids_by_key.values())
+    assert all(times == sorted(times) for times in finish_times_by_key.values())
+
+
+def test_tracker_shards_finish_pending_tracks_on_shutdown():
+    shards = TrackerShards(1, replicas=64, handler=_track)
+
+    async def main():
+        track = asyncio.ensure_future(shards.submit("profile:1", "profile:1", 0))
+        await asyncio.sleep(0)
+        await shards.shutdown()
+        return await track
+
+    _, key, number, _ = asyncio.run(main())
+
+    assert (key, number) == ("profile:1", 0)
+    assert not shards._shards[0].is_alive()
+
+
+def test_get_track_shard_key_uses_profile_of_existing_session(monkeypatch):
+    from tracardi.domain.entity import Entity
+    from tracardi.domain.payload.tracker_payload import TrackerPayload
+    from tracardi.domain.session import Session, SessionMetadata
+    from tracardi.service.tracker import get_track_shard_key
+
+    sessions = {"s1": Session(id="s1", profile=Entity(id="p1"), metadata=SessionMetadata())}
+    loaded = []
+
+    async def load_by_id(id):
+        loaded.append(id)
+        return sessions.get(id, None)
+
+    monkeypatch.setattr("tracardi.service.storage.drivers.elastic.session.load_by_id", load_by_id)
+
+    def key(session_id, profile_id=None):
+        tracker_payload = TrackerPayload(source=Entity(id="source"), session=Entity(id=session_id),
+                                         profile=Entity(id=profile_id) if profile_id else None)
+        return asyncio.run(get_track_shard_key(tracker_payload))
+
+    # Tracks of the session before and after the client knows the profile id go to the same shard.
+    assert key("s1") == key("s1", "p1") == key("s2", "p1") == "profile:p1"
+    assert key("s3") == "session:s3"
+    # Session is loaded only for payloads without profile id.
+    assert loaded == ["s1", "s3"]
+
+
+def test_synchronized_event_tracking_keeps_profile_lock_with_many_dispatchers(monkeypatch):
+    from tracardi.config import tracardi
+    from tracardi.domain.entity import Entity
+    from tracardi.domain.payload.tracker_payload import TrackerPayload
+    from tracardi.service import tracker
+
+    calls = []
+
+    class Synchronizer:
+
+        def __init__(self, profile, wait, max_repeats):
+            pass
+
+        async def __aenter__(self):
+            calls.append("lock")
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            calls.append("unlock")
+
+    async def submit(key, *args):
+        calls.append(key)
+
+    async def get_track_shard_key(tracker_payload):
+        return "profile:p1"
+
+    monkeypatch.setattr(tracker, "ProfileTracksSynchronizer", Synchronizer)
+    monkeypatch.setattr(tracker, "get_track_shard_key", get_track_shard_key)
+    monkeypatch.setattr(tracker.tracker_shards, "is_enabled", lambda: True)
+    monkeypatch.setattr(tracker.tracker_shards, "submit", submit)
+    monkeypatch.setattr(tracardi, "sync_profile_tracks", True)
+
+    def track():
+        tracker_payload = TrackerPayload(source=Entity(id="source"), session=Entity(id="s1"),
+                                         profile=Entity(id="p1"))
+        asyncio.run(tracker.synchronized_event_tracking(tracker_payload, "0.0.0.0", False, ["rest"]))
+
+    monkeypatch.setattr(tracardi, "track_workers_single_dispatcher", False)
+    track()
+    assert calls == ["lock", "profile:p1", "unlock"]
+
+    calls.clear()
+    monkeypatch.setattr(tracardi, "track_workers_single_dispatcher", True)
+    track()
+    assert calls == ["profile:p1"]
@@ -28,14 +28,27 @@ class TracardiConfig:
         self.monitor_logs_event_type = env['MONITOR_LOGS_EVENT_TYPE'].lower().replace(" ", "-") \
             if 'MONITOR_LOGS_EVENT_TYPE' in env else None
         self.cache_profiles = (env['CACHE_PROFILE'].lower() == 'yes') if 'CACHE_PROFILE' in env else False
+        self.cache_sessions = (env['CACHE_SESSION'].lower() == 'yes') if 'CACHE_SESSION' in env else False
         self.sync_profile_tracks = (
                 env['SYNC_PROFILE_TRACKS'].lower() == 'yes') if 'SYNC_PROFILE_TRACKS' in env else False
         self.sync_profile_tracks_max_repeats = int(
             env['SYNC_PROFILE_TRACKS_MAX_REPEATS']) if 'SYNC_PROFILE_TRACKS_MAX_REPEATS' in env else 10
-        self.sync_profile_tracks_wait = int(
+        self.sync_profile_tracks_wait = float(
             env['SYNC_PROFILE_TRACKS_WAIT']) if 'SYNC_PROFILE_TRACKS_WAIT' in env else 1
+        self.sync_profile_tracks_lock_ttl = float(
+            env['SYNC_PROFILE_TRACKS_LOCK_TTL']) if 'SYNC_PROFILE_TRACKS_LOCK_TTL' in env else 15
         self.postpone_destination_sync = int(
             env['POSTPONE_DESTINATION_SYNC']) if 'POSTPONE_DESTINATION_SYNC' in env else 0
+        self.destination_queue = (env['DESTINATION_QUEUE'].lower() == 'yes') if 'DESTINATION_QUEUE' in env else False
+        self.destination_queue_size = int(
+            env['DESTINATION_QUEUE_SIZE']) if 'DESTINATION_QUEUE_SIZE' in env else 10000
+        self.destination_batch_size = int(
+            env['DESTINATION_BATCH_SIZE']) if 'DESTINATION_BATCH_SIZE' in env else 100
+        self.destination_batch_linger = float(
+            env['DESTINATION_BATCH_LINGER']) if 'DESTINATION_BATCH_LINGER' in env else 0.1
+        self.destination_retries = int(env['DESTINATION_RETRIES']) if 'DESTINATION_RETRIES' in env else 3
+        self.destination_retry_backoff = float(
+            env['DESTINATION_RETRY_BACKOFF']) if 'DESTINATION_RETRY_BACKOFF' in env else 1
         self.storage_driver = env['STORAGE_DRIVER'] if 'STORAGE_DRIVER' in env else 'elastic'
         self.query_language = env['QUERY_LANGUAGE'] if 'QUERY_LANGUAGE' in env else 'kql'
         self.tracardi_pro_host = env['TRACARDI_PRO_HOST'] if 'TRACARDI_PRO_HOST' in env else 'pro.tracardi.com'
@@ -45,6 +58,43 @@ class TracardiConfig:
         self.logging_level = _get_logging_level(env['LOGGING_LEVEL']) if 'LOGGING_LEVEL' in env else logging.WARNING
         self.version = Version(version=VERSION, name=NAME)
         self.tokens_in_redis = (env["TOKENS_IN_REDIS"].lower() == "yes") if "TOKENS_IN_REDIS" in env else True
+        self.resource_pool_size = int(env['RESOURCE_POOL_SIZE']) if 'RESOURCE_POOL_SIZE' in env else 10
+        self.resource_pool_max = int(env['RESOURCE_POOL_MAX']) if 'RESOURCE_POOL_MAX' in env else 64
+        self.resource_pool_idle_ttl = int(
+            env['RESOURCE_POOL_IDLE_TTL']) if 'RESOURCE_POOL_IDLE_TTL' in env else 300
+        self.http_pool_limit_per_host = int(
+            env['HTTP_POOL_LIMIT_PER_HOST']) if 'HTTP_POOL_LIMIT_PER_HOST' in env else 32
+        self.http_pool_max_hosts = int(env['HTTP_POOL_MAX_HOSTS']) if 'HTTP_POOL_MAX_HOSTS' in env else 256
+        self.http_pool_idle_ttl = int(env['HTTP_POOL_IDLE_TTL']) if 'HTTP_POOL_IDLE_TTL' in env else 300
+        self.http_keepalive_timeout = float(
+            env['HTTP_KEEPALIVE_TIMEOUT']) if 'HTTP_KEEPALIVE_TIMEOUT' in env else 30
+        self.http_dns_cache_ttl = int(env['HTTP_DNS_CACHE_TTL']) if 'HTTP_DNS_CACHE_TTL' in env else 300
+        self.track_workers = int(env['TRACK_WORKERS']) if 'TRACK_WORKERS' in env else 0
+        self.track_worker_replicas = int(env['TRACK_WORKER_REPLICAS']) if 'TRACK_WORKER_REPLICAS' in env else 64
+        # Set it only if all /track requests go through one dispatcher process (one api worker). Then shard
+        # workers replace the distributed profile lock (SYNC_PROFILE_TRACKS).
+        self.track_workers_single_dispatcher = (env['TRACK_WORKERS_SINGLE_DISPATCHER'].lower() == 'yes') \
+            if 'TRACK_WORKERS_SINGLE_DISPATCHER' in env else False
+        self.track_batch_concurrency = int(env['TRACK_BATCH_CONCURRENCY']) if 'TRACK_BATCH_CONCURRENCY' in env else 10
+        self.track_queue_uri = env['TRACK_QUEUE_URI'] if 'TRACK_QUEUE_URI' in env else 'amqp://127.0.0.1:5672//'
+        self.track_queue_name = env['TRACK_QUEUE_NAME'] if 'TRACK_QUEUE_NAME' in env else 'tracardi-track'
+        self.track_queue_partitions = int(env['TRACK_QUEUE_PARTITIONS']) if 'TRACK_QUEUE_PARTITIONS' in env else 8
+        self.track_queue_consume_partitions = [int(partition) for partition in
+                                               env['TRACK_QUEUE_CONSUME_PARTITIONS'].split(',')] \
+            if 'TRACK_QUEUE_CONSUME_PARTITIONS' in env else None
+        self.track_queue_prefetch = int(env['TRACK_QUEUE_PREFETCH']) if 'TRACK_QUEUE_PREFETCH' in env else 200
+        self.track_queue_batch_size = int(env['TRACK_QUEUE_BATCH_SIZE']) if 'TRACK_QUEUE_BATCH_SIZE' in env else 100
+        self.track_queue_batch_linger = float(
+            env['TRACK_QUEUE_BATCH_LINGER']) if 'TRACK_QUEUE_BATCH_LINGER' in env else 0.1
+        self.track_queue_retries = int(env['TRACK_QUEUE_RETRIES']) if 'TRACK_QUEUE_RETRIES' in env else 3
+        self.track_queue_retry_backoff = float(
+            env['TRACK_QUEUE_RETRY_BACKOFF']) if 'TRACK_QUEUE_RETRY_BACKOFF' in env else 1
+        # Independent branches of workflow run concurrently only if it is more than 1.
+        self.workflow_concurrency = int(env['WORKFLOW_CONCURRENCY']) if 'WORKFLOW_CONCURRENCY' in env else 1
+        self.workflow_background_concurrency = int(
+            env['WORKFLOW_BACKGROUND_CONCURRENCY']) if 'WORKFLOW_BACKGROUND_CONCURRENCY' in env else 16
+        self.workflow_background_queue_size = int(
+            env['WORKFLOW_BACKGROUND_QUEUE_SIZE']) if 'WORKFLOW_BACKGROUND_QUEUE_SIZE' in env else 1000
 
 
 class MemoryCacheConfig:
@@ -52,6 +102,22 @@ class MemoryCacheConfig:
         self.source_ttl = int(env['SOURCE_TTL']) if 'SOURCE_TTL' in env else 60
         self.tags_ttl = int(env['TAGS_TTL']) if 'TAGS_TTL' in env else 60
         self.event_validator_ttl = int(env['EVENT_VALIDATOR_TTL']) if 'EVENT_VALIDATOR_TTL' in env else 180
+        self.event_validator_cache_size = int(
+            env['EVENT_VALIDATOR_CACHE_SIZE']) if 'EVENT_VALIDATOR_CACHE_SIZE' in env else 256
+        self.flow_cache_size = int(env['FLOW_CACHE_SIZE']) if 'FLOW_CACHE_SIZE' in env else 256
+        self.tql_cache_size = int(env['TQL_CACHE_SIZE']) if 'TQL_CACHE_SIZE' in env else 1024
+        self.reshape_cache_size = int(env['RESHAPE_CACHE_SIZE']) if 'RESHAPE_CACHE_SIZE' in env else 1024
+        self.segment_ttl = int(env['SEGMENT_TTL']) if 'SEGMENT_TTL' in env else 30
+        self.segment_registry_sync_interval = int(
+            env['SEGMENT_REGISTRY_SYNC_INTERVAL']) if 'SEGMENT_REGISTRY_SYNC_INTERVAL' in env else 5
+        self.destination_ttl = int(env['DESTINATION_TTL']) if 'DESTINATION_TTL' in env else 30
+        self.entity_cache_size = int(env['ENTITY_CACHE_SIZE']) if 'ENTITY_CACHE_SIZE' in env else 10000
+        self.entity_cache_ttl = int(env['ENTITY_CACHE_TTL']) if 'ENTITY_CACHE_TTL' in env else 3600
+        self.index_locator_size = int(env['INDEX_LOCATOR_SIZE']) if 'INDEX_LOCATOR_SIZE' in env else 100000
+        self.rule_index_sync_interval = int(
+            env['RULE_INDEX_SYNC_INTERVAL']) if 'RULE_INDEX_SYNC_INTERVAL' in env else 5
+        self.rule_index_full_reload = int(
+            env['RULE_INDEX_FULL_RELOAD']) if 'RULE_INDEX_FULL_RELOAD' in env else 60
 
 
 class ElasticConfig:
@@ -90,6 +156,16 @@ class ElasticConfig:
             if 'ELASTIC_REFRESH_PROFILES_AFTER_SAVE' in env else False
         self.logging_level = _get_logging_level(env['ELASTIC_LOGGING_LEVEL']) if 'ELASTIC_LOGGING_LEVEL' in env \
             else logging.WARNING
+        self.write_behind_indices = [index.strip() for index in env['ELASTIC_WRITE_BEHIND_INDICES'].split(",")
+                                     if index.strip()] if 'ELASTIC_WRITE_BEHIND_INDICES' in env else []
+        self.write_behind_batch_size = int(
+            env['ELASTIC_WRITE_BEHIND_BATCH_SIZE']) if 'ELASTIC_WRITE_BEHIND_BATCH_SIZE' in env else 500
+        self.write_behind_flush_interval = float(
+            env['ELASTIC_WRITE_BEHIND_FLUSH_INTERVAL']) if 'ELASTIC_WRITE_BEHIND_FLUSH_INTERVAL' in env else 0.05
+        # Write behind buffer is per process. Reads of buffered documents are reliable only if all requests
+        # are served by one process.
+        self.write_behind_single_process = (env['ELASTIC_WRITE_BEHIND_SINGLE_PROCESS'].lower() == 'yes') \
+            if 'ELASTIC_WRITE_BEHIND_SINGLE_PROCESS' in env else False
 
 
 class RedisConfig:
@@ -97,6 +173,7 @@ class RedisConfig:
     def __init__(self, env):
         self.redis_host = env['REDIS_HOST'] if 'REDIS_HOST' in env else 'redis://localhost:6379'
         self.redis_password = env['REDIS_PASSWORD'] if 'REDIS_PASSWORD' in env else None
+        self.redis_max_connections = int(env['REDIS_MAX_CONNECTIONS']) if 'REDIS_MAX_CONNECTIONS' in env else 64
 
     def get_redis_with_password(self):
         if not self.redis_host.startswith('redis://'):
@@ -1,3 +1,6 @@
+import json
+from hashlib import sha1
+
 import jsonschema
 from pydantic import BaseModel, validator
 from typing import Dict, List
@@ -50,6 +53,11 @@ class EventTypeManager(BaseModel):
     tags: List[str] = []
     validation: ValidationSchema
     reshaping: Optional[ReshapeSchema] = ReshapeSchema()
+    # Hash of validation schema. It is set when event type is cached, so it is not computed for every event.
+    schema_revision: Optional[str] = None
+
+    def set_schema_revision(self):
+        self.schema_revision = sha1(json.dumps(self.validation.json_schema, sort_keys=True).encode()).hexdigest()
 
     def encode(self) -> 'EventPayloadValidatorRecord':
         return EventPayloadValidatorRecord(
@@ -1,4 +1,5 @@
 import uuid
+from hashlib import sha1
 from tracardi.service.wf.domain.flow import Flow as GraphFlow
 from .named_entity import NamedEntity
 from .value_object.storage_info import StorageInfo
@@ -89,10 +90,14 @@ class Flow(GraphFlow):
     def from_workflow_record(record: 'FlowRecord', output) -> 'Flow':
         if output == 'draft':
             decrypted = decrypt(record.draft)
+            revision = None
         else:
             decrypted = decrypt(record.production)
+            # Production revision identifies deployed version of the flow. It is used to cache compiled flows.
+            revision = sha1(record.production.encode()).hexdigest() if record.production else None
         flow = Flow(**decrypted)
         flow.type = record.type
+        flow.set_revision(revision)
         return flow
 
     @staticmethod
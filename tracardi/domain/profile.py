@@ -1,9 +1,10 @@
 import uuid
 from collections import defaultdict
+from copy import deepcopy
 from datetime import datetime
-from typing import Optional, List, Callable, Dict
+from typing import Optional, List, Callable, Dict, Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from pydantic.utils import deep_update
 from tracardi.service.notation.dot_accessor import DotAccessor
 from .entity import Entity
@@ -16,8 +17,7 @@ from .value_object.storage_info import StorageInfo
 from ..service.dot_notation_converter import DotNotationConverter
 from .profile_stats import ProfileStats
 from ..service.merger import merge
-from .segment import Segment
-from ..process_engine.tql.condition import Condition
+from ..service.profile_delta import ProfileDelta, diff, MISSING
 
 
 class ConsentRevoke(BaseModel):
@@ -34,6 +34,56 @@ class Profile(Entity):
     interests: Optional[dict] = {}
     consents: Optional[Dict[str, ConsentRevoke]] = {}
     active: bool = True
+    _changes: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _tracking: bool = PrivateAttr(False)
+
+    def __setattr__(self, name, value):
+        # Profile remembers the value of field before the first change. See get_changes.
+        if self._tracking and name in self.__fields__ and name != 'operation' and name not in self._changes:
+            self._changes[name] = self.__dict__.get(name, MISSING)
+        super().__setattr__(name, value)
+
+    def mark_changed(self, *fields: str):
+
+        """
+        Marks fields that will be changed in place, e.g. profile.traits.private['a'] = 1. Must be called before
+        the change, so the old value can be remembered. Assignments to profile fields (profile.traits = ...,
+        profile.replace(...)) are tracked without marking.
+        """
+
+        if not self._tracking:
+            return
+
+        for field in fields:
+            if field in self.__fields__ and field not in self._changes:
+                self._changes[field] = deepcopy(self.__dict__.get(field, MISSING))
+
+    def reset_changes(self):
+
+        """
+        Starts tracking of profile changes. Changes are tracked until get_changes is called.
+        """
+
+        self._changes = {}
+        self._tracking = True
+
+    def has_changes(self) -> bool:
+        return bool(self._changes)
+
+    def get_changes(self) -> ProfileDelta:
+
+        """
+        Returns changes made to profile since reset_changes and stops tracking. Only changed fields
+        are compared, so the cost does not depend on the size of unchanged data.
+        """
+
+        self._tracking = False
+
+        changes = {}
+        for field, old in self._changes.items():
+            for path, old_value, new_value in diff(old, self.__dict__.get(field, MISSING), field):
+                changes[path] = (old_value, new_value)
+        return ProfileDelta(changes)
 
     def replace(self, profile: 'Profile'):
         if isinstance(profile, Profile):
@@ -74,50 +124,45 @@ class Profile(Entity):
 
         return disabled_profiles
 
-    async def segment(self, event_types, load_segments):
+    async def segment(self, segments: list):
 
         """
-        This method mutates current profile. Loads segments and adds segments to current profile.
+        This method mutates current profile. Evaluates segments and adds segments to current profile.
+        Segments is a list of (event type, segment) pairs returned by segment registry. Each segment
+        is evaluated only once even if it is assigned to many event types.
         """
 
-        # todo cache segments for 30 sec
         flat_profile = DotAccessor(
-            profile=self
+            profile=self,
             # it has access only to profile. Other data is irrelevant because we check only profile.
+            lazy=True
         )
 
-        for event_type in event_types:  # type: str
-
-            # Segmentation is run for every event
-
-            # todo segments are loaded one by one - maybe it is possible to load it at once
-            # todo segments are loaded event if they are disabled. It is checked later. Maybe we can filter it here.
-            segments = await load_segments(event_type, limit=500)
-
-            for segment in segments:
+        # Evaluate all segments before profile is changed. Lazy accessor reads current profile values.
+        results = {}
+        for _, segment in segments:
 
-                segment = Segment(**segment)
+            if segment.id not in results:
+                try:
+                    results[segment.id] = (segment.evaluate(flat_profile), None)
+                except Exception as e:
+                    msg = 'Condition id `{}` could not evaluate `{}`. The following error was raised: `{}`'.format(
+                        segment.id, segment.segment.condition, str(e).replace("\n", " "))
+                    results[segment.id] = (False, msg)
 
-                if segment.enabled is False:
-                    continue
+        for event_type, segment in segments:
 
-                segment_id = segment.get_id()
+            triggered, error = results[segment.id]
 
-                try:
-                    condition = Condition()
-                    if await condition.evaluate(segment.condition, flat_profile):
-                        segments = set(self.segments)
-                        segments.add(segment_id)
-                        self.segments = list(segments)
+            if error is not None:
+                yield event_type, segment.id, error
 
-                        # Yield only if segmentation triggered
-                        yield event_type, segment_id, None
-
-                except Exception as e:
-                    msg = 'Condition id `{}` could not evaluate `{}`. The following error was raised: `{}`'.format(
-                        segment_id, segment.condition, str(e).replace("\n", " "))
+            elif triggered:
+                if segment.id not in self.segments:
+                    self.segments = self.segments + [segment.id]
 
-                    yield event_type, segment_id, msg
+                # Yield only if segmentation triggered
+                yield event_type, segment.id, None
 
     async def merge(self, load_profiles_to_merge_callable: Callable, limit: int = 2000,
                     override_old_data: bool = True) -> Optional['Profiles']:
@@ -165,10 +210,12 @@ class Profile(Entity):
         return None
 
     def increase_visits(self, value=1):
+        self.mark_changed('stats')
         self.stats.visits += value
         self.operation.update = True
 
     def increase_views(self, value=1):
+        self.mark_changed('stats')
         self.stats.views += value
         self.operation.update = True
 
@@ -1,6 +1,5 @@
 import json
 import ssl
-import aiohttp
 import certifi
 from pydantic import BaseModel, AnyHttpUrl
 from tracardi.service.tracardi_http_client import HttpClient
@@ -29,13 +28,10 @@ class CiviCRMClient:
 
     async def add_contact(self, data):
         ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with HttpClient(
-            self.retries,
-            200,
-            connector=aiohttp.TCPConnector(ssl=ssl_context)
-        ) as client:
+        async with HttpClient(self.retries, 200) as client:
             async with client.post(
                 url=self.api_url,
+                ssl=ssl_context,
                 params={
                     "api_key": self.api_key,
                     "key": self.site_key,
@@ -52,13 +48,10 @@ class CiviCRMClient:
 
     async def get_custom_fields(self):
         ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with HttpClient(
-                self.retries,
-                200,
-                connector=aiohttp.TCPConnector(ssl=ssl_context)
-        ) as client:
+        async with HttpClient(self.retries, 200) as client:
             async with client.get(
                 url=self.api_url,
+                ssl=ssl_context,
                 params={
                     "api_key": self.api_key,
                     "key": self.site_key,
@@ -3,9 +3,10 @@ from .configuration import MongoConfiguration
 
 
 class MongoClient:
-    def __init__(self, config: MongoConfiguration):
+    def __init__(self, config: MongoConfiguration, max_pool_size: int = 100):
         self.config = config
-        self.client = AsyncIOMotorClient(config.uri, serverSelectionTimeoutMS=config.timeout)
+        self.client = AsyncIOMotorClient(config.uri, serverSelectionTimeoutMS=config.timeout,
+                                         maxPoolSize=max_pool_size)
 
     async def find(self, database, collection, query):
         database = self.client[database]
@@ -21,4 +22,4 @@ class MongoClient:
 
     async def close(self):
         if self.client:
-            await self.client.close()
+            self.client.close()
@@ -1,8 +1,10 @@
 import json
 from json import JSONDecodeError
 
+from tracardi.config import tracardi
 from tracardi.domain.resource_config import ResourceConfig
 from tracardi.service.plugin.plugin_endpoint import PluginEndpoint
+from tracardi.service.resource_pool import resource_pool
 from tracardi.service.storage.driver import storage
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form, FormGroup, FormField, FormComponent
 from tracardi.service.plugin.runner import ActionRunner
@@ -23,28 +25,32 @@ def validate(config: dict) -> PluginConfiguration:
 class MongoConnectorAction(ActionRunner):
 
     config: PluginConfiguration
-    client: MongoClient
+    resource_id: str
+    mongo_config: MongoConfiguration
 
     async def set_up(self, init):
         config = PluginConfiguration(**init)
         resource = await storage.driver.resource.load(config.source.id)
 
-        mongo_config = resource.credentials.get_credentials(self, output=MongoConfiguration)  # type: MongoConfiguration
-        self.client = MongoClient(mongo_config)
+        self.resource_id = resource.id
+        self.mongo_config = resource.credentials.get_credentials(self, output=MongoConfiguration)
         self.config = config
 
+    async def _open_client(self) -> MongoClient:
+        return MongoClient(self.mongo_config, max_pool_size=tracardi.resource_pool_size)
+
     async def run(self, payload: dict, in_edge=None) -> Result:
         try:
             query = json.loads(self.config.query)
         except JSONDecodeError as e:
             raise ValueError("Can not parse this data as JSON. Error: `{}`".format(str(e)))
 
-        result = await self.client.find(self.config.database.id, self.config.collection.id, query)
+        async with resource_pool.borrow(self.resource_id, "mongo", self.mongo_config,
+                                        open=self._open_client,
+                                        close=lambda client: client.close()) as client:
+            result = await client.find(self.config.database.id, self.config.collection.id, query)
         return Result(port="payload", value={"result": result})
 
-    # async def close(self):
-    #     await self.client.close()
-
 
 class Endpoint(PluginEndpoint):
 
@@ -10,9 +10,9 @@ class Connection(BaseModel):
     host: str
     port: int = 3306
 
-    async def connect(self, timeout=None):
+    async def connect(self, timeout=None, maxsize=10):
         loop = asyncio.get_event_loop()
         return await aiomysql.create_pool(host=self.host, port=self.port,
                                           user=self.user, password=self.password,
                                           db=self.database, loop=loop,
-                                          connect_timeout=timeout)
+                                          connect_timeout=timeout, maxsize=maxsize)
@@ -1,9 +1,11 @@
 import json
-from typing import Any
 
 import aiomysql
 from datetime import datetime, date
+
+from tracardi.config import tracardi
 from tracardi.service.notation.dict_traverser import DictTraverser
+from tracardi.service.resource_pool import resource_pool
 from tracardi.service.storage.driver import storage
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form, FormGroup, FormField, FormComponent, \
     Documentation, PortDoc
@@ -19,29 +21,30 @@ def validate(config: dict) -> Configuration:
 
 class MysqlConnectorAction(ActionRunner):
 
+    resource_id: str
     connection: Connection
     config: Configuration
-    pool: Any
 
     async def set_up(self, init):
 
         configuration = validate(init)
         resource = await storage.driver.resource.load(configuration.source.id)
 
-        self.pool = None
         self.config = configuration
+        self.resource_id = resource.id
         self.connection = resource.credentials.get_credentials(self, output=Connection)
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         try:
-            self.pool = await self.connection.connect(self.config.timeout)
-
             # Prepare statement data
             template = DictTraverser(self._get_dot_accessor(payload))
             data = template.reshape(self.config.data)
             self.console.log("Executing query: {} with data: {}".format(self.config.query, data))
 
-            async with self.pool.acquire() as conn:
+            async with resource_pool.borrow(self.resource_id, "mysql", self.connection,
+                                            open=lambda: self.connection.connect(self.config.timeout,
+                                                                                 tracardi.resource_pool_size),
+                                            close=self._close_pool) as pool, pool.acquire() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cursor:
                     if self.config.type == 'call':
                         # todo implement
@@ -68,13 +71,10 @@ class MysqlConnectorAction(ActionRunner):
             self.console.error(str(e))
             return Result(port="error", value={"payload": payload, "error": str(e)})
 
-    async def close(self):
-        if self.pool:
-            self.pool.close()
-            await self.pool.wait_closed()
-
-    async def on_error(self, **kwargs):
-        await self.close()
+    @staticmethod
+    async def _close_pool(pool):
+        pool.close()
+        await pool.wait_closed()
 
     @staticmethod
     def to_dict(record):
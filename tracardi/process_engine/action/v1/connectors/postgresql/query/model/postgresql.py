@@ -15,3 +15,12 @@ class Connection(BaseModel):
                                      password=self.password,
                                      host=self.host,
                                      port=self.port)
+
+    async def create_pool(self, max_size: int = 10) -> asyncpg.Pool:
+        return await asyncpg.create_pool(database=self.database,
+                                         user=self.user,
+                                         password=self.password,
+                                         host=self.host,
+                                         port=self.port,
+                                         min_size=1,
+                                         max_size=max_size)
@@ -2,8 +2,8 @@ import json
 from datetime import datetime, date
 from decimal import Decimal
 
-import asyncpg
-
+from tracardi.config import tracardi
+from tracardi.service.resource_pool import resource_pool
 from tracardi.service.storage.driver import storage
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form, FormGroup, FormField, FormComponent, \
     Documentation, PortDoc
@@ -20,7 +20,8 @@ def validate(config: dict) -> Configuration:
 
 class PostgreSQLConnectorAction(ActionRunner):
 
-    db: asyncpg.connection.Connection
+    resource_id: str
+    connection: Connection
     timeout: int
     query: str
 
@@ -30,11 +31,15 @@ class PostgreSQLConnectorAction(ActionRunner):
 
         self.query = config.query
         self.timeout = config.timeout
-        self.db = await resource.credentials.get_credentials(self, Connection).connect()
+        self.resource_id = resource.id
+        self.connection = resource.credentials.get_credentials(self, Connection)
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         try:
-            result = await self.db.fetch(self.query, timeout=self.timeout)
+            async with resource_pool.borrow(self.resource_id, "postgresql", self.connection,
+                                            open=lambda: self.connection.create_pool(tracardi.resource_pool_size),
+                                            close=lambda pool: pool.close()) as pool:
+                result = await pool.fetch(self.query, timeout=self.timeout)
             result = [self.to_dict(record) for record in result]
             return Result(port="result", value={"result": result})
 
@@ -42,10 +47,6 @@ class PostgreSQLConnectorAction(ActionRunner):
             self.console.error(str(e))
             return Result(port="error", value={"payload": payload, "error": str(e)})
 
-    async def close(self):
-        if self.db:
-            await self.db.close()
-
     @staticmethod
     def to_dict(record):
 
@@ -1,8 +1,10 @@
-from kombu import Connection
+from tracardi.config import tracardi
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form, FormGroup, FormField, FormComponent, \
     Documentation, PortDoc
 from tracardi.service.plugin.runner import ActionRunner
 from tracardi.service.plugin.domain.result import Result
+from tracardi.service.rabbitmq.connection_pool import open_connection_pool, close_connection_pool
+from tracardi.service.resource_pool import resource_pool
 from tracardi.service.storage.driver import storage
 from .model.configuration import PluginConfiguration
 from .model.rabbit_configuration import RabbitSourceConfiguration
@@ -16,20 +18,26 @@ def validate(config: dict) -> PluginConfiguration:
 class RabbitPublisherAction(ActionRunner):
 
     config: PluginConfiguration
+    resource_id: str
     source: RabbitSourceConfiguration
 
     async def set_up(self, init):
         config = validate(init)
         resource = await storage.driver.resource.load(config.source.id)
 
+        self.resource_id = resource.id
         self.source = resource.credentials.get_credentials(self, output=RabbitSourceConfiguration)
         self.config = config
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         try:
-            with Connection(self.source.uri, connect_timeout=self.source.timeout) as conn:
-                queue_publisher = QueuePublisher(conn, config=self.config)
-                queue_publisher.publish(payload)
+            async with resource_pool.borrow(self.resource_id, "rabbitmq", self.source,
+                                            open=lambda: open_connection_pool(self.source.uri, self.source.timeout,
+                                                                              tracardi.resource_pool_size),
+                                            close=close_connection_pool) as pool:
+                with pool.acquire(block=True, timeout=self.source.timeout) as conn:
+                    queue_publisher = QueuePublisher(conn, config=self.config)
+                    queue_publisher.publish(payload)
         except Exception as e:
             self.console.error(str(e))
             return Result(port="error", value={"error": str(e), "payload": payload})
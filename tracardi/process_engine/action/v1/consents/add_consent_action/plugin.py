@@ -34,6 +34,7 @@ class ConsentAdder(ActionRunner):
                     "Consents must be defined as object, with keys as consent-id and value as bool.")
 
             consents = Consents(__root__=consents_data)
+            self.profile.mark_changed('consents')
             for consent_id, granted in consents:
                 if granted is True:
                     consent_type_data = await storage.driver.consent_type.get_by_id(consent_id)
@@ -25,6 +25,7 @@ class RequireConsentsAction(ActionRunner):
 
         consent_ids = [consent["id"] for consent in self.config.consent_ids]
 
+        self.profile.mark_changed('consents')
         profile_consents_copy = self.profile.consents
         for consent_id in profile_consents_copy:
             revoke = self.profile.consents[consent_id].revoke
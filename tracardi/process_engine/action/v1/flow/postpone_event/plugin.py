@@ -59,7 +59,7 @@ class PostponeEventAction(ActionRunner):
             ApiInstance().id
         )
         postponed_call.wait = self.config.delay
-        postponed_call.run(asyncio.get_running_loop())
+        await postponed_call.run(asyncio.get_running_loop())
         return None
 
 
@@ -61,12 +61,15 @@ class InjectAction(ActionRunner):
         elif self.config.destination == 'profile-pii':
             self.profile.pii = inject
         elif self.config.destination == 'profile-traits-public':
+            self.profile.mark_changed('traits')
             self.profile.traits.public = inject
         elif self.config.destination == 'profile-traits-private':
+            self.profile.mark_changed('traits')
             self.profile.traits.private = inject
         elif self.config.destination == 'profile-interests':
             self.profile.interests = inject
         elif self.config.destination == 'profile-counters':
+            self.profile.mark_changed('stats')
             self.profile.stats.counters = inject
         elif self.config.destination == 'profile-consents':
             self.profile.consents = inject
@@ -1,13 +1,13 @@
 import json
 from pprint import pprint
 
-import aiohttp
 from pydantic import BaseModel
 
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Documentation, PortDoc, MicroserviceConfig
 from tracardi.service.plugin.domain.result import Result
 from tracardi.service.plugin.runner import ActionRunner
 from tracardi.service.plugin.service import plugin_context
+from tracardi.service.tracardi_http_client import http_session_pool
 from tracardi.service.wf.domain.node import Node
 
 
@@ -51,11 +51,12 @@ class MicroserviceAction(ActionRunner):
                            f"?service_id={service_id}" \
                            f"&action_id={action_id}"
 
-        async with aiohttp.ClientSession(headers={
-            'Authorization': f"Bearer {microservice_credentials.token}"
-        }) as client:
+        async with http_session_pool.borrow(microservice_url) as client:
             async with client.post(
                     url=microservice_url,
+                    headers={
+                        'Authorization': f"Bearer {microservice_credentials.token}"
+                    },
                     json=config) as remote_response:
                 result = await remote_response.json()
                 if remote_response.status != 200:
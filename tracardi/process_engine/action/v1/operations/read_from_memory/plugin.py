@@ -2,7 +2,7 @@ from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Docu
     FormGroup, FormComponent
 from tracardi.service.plugin.runner import ActionRunner
 from .model.config import Config
-from tracardi.service.storage.redis_client import RedisClient
+from tracardi.service.storage.redis_client import AsyncRedisClient
 from tracardi.service.plugin.domain.result import Result
 from tracardi.service.secrets import b64_decoder
 
@@ -13,16 +13,16 @@ def validate(config: dict) -> Config:
 
 class ReadFromMemoryAction(ActionRunner):
 
-    client: RedisClient
+    client: AsyncRedisClient
     config: Config
 
     async def set_up(self, init):
         self.config = validate(init)
-        self.client = RedisClient()
+        self.client = AsyncRedisClient()
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         try:
-            result = self.client.client.get(name=f"TRACARDI-USER-MEMORY-{self.config.key}")
+            result = await self.client.client.get(name=f"TRACARDI-USER-MEMORY-{self.config.key}")
             return Result(port="success", value={"value": b64_decoder(result)})
 
         except Exception as e:
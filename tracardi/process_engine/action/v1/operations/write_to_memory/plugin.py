@@ -2,7 +2,7 @@ from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Docu
     FormGroup, FormComponent
 from tracardi.service.plugin.runner import ActionRunner
 from .model.config import Config
-from tracardi.service.storage.redis_client import RedisClient
+from tracardi.service.storage.redis_client import AsyncRedisClient
 from tracardi.service.plugin.domain.result import Result
 from tracardi.service.secrets import b64_encoder
 
@@ -13,12 +13,12 @@ def validate(config: dict) -> Config:
 
 class WriteToMemoryAction(ActionRunner):
 
-    client: RedisClient
+    client: AsyncRedisClient
     config: Config
 
     async def set_up(self, init):
         self.config = validate(init)
-        self.client = RedisClient()
+        self.client = AsyncRedisClient()
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         dot = self._get_dot_accessor(payload)
@@ -26,7 +26,7 @@ class WriteToMemoryAction(ActionRunner):
         value = b64_encoder(value)
 
         try:
-            self.client.client.set(
+            await self.client.client.set(
                 name=f"TRACARDI-USER-MEMORY-{self.config.key}",
                 value=value,
                 ex=self.config.ttl
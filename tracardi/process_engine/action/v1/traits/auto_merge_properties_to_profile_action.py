@@ -60,6 +60,7 @@ class AutoMergePropertiesToProfileAction(ActionRunner):
         if self.profile is not None:
 
             self.update_profile()
+            self.profile.mark_changed('traits')
 
             if self.config.traits_type == 'private':
                 self.profile.traits.private = self._update(self.profile.traits.private, self.event.properties)
@@ -5,6 +5,7 @@ from tracardi.domain.event import Event
 from tracardi.domain.profile import Profile
 from tracardi.domain.resource import Resource
 from tracardi.domain.session import Session
+from tracardi.service.destination_queue import DestinationDelivery
 
 
 class Connector:
@@ -16,3 +17,11 @@ class Connector:
 
     async def run(self, data, delta, profile: Profile, session: Session, events: List[Event]):
         pass
+
+    async def run_batch(self, deliveries: List[DestinationDelivery]):
+        """
+        Sends queued deliveries. Override it if the destination can receive many records in one request.
+        Profile, session and events of queued deliveries are entities with ids only.
+        """
+        for delivery in deliveries:
+            await self.run(*delivery.args())
@@ -16,6 +16,7 @@ from tracardi.exceptions.log_handler import log_handler
 from tracardi.process_engine.tql.utils.dictonary import flatten
 from tracardi.process_engine.action.v1.connectors.api_call.model.configuration import Method
 from tracardi.process_engine.destination.connector import Connector
+from tracardi.service.tracardi_http_client import http_session_pool
 
 logger = logging.getLogger(__name__)
 logger.setLevel(tracardi.logging_level)
@@ -80,10 +81,11 @@ class HttpConnector(Connector):
             self._validate_key_value(config.cookies, "Cookie")
 
             timeout = aiohttp.ClientTimeout(total=config.timeout)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session_pool.borrow(credentials.url) as session:
                 async with session.request(
                         method=config.method,
                         url=str(credentials.url),
+                        timeout=timeout,
                         headers=config.headers,
                         cookies=config.cookies,
                         ssl=config.ssl_check,
@@ -1,14 +1,16 @@
 from typing import List
 
 from .connector import Connector
-from kombu import Connection
 
+from ...config import tracardi
 from ...domain.event import Event
 from ...domain.profile import Profile
 from ...domain.session import Session
+from ...service.rabbitmq.connection_pool import open_connection_pool, close_connection_pool
 from ...service.rabbitmq.queue_config import QueueConfig
 from ...service.rabbitmq.queue_publisher import QueuePublisher
 from ...service.rabbitmq.rabbit_configuration import RabbitConfiguration
+from ...service.resource_pool import resource_pool
 
 
 class RabbitMqConnector(Connector):
@@ -23,6 +25,10 @@ class RabbitMqConnector(Connector):
 
         settings = QueueConfig(**self.destination.destination.init['queue'])
 
-        with Connection(configuration.uri, connect_timeout=configuration.timeout) as conn:
-            queue_publisher = QueuePublisher(conn, queue_config=settings)
-            queue_publisher.publish(data)
+        async with resource_pool.borrow(self.resource.id, "rabbitmq", configuration,
+                                        open=lambda: open_connection_pool(configuration.uri, configuration.timeout,
+                                                                          tracardi.resource_pool_size),
+                                        close=close_connection_pool) as pool:
+            with pool.acquire(block=True, timeout=configuration.timeout) as conn:
+                queue_publisher = QueuePublisher(conn, queue_config=settings)
+                queue_publisher.publish(data)
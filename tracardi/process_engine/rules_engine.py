@@ -3,7 +3,7 @@ import logging
 from asyncio import Task
 from collections import defaultdict
 from time import time
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from pydantic import ValidationError
 from tracardi.domain.event import Event
 
@@ -36,7 +36,7 @@ class RulesEngine:
     def __init__(self,
                  session: Session,
                  profile: Optional[Profile],
-                 events_rules: List[Tuple[List[Dict], Event]],
+                 events_rules: List[Tuple[List[Union[Rule, Dict]], Event]],
                  console_log=None
                  ):
 
@@ -68,24 +68,29 @@ class RulesEngine:
             for rule in rules:
 
                 # this is main roles loop
-                if 'name' in rule:
-                    invoked_rules[event.type].append(rule['name'])
+                if isinstance(rule, Rule):
+                    # Rules from rule index are already validated
+                    invoked_rules[event.type].append(rule.name)
 
-                try:
-                    rule = Rule(**rule)
-                except ValidationError as e:
-                    console = Console(
-                        origin="rule",
-                        event_id=event.id,
-                        flow_id=None,
-                        module=__name__,
-                        class_name='RulesEngine',
-                        type="error",
-                        message="Rule validation error: ".format(str(e)),
-                        traceback=get_traceback(e)
-                    )
-                    self.console_log.append(console)
-                    continue
+                else:
+                    if 'name' in rule:
+                        invoked_rules[event.type].append(rule['name'])
+
+                    try:
+                        rule = Rule(**rule)
+                    except ValidationError as e:
+                        console = Console(
+                            origin="rule",
+                            event_id=event.id,
+                            flow_id=None,
+                            module=__name__,
+                            class_name='RulesEngine',
+                            type="error",
+                            message="Rule validation error: ".format(str(e)),
+                            traceback=get_traceback(e)
+                        )
+                        self.console_log.append(console)
+                        continue
 
                 if not rule.enabled:
                     logger.info(f"Rule {rule.name} skipped. Rule is disabled.")
@@ -0,0 +1,59 @@
+from typing import Callable, Any, Set
+
+from lark import Tree, Token, Transformer
+from lark.visitors import Discard
+
+Evaluator = Callable[[Transformer], Any]
+
+_has_userfunc_api = hasattr(Transformer, '_call_userfunc') and hasattr(Transformer, '_call_userfunc_token')
+
+
+class CompiledTree:
+
+    """
+    Parse tree compiled into nested closures. Calling it with a transformer gives the same result as
+    transformer.transform(tree) but without walking the tree. Tokens that do not depend on the transformer
+    state are evaluated only once. Compiled tree must be always evaluated with the same transformer class.
+
+    Callbacks are called with Transformer._call_userfunc and _call_userfunc_token of lark (pinned in setup.py), so
+    v_args, __default__ and Discard work as in transform. If lark does not have them the tree is transformed.
+    """
+
+    def __init__(self, tree: Tree, dynamic_tokens: Set[str]):
+        self._dynamic_tokens = dynamic_tokens
+        if _has_userfunc_api:
+            self._evaluate = self._compile_tree(tree)
+        else:
+            self._evaluate = lambda transformer: transformer.transform(tree)
+
+    def __call__(self, transformer: Transformer) -> Any:
+        return self._evaluate(transformer)
+
+    def _compile(self, node) -> Evaluator:
+        if isinstance(node, Tree):
+            return self._compile_tree(node)
+        elif isinstance(node, Token):
+            return self._compile_token(node)
+        return lambda transformer: node
+
+    def _compile_tree(self, tree: Tree) -> Evaluator:
+        children = [self._compile(child) for child in tree.children]
+
+        def evaluate(transformer: Transformer):
+            args = [result for result in (child(transformer) for child in children) if result is not Discard]
+            return transformer._call_userfunc(tree, args)
+
+        return evaluate
+
+    def _compile_token(self, token: Token) -> Evaluator:
+        if token.type in self._dynamic_tokens:
+            return lambda transformer: transformer._call_userfunc_token(token)
+
+        value = []
+
+        def evaluate_once(transformer: Transformer):
+            if not value:
+                value.append(transformer._call_userfunc_token(token))
+            return value[0]
+
+        return evaluate_once
@@ -1,23 +1,55 @@
 import asyncio
+from typing import Callable, Any
 
+from tracardi.config import memory_cache
+from tracardi.service.lru_cache import LRUCache
 from tracardi.service.singleton import Singleton
 from tracardi.service.notation.dot_accessor import DotAccessor
 
+from tracardi.process_engine.tql.compiler import CompiledTree
 from tracardi.process_engine.tql.parser import Parser
 from tracardi.process_engine.tql.transformer.expr_transformer import ExprTransformer
 
 
+class CompiledCondition:
+
+    """
+    Condition compiled to a predicate. Call it with DotAccessor to evaluate the condition.
+    """
+
+    def __init__(self, condition: str, tree):
+        self.condition = condition
+        self._predicate = CompiledTree(tree, dynamic_tokens={'OP_FIELD'})
+
+    def __call__(self, dot: DotAccessor) -> Any:
+        return self._predicate(ExprTransformer(dot=dot))
+
+
 class Condition(metaclass=Singleton):
 
     def __init__(self):
-        self.parser = Parser(Parser.read('grammar/uql_expr.lark'), start='expr')
+        self.parser = Parser(Parser.read('grammar/uql_expr_lalr.lark'),
+                             start='expr',
+                             parser='lalr',
+                             fallback=Parser.read('grammar/uql_expr.lark'))
+        self._trees = LRUCache(memory_cache.tql_cache_size)
+        self._compiled = LRUCache(memory_cache.tql_cache_size)
 
     def parse(self, condition):
-        return self.parser.parse(condition)
+        tree = self._trees.get(condition)
+        if tree is None:
+            tree = self.parser.parse(condition)
+            self._trees[condition] = tree
+        return tree
+
+    def compile(self, condition) -> Callable[[DotAccessor], Any]:
+        compiled_condition = self._compiled.get(condition)
+        if compiled_condition is None:
+            compiled_condition = CompiledCondition(condition, self.parse(condition))
+            self._compiled[condition] = compiled_condition
+        return compiled_condition
 
     async def evaluate(self, condition, dot: DotAccessor):
-        # todo cache tree
-        tree = self.parse(condition)
+        predicate = self.compile(condition)
         await asyncio.sleep(0)
-        return ExprTransformer(dot=dot).transform(tree)
-
+        return predicate(dot)
@@ -1,6 +1,8 @@
 import asyncio
 
+from tracardi.config import memory_cache
 from tracardi.process_engine.tql.transformer.filter_transformer import FilterTransformer
+from tracardi.service.lru_cache import LRUCache
 from tracardi.service.singleton import Singleton
 from tracardi.service.notation.dot_accessor import DotAccessor
 from tracardi.process_engine.tql.parser import Parser
@@ -9,13 +11,20 @@ from tracardi.process_engine.tql.parser import Parser
 class FilterCondition(metaclass=Singleton):
 
     def __init__(self):
-        self.parser = Parser(Parser.read('grammar/filter_condition.lark'), start='expr')
+        self.parser = Parser(Parser.read('grammar/filter_condition_lalr.lark'),
+                             start='expr',
+                             parser='lalr',
+                             fallback=Parser.read('grammar/filter_condition.lark'))
+        self._trees = LRUCache(memory_cache.tql_cache_size)
 
     def parse(self, condition):
-        return self.parser.parse(condition)
+        tree = self._trees.get(condition)
+        if tree is None:
+            tree = self.parser.parse(condition)
+            self._trees[condition] = tree
+        return tree
 
     async def evaluate(self, condition, dot: DotAccessor):
-        # todo cache tree
         tree = self.parse(condition)
         await asyncio.sleep(0)
         return FilterTransformer(dot=dot).transform(tree)
@@ -1,12 +1,19 @@
 import os
 from lark import Lark
+from lark.exceptions import UnexpectedInput
 
 _local_dir = os.path.dirname(__file__)
 
 
 class Parser:
 
-    def __init__(self, grammar, start, parser='earley', transformer=None):
+    """
+    Lark parser. If fallback grammar is set then queries that the main grammar can not parse are parsed
+    with the fallback grammar using earley parser. This way a fast LALR grammar can be used for common
+    queries and earley grammar for the constructs that are ambiguous for LALR.
+    """
+
+    def __init__(self, grammar, start, parser='earley', transformer=None, fallback=None):
         import_paths = [
             os.path.join(_local_dir, 'grammar')
         ]
@@ -16,6 +23,13 @@ class Parser:
                                 parser=parser,
                                 transformer=self.transformer,
                                 import_paths=import_paths)
+        if fallback is not None:
+            self.fallback_parser = Lark(fallback,
+                                        start=start,
+                                        parser='earley',
+                                        import_paths=import_paths)
+        else:
+            self.fallback_parser = None
 
     @staticmethod
     def read(file):
@@ -23,5 +37,13 @@ class Parser:
             return f.read()
 
     def parse(self, query):
-        return self.base_parser.parse(query)
+        if self.fallback_parser is None:
+            return self.base_parser.parse(query)
 
+        try:
+            return self.base_parser.parse(query)
+        except UnexpectedInput:
+            tree = self.fallback_parser.parse(query)
+            if self.transformer is not None:
+                return self.transformer.transform(tree)
+            return tree
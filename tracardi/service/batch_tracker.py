@@ -0,0 +1,303 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from time import monotonic
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+from tracardi.config import tracardi
+from tracardi.domain.entity import Entity
+from tracardi.domain.event import Event
+from tracardi.domain.payload.tracker_payload import TrackerPayload
+from tracardi.domain.profile import Profile
+from tracardi.domain.session import Session
+from tracardi.domain.value_object.collect_result import CollectResult
+from tracardi.domain.value_object.save_result import SaveResult
+from tracardi.exceptions.exception import StorageException, FieldTypeConflictException
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.console_log import ConsoleLog
+from tracardi.service.storage.driver import storage
+from tracardi.service.synchronizer import ProfileTracksSynchronizer
+from tracardi.service.tracker import invoke_track_process, validate_payload_source, _prepare_events
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class BatchTrackResult(BaseModel):
+    time: float = 0
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+class BatchPersistence:
+
+    """
+    Collects profiles, sessions, events and console logs of the tracks in batch instead of saving them one by one.
+    save() saves them with one bulk request per index. Sessions are saved as whole documents.
+    """
+
+    def __init__(self):
+        self.profiles = {}  # type: Dict[str, Profile]
+        self.sessions = {}  # type: Dict[str, Session]
+        self.new_sessions = set()
+        self.events = []  # type: List[Event]
+        self.console_logs = []  # type: List[ConsoleLog]
+        # id of tracker payload -> (session, profile) after track
+        self.tracked = {}
+
+    async def persist(self, console_log: ConsoleLog, session: Session, events: List[Event],
+                      tracker_payload: TrackerPayload, profile: Optional[Profile] = None) -> CollectResult:
+
+        self.tracked[id(tracker_payload)] = (session, profile)
+
+        if isinstance(profile, Profile) and (profile.operation.new or profile.operation.needs_update()):
+            self.profiles[profile.id] = profile
+
+        if isinstance(session, Session) and tracker_payload.is_on('saveSession', default=True):
+            if session.operation.new:
+                # The same as in session.save_session
+                if session.profile is None or (isinstance(session.profile, Entity)
+                                               and isinstance(profile, Entity)
+                                               and session.profile.id != profile.id):
+                    if profile is not None:
+                        session.profile = Entity(id=profile.id)
+                self.new_sessions.add(session.id)
+            self.sessions[session.id] = session
+
+        events = await _prepare_events(tracker_payload, console_log, events)
+        if tracker_payload.is_on('saveEvents', default=True):
+            self.events += events
+
+        # Console log is encoded on save, so logs appended after persist are also saved.
+        self.console_logs.append(console_log)
+
+        return CollectResult(profile=SaveResult(), session=SaveResult(), events=SaveResult())
+
+    async def save(self):
+        tasks = []
+        if self.profiles:
+            tasks.append(storage.driver.profile.save_all(list(self.profiles.values())))
+        if self.sessions:
+            tasks.append(storage.driver.session.save_sessions(list(self.sessions.values())))
+        if self.events:
+            tasks.append(storage.driver.event.save_events(self.events, True))
+
+        console_log = [log for logs in self.console_logs for log in logs.get_encoded()]
+        if console_log:
+            tasks.append(storage.driver.console_log.save_all(console_log))
+
+        try:
+            await asyncio.gather(*tasks)
+            if self.new_sessions and not storage.driver.session.is_write_behind():
+                # See _save_session in tracker.
+                await storage.driver.session.refresh()
+        except StorageException as e:
+            raise FieldTypeConflictException("Could not save batch. Error: {}".format(str(e)), rows=e.details)
+
+
+class _Groups:
+
+    """
+    Union of keys. Tracks that share session or profile are in the same group.
+    """
+
+    def __init__(self):
+        self._parents = {}
+
+    def find(self, key: str) -> str:
+        parent = self._parents.setdefault(key, key)
+        while parent != key:
+            grand_parent = self._parents[parent]
+            self._parents[key] = grand_parent
+            key, parent = parent, grand_parent
+        return key
+
+    def union(self, key: str, other: str):
+        self._parents[self.find(other)] = self.find(key)
+
+
+class BatchTracker:
+
+    """
+    Tracks many payloads at once. Sessions and profiles are loaded with one multi get each. Payloads are grouped by
+    profile (and session). Groups run concurrently (at most concurrency groups at a time), payloads of a group run
+    one after another in order of the batch and see the changes made by previous payloads. Everything is saved
+    at the end with a few bulk requests. If SYNC_PROFILE_TRACKS is on, profiles of the batch are locked from
+    loading until saving.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency if concurrency is not None else tracardi.track_batch_concurrency
+
+    async def _load_sessions(self, ids: List[str]) -> Dict[str, Session]:
+        return await storage.driver.session.load_many(ids)
+
+    async def _load_profiles(self, ids: List[str]) -> Dict[str, Profile]:
+        return await storage.driver.profile.load_many_merged_profiles(ids)
+
+    async def _load_profile(self, id: str) -> Optional[Profile]:
+        return await storage.driver.profile.load_merged_profile(id)
+
+    async def _process(self, tracker_payload: TrackerPayload, source, profile_less: bool, profile: Optional[Profile],
+                       session: Session, ip: str, persist) -> dict:
+        return await invoke_track_process(tracker_payload, source, profile_less, profile, session, ip,
+                                          persist=persist)
+
+    async def _save(self, persistence: BatchPersistence):
+        await persistence.save()
+
+    @staticmethod
+    async def _lock_profiles(locks: AsyncExitStack, profile_ids: List[str]):
+        # Locks are taken in order of ids, so batches that share profiles do not wait for each other forever.
+        for profile_id in sorted(profile_ids):
+            await locks.enter_async_context(
+                ProfileTracksSynchronizer(Entity(id=profile_id), wait=tracardi.sync_profile_tracks_wait,
+                                          max_repeats=tracardi.sync_profile_tracks_max_repeats))
+
+    @staticmethod
+    def _group(tracker_payloads: List[TrackerPayload], positions: List[int], sessions: Dict[str, Session],
+               profiles: Dict[str, Profile], profile_less: bool) -> List[List[int]]:
+        groups = _Groups()
+        keys = {}
+        for position in positions:
+            tracker_payload = tracker_payloads[position]
+            key = f"session:{tracker_payload.session.id}"
+            groups.find(key)
+            if not profile_less:
+                session = sessions.get(tracker_payload.session.id, None)
+                if session is not None:
+                    profile_id = session.profile.id if session.profile is not None else None
+                else:
+                    profile_id = tracker_payload.profile.id if tracker_payload.profile is not None else None
+                if profile_id is not None:
+                    if profile_id in profiles:
+                        profile_id = profiles[profile_id].id
+                    groups.union(key, f"profile:{profile_id}")
+            keys[position] = key
+
+        grouped = {}  # type: Dict[str, List[int]]
+        for position in positions:
+            grouped.setdefault(groups.find(keys[position]), []).append(position)
+        return list(grouped.values())
+
+    async def track(self, tracker_payloads: List[TrackerPayload], ip: Union[str, List[str]], profile_less: bool,
+                    allowed_bridges: List[str], internal_source=None) -> List[BatchTrackResult]:
+
+        """
+        Ip is the ip of all payloads or list of ips, one per payload.
+        """
+
+        ips = ip if isinstance(ip, list) else [ip] * len(tracker_payloads)
+
+        results = [BatchTrackResult() for _ in tracker_payloads]
+        sources = {}
+        for position, tracker_payload in enumerate(tracker_payloads):
+            start = monotonic()
+            try:
+                source = await validate_payload_source(tracker_payload, allowed_bridges, internal_source)
+                tracker_payload.set_transitional(source)
+                tracker_payload.set_return_profile(source)
+                tracker_payload.force_there_is_a_session()
+                sources[position] = source
+            except Exception as e:
+                results[position].error = str(e)
+            finally:
+                results[position].time += monotonic() - start
+
+        positions = list(sources.keys())
+        if not positions:
+            return results
+
+        sessions = await self._load_sessions(
+            list(dict.fromkeys(tracker_payloads[position].session.id for position in positions)))
+
+        profile_ids = []
+        if not profile_less:
+            for position in positions:
+                tracker_payload = tracker_payloads[position]
+                session = sessions.get(tracker_payload.session.id, None)
+                if session is not None:
+                    if session.profile is not None:
+                        profile_ids.append(session.profile.id)
+                elif tracker_payload.profile is not None:
+                    profile_ids.append(tracker_payload.profile.id)
+            profile_ids = list(dict.fromkeys(profile_ids))
+
+        async with AsyncExitStack() as locks:
+            if tracardi.sync_profile_tracks and profile_ids:
+                # Profiles are locked until the batch is saved, so they are loaded after locking.
+                await self._lock_profiles(locks, profile_ids)
+            await self._track_and_save(tracker_payloads, positions, sources, ips, sessions, profile_ids,
+                                       profile_less, results)
+
+        return results
+
+    async def _track_and_save(self, tracker_payloads: List[TrackerPayload], positions: List[int], sources: dict,
+                              ips: List[str], sessions: Dict[str, Session], profile_ids: List[str],
+                              profile_less: bool, results: List[BatchTrackResult]):
+
+        profiles = {}  # type: Dict[str, Profile]
+        if profile_ids:
+            profiles = await self._load_profiles(profile_ids)
+
+        async def load_profile(id: str) -> Optional[Profile]:
+            if id in profiles:
+                return profiles[id]
+            profile = await self._load_profile(id)
+            if profile is not None:
+                profiles[id] = profile
+            return profile
+
+        persistence = BatchPersistence()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def track_group(group: List[int]):
+            async with semaphore:
+                for position in group:
+                    tracker_payload = tracker_payloads[position]
+                    start = monotonic()
+                    try:
+                        profile, session = await tracker_payload.get_profile_and_session(
+                            sessions.get(tracker_payload.session.id, None),
+                            load_profile,
+                            profile_less
+                        )
+                        results[position].result = await self._process(tracker_payload, sources[position],
+                                                                        profile_less, profile, session, ips[position],
+                                                                        persistence.persist)
+
+                        # Next tracks of the group use profile and session after this track.
+                        session, profile = persistence.tracked.pop(id(tracker_payload), (session, profile))
+                        sessions[session.id] = session
+                        if isinstance(profile, Profile):
+                            profiles[profile.id] = profile
+                    except Exception as e:
+                        logger.error(f"Batch track failed: {str(e)}")
+                        results[position].error = str(e)
+                    finally:
+                        results[position].time += monotonic() - start
+
+        await asyncio.gather(*[track_group(group) for group in
+                               self._group(tracker_payloads, positions, sessions, profiles, profile_less)])
+
+        try:
+            await self._save(persistence)
+        except Exception as e:
+            logger.error(str(e))
+            for result in results:
+                if result.error is None:
+                    result.error = str(e)
+
+
+async def track_batch(tracker_payloads: List[TrackerPayload], ip: str, profile_less: bool,
+                      allowed_bridges: List[str], internal_source=None) -> List[BatchTrackResult]:
+
+    """
+    Tracks many payloads with a few storage requests. Returns result (or error) and processing time in seconds of
+    every payload, in order of payloads.
+    """
+
+    return await BatchTracker().track(tracker_payloads, ip, profile_less, allowed_bridges, internal_source)
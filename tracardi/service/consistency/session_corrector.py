@@ -25,13 +25,14 @@ async def correct_session(session_id) -> List[str]:
     """
 
     referenced_profiles_ids = []
+    changed = False
     for _session_record in await storage.driver.session.load_duplicates(session_id):
         try:
             _session_profile_id = _session_record['profile']['id']
         except KeyError:
             # This is corrupted session. Session must have profile id
-            await storage.driver.session.delete(_session_record['id']),
-            await storage.driver.session.refresh()
+            await storage.driver.session.delete(_session_record['id'])
+            changed = True
             continue
 
         if _session_profile_id not in referenced_profiles_ids:
@@ -49,7 +50,7 @@ async def correct_session(session_id) -> List[str]:
                     raise RuntimeError(f"Could not recreate session {_session_record['id']}")
                 else:
                     logger.warning(f"Session {_session_record['id']} recreated with new id {_session.id}")
-                await storage.driver.session.refresh()
+                changed = True
 
                 # Find all events with old session and current profile id and
                 # change session id to new session
@@ -62,8 +63,7 @@ async def correct_session(session_id) -> List[str]:
 
                 # Delete conflicting session from all indices
 
-                await storage.driver.session.delete(_session_record['id']),
-                await storage.driver.session.refresh()
+                await storage.driver.session.delete(_session_record['id'])
                 logger.warning(f"Session {_session_record['id']} deleted. It was recreated as {_session.id}")
 
             except ValidationError as e:
@@ -72,4 +72,8 @@ async def correct_session(session_id) -> List[str]:
             except Exception as e:
                 logger.error(str(e))
 
+    if changed:
+        # One refresh for all recreated and deleted sessions
+        await storage.driver.session.refresh()
+
     return referenced_profiles_ids
@@ -1,18 +1,21 @@
 import asyncio
 import logging
-from uuid import uuid4
+from typing import Dict, List, Optional, Tuple
 
 from tracardi.config import tracardi
 from tracardi.domain.api_instance import ApiInstance
+from tracardi.domain.resource import Resource
 from tracardi.exceptions.log_handler import log_handler
 from tracardi.process_engine.tql.condition import Condition
+from tracardi.service.destination_queue import DestinationQueue, DestinationDelivery
+from tracardi.service.destination_registry import destination_registry
 from tracardi.service.notation.dot_accessor import DotAccessor
 from tracardi.service.notation.dict_traverser import DictTraverser
 from tracardi.domain.destination import DestinationRecord, Destination
 from tracardi.process_engine.destination.connector import Connector
-from tracardi.service.module_loader import load_callable, import_package
 from tracardi.service.postpone_call import PostponedCall
 from tracardi.service.storage.driver import storage
+from tracardi.service.storage.elastic_client import on_close
 
 
 logger = logging.getLogger(__name__)
@@ -20,48 +23,55 @@ logger.setLevel(tracardi.logging_level)
 logger.addHandler(log_handler)
 
 
-class DestinationManager:
+async def _load_destinations() -> Tuple[List[Destination], Dict[str, Resource]]:
+    destinations = [DestinationRecord(**destination).decode()
+                    for destination in await storage.driver.destination.load_all()]
+    destinations = [destination for destination in destinations if destination.enabled]
 
-    def __init__(self, delta, profile=None, session=None, payload=None, event=None, flow=None, memory=None):
-        self.dot = DotAccessor(profile, session, payload, event, flow, memory)
-        self.delta = delta
-        self.profile = profile
-        self.session = session
+    # Load resources of all destinations at once
+    resources = await storage.driver.resource.load_many([destination.resource.id for destination in destinations])
 
-    @staticmethod
-    async def _load_destinations():
-        for destination in await storage.driver.destination.load_all():
-            yield DestinationRecord(**destination).decode()
+    return destinations, resources
 
-    @staticmethod
-    def _get_class_and_module(package):
-        parts = package.split(".")
-        if len(parts) < 2:
-            raise ValueError(f"Can not find class in package on {package}")
-        return ".".join(parts[:-1]), parts[-1]
 
-    async def send_data(self, profile_id, events, debug):
+async def _get_connector(destination_id: str, debug: bool) -> Optional[Connector]:
+    return await destination_registry.get_connector_by_id(destination_id, debug, _load_destinations)
 
-        template = DictTraverser(self.dot, default=None)
 
-        async for destination in self._load_destinations():  # type: Destination
+destination_queue = DestinationQueue(
+    get_connector=_get_connector,
+    batch_size=tracardi.destination_batch_size,
+    linger=tracardi.destination_batch_linger,
+    retries=tracardi.destination_retries,
+    backoff=tracardi.destination_retry_backoff,
+    max_size=tracardi.destination_queue_size
+)
+# Queued deliveries are sent on shutdown.
+on_close(destination_queue.close)
 
-            if not destination.enabled:
-                continue
 
-            module, class_name = self._get_class_and_module(destination.destination.package)
-            module = import_package(module)
-            destination_class = load_callable(module, class_name)
+class DestinationManager:
 
-            # Load resource
-            resource = await storage.driver.resource.load(destination.resource.id)
+    def __init__(self, delta, profile=None, session=None, payload=None, event=None, flow=None, memory=None):
+        self.dot = DotAccessor(profile, session, payload, event, flow, memory, lazy=True)
+        self.delta = delta
+        self.profile = profile
+        self.session = session
+
+    async def send_data(self, profile_id, events, debug):
+
+        """
+        Sends mapped profile data to all enabled destinations. If destination queue is enabled the data is queued
+        and sent in the background, so this method does not wait for destinations. Raises ValueError if the queue
+        of a destination is full and the data was dropped.
+        """
 
-            if resource.enabled is False:
-                raise ConnectionError(f"Can't connect to disabled resource: {resource.name}.")
+        dropped = []
+        template = DictTraverser(self.dot, default=None)
 
-            # Pass resource to destination class
+        for destination in await destination_registry.get_destinations(_load_destinations):  # type: Destination
 
-            destination_instance = destination_class(debug, resource, destination)
+            destination_instance = destination_registry.get_connector(destination, debug)
 
             if isinstance(destination_instance, Connector):
                 if destination.condition:
@@ -70,7 +80,7 @@ class DestinationManager:
                     if not condition_result:
                         logger.info(f"Condition not met for destination {destination.name}. Data was not sent to "
                                     f"this destination.")
-                        return
+                        continue
 
                 result = template.reshape(reshape_template=destination.mapping)
 
@@ -87,6 +97,14 @@ class DestinationManager:
                         events
                     )
                     postponed_call.wait = tracardi.postpone_destination_sync
-                    postponed_call.run(asyncio.get_running_loop())
+                    await postponed_call.run(asyncio.get_running_loop())
+                elif tracardi.destination_queue:
+                    if not destination_queue.put(destination.id, debug,
+                                                 DestinationDelivery(result, self.delta, self.profile, self.session,
+                                                                     events)):
+                        dropped.append(destination.name)
                 else:
                     await destination_instance.run(result, self.delta, self.profile, self.session, events)
+
+        if dropped:
+            raise ValueError(f"Destination queue is full. Data was not sent to destinations: {', '.join(dropped)}.")
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from tracardi.config import tracardi
+from tracardi.domain.entity import Entity
+from tracardi.exceptions.log_handler import log_handler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class DestinationDelivery:
+
+    """
+    Data to be sent to destination. It is prepared (mapped) when the profile changes, so it does not depend on the
+    state of the profile at the time of sending. Profile, session and events are kept only as entities with ids,
+    so queued deliveries do not hold whole objects in memory. Connectors send the mapped data and the delta.
+    """
+
+    __slots__ = ('data', 'delta', 'profile', 'session', 'events')
+
+    def __init__(self, data, delta, profile: Optional[Entity], session: Optional[Entity], events: List[Entity]):
+        self.data = data
+        self.delta = delta
+        self.profile = Entity(id=profile.id) if profile is not None else None
+        self.session = Entity(id=session.id) if session is not None else None
+        self.events = [Entity(id=event.id) for event in events]
+
+    def args(self) -> tuple:
+        return self.data, self.delta, self.profile, self.session, self.events
+
+
+class DestinationQueue:
+
+    """
+    Outbound queue of destination deliveries. Every destination has its own queue and worker, so a slow destination
+    does not delay others. Worker waits linger seconds for more deliveries and sends up to batch_size deliveries
+    with one run_batch call of the connector. Failed batch is retried with exponential backoff and dropped after
+    retries. Delivery is best effort (at most once): the queue is kept in memory, so deliveries are lost when the
+    process stops, when the event loop changes, when retries run out or when the queue is full.
+
+    Callable get_connector(destination_id, debug) must return connector of the destination or None if the
+    destination does not exist any more.
+    """
+
+    def __init__(self, get_connector: Callable[[str, bool], Awaitable[Any]], batch_size: int, linger: float,
+                 retries: int, backoff: float, max_size: int):
+        self.get_connector = get_connector
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retries = retries
+        self.backoff = backoff
+        self.max_size = max_size
+        self._queues = {}  # type: Dict[Tuple[str, bool], asyncio.Queue]
+        self._workers = {}  # type: Dict[Tuple[str, bool], asyncio.Task]
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+
+    def __len__(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def put(self, destination_id: str, debug: bool, delivery: DestinationDelivery) -> bool:
+
+        """
+        Queues delivery. Returns False if the queue of destination is full and the delivery was dropped.
+        """
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Queues and workers are bound to the event loop.
+            self._queues, self._workers, self._loop = {}, {}, loop
+
+        key = (destination_id, debug)
+        queue = self._queues.get(key, None)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_size)
+            self._queues[key] = queue
+            self._workers[key] = asyncio.create_task(self._work(key, queue))
+
+        try:
+            queue.put_nowait(delivery)
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"Destination {destination_id} queue is full. Delivery dropped.")
+            return False
+
+    async def _work(self, key: Tuple[str, bool], queue: asyncio.Queue):
+        while True:
+            batch = [await queue.get()]
+            if self.linger > 0 and queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.linger)
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._deliver(key, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _deliver(self, key: Tuple[str, bool], batch: List[DestinationDelivery]):
+        destination_id, debug = key
+        for attempt in range(self.retries + 1):
+            try:
+                connector = await self.get_connector(destination_id, debug)
+                if connector is None:
+                    logger.warning(f"Destination {destination_id} does not exist or is disabled. "
+                                   f"{len(batch)} deliveries dropped.")
+                    return
+                await connector.run_batch(batch)
+                return
+            except Exception as e:
+                if attempt >= self.retries:
+                    logger.error(f"Could not send {len(batch)} deliveries to destination {destination_id} after "
+                                 f"{attempt + 1} attempts. Deliveries dropped. Details: {str(e)}")
+                    return
+                wait = self.backoff * 2 ** attempt
+                logger.warning(f"Could not send deliveries to destination {destination_id}. Retry in {wait}s. "
+                               f"Details: {str(e)}")
+                await asyncio.sleep(wait)
+
+    async def join(self):
+
+        """
+        Waits until all queued deliveries are sent.
+        """
+
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def close(self):
+
+        """
+        Sends queued deliveries and stops workers. Must be called on shutdown.
+        """
+
+        if self._loop is not asyncio.get_running_loop():
+            # Workers of other event loop can not be awaited.
+            self._queues, self._workers, self._loop = {}, {}, None
+            return
+        await self.join()
+        for worker in self._workers.values():
+            worker.cancel()
+        self._queues, self._workers = {}, {}
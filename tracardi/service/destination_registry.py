@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tracardi.config import tracardi, memory_cache
+from tracardi.domain.destination import Destination
+from tracardi.domain.resource import Resource
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.process_engine.destination.connector import Connector
+from tracardi.service.module_loader import load_callable, import_package
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class DestinationRegistry:
+
+    """
+    Enabled destinations with their resources. Destinations are loaded from storage at most once every ttl seconds.
+    Connector classes are imported and connectors are created once per load, so they are reused between
+    deliveries.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._destinations = []  # type: List[Destination]
+        self._resources = {}  # type: Dict[str, Resource]
+        self._connectors = {}  # type: Dict[Tuple[str, bool], Connector]
+        self._loaded_at = None  # type: Optional[float]
+        self._loading = None  # type: Optional[asyncio.Future]
+
+    @staticmethod
+    def _get_class_and_module(package):
+        parts = package.split(".")
+        if len(parts) < 2:
+            raise ValueError(f"Can not find class in package on {package}")
+        return ".".join(parts[:-1]), parts[-1]
+
+    async def _load(self, load_destinations: Callable):
+        try:
+            destinations, resources = await load_destinations()
+            self._destinations, self._resources, self._connectors = destinations, resources, {}
+            self._loaded_at = time()
+        finally:
+            self._loading = None
+
+    async def get_destinations(self, load_destinations: Callable) -> List[Destination]:
+
+        """
+        Returns enabled destinations. Callable load_destinations() must return enabled destinations and
+        their resources by id.
+        """
+
+        if self._loaded_at is None or time() > self._loaded_at + self.ttl:
+            # Concurrent callers wait for the same load.
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._load(load_destinations))
+            await asyncio.shield(self._loading)
+        return self._destinations
+
+    def invalidate(self):
+        # Called when destination or resource is saved or deleted. Other processes reload after ttl.
+        self._loaded_at = None
+
+    def get_connector(self, destination: Destination, debug: bool) -> Connector:
+        key = (destination.id, debug)
+        if key in self._connectors:
+            return self._connectors[key]
+
+        module, class_name = self._get_class_and_module(destination.destination.package)
+        module = import_package(module)
+        destination_class = load_callable(module, class_name)
+
+        if destination.resource.id not in self._resources:
+            raise ValueError('Resource id {} does not exist.'.format(destination.resource.id))
+
+        resource = self._resources[destination.resource.id]
+
+        if resource.enabled is False:
+            raise ConnectionError(f"Can't connect to disabled resource: {resource.name}.")
+
+        # Pass resource to destination class
+        connector = destination_class(debug, resource, destination)
+        self._connectors[key] = connector
+        return connector
+
+    async def get_connector_by_id(self, destination_id: str, debug: bool,
+                                  load_destinations: Callable) -> Optional[Connector]:
+        for destination in await self.get_destinations(load_destinations):
+            if destination.id == destination_id:
+                return self.get_connector(destination, debug)
+        return None
+
+
+destination_registry = DestinationRegistry(ttl=memory_cache.destination_ttl)
@@ -11,7 +11,10 @@ class EventPropsReshapingError(Exception):
 
 
 class EventPropsReshaper:
-    parser = Parser(Parser.read('grammar/uql_expr.lark'), start='expr')
+    parser = Parser(Parser.read('grammar/uql_expr_lalr.lark'),
+                    start='expr',
+                    parser='lalr',
+                    fallback=Parser.read('grammar/uql_expr.lark'))
 
     def __init__(self, dot: DotAccessor, event: Event):
         self.event = event
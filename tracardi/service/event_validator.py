@@ -1,23 +1,63 @@
+from typing import List, Tuple
+
+from tracardi.config import memory_cache
+from tracardi.service.lru_cache import LRUCache
 from tracardi.service.notation.dot_accessor import DotAccessor
 import jsonschema
 from tracardi.domain.event_payload_validator import EventTypeManager
 from tracardi.exceptions.exception import EventValidationException
 from dotty_dict import Dotty
 
+# (event type, schema revision) -> compiled validators
+_validators = LRUCache(memory_cache.event_validator_cache_size)
 
-def validate(dot: DotAccessor, validator: EventTypeManager) -> bool:
-    if validator.validation.enabled is False:
-        return True
 
-    for key, val_schema in validator.validation.json_schema.items():
+def _compile(json_schema: dict) -> List[Tuple[str, jsonschema.protocols.Validator]]:
+    compiled = []
+    for key, val_schema in json_schema.items():
         if not DotAccessor.validate(key):
             raise EventValidationException(
                 f"Please correct the reference to data in your validation schema. Expected dot notation got {key}")
 
+        # The same validator class jsonschema.validate would use.
+        validator_class = jsonschema.validators.validator_for(val_schema)
+        validator_class.check_schema(val_schema)
+        compiled.append((key, validator_class(val_schema)))
+    return compiled
+
+
+def get_validators(validator: EventTypeManager) -> List[Tuple[str, jsonschema.protocols.Validator]]:
+
+    """
+    Returns compiled validators for event type. Schemas are checked and validators are created once per
+    event type and schema revision. Revision is set when event type is cached (see EventManagerCache), it is
+    computed here only for event types that were not cached.
+    """
+
+    if validator.schema_revision is None:
+        validator.set_schema_revision()
+    cache_key = (validator.event_type, validator.schema_revision)
+    compiled = _validators.get(cache_key)
+    if compiled is None:
+        compiled = _compile(validator.validation.json_schema)
+        _validators[cache_key] = compiled
+    return compiled
+
+
+def validate(dot: DotAccessor, validator: EventTypeManager) -> bool:
+    if validator.validation.enabled is False:
+        return True
+
+    for key, key_validator in get_validators(validator):
         try:
-            value = dot[key].to_dict() if isinstance(dot[key], Dotty) else dot[key]
-            jsonschema.validate(value, val_schema)
-        except (jsonschema.ValidationError, KeyError) as _:
+            value = dot[key]
+        except KeyError:
+            return False
+
+        if isinstance(value, Dotty):
+            value = value.to_dict()
+
+        if not key_validator.is_valid(value):
             return False
 
     return True
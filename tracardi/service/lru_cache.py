@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator
+
+
+class LRUCache:
+
+    """
+    Size bounded in-memory cache. When the cache is full the least recently used item is evicted.
+    """
+
+    def __init__(self, max_size: int = 128):
+        if max_size < 1:
+            raise ValueError("LRUCache max_size must be greater then 0.")
+        self.max_size = max_size
+        self._buffer = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._buffer
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self._buffer[key]
+        self._buffer.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._buffer[key] = value
+        self._buffer.move_to_end(key)
+        while len(self._buffer) > self.max_size:
+            self._buffer.popitem(last=False)
+
+    def __delitem__(self, key: Hashable):
+        del self._buffer[key]
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._buffer.keys()))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self._buffer:
+            return self[key]
+        return default
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._buffer.pop(key, default)
+
+    def clear(self):
+        self._buffer.clear()
@@ -1,8 +1,120 @@
-from typing import List, Dict, Union
+import json
+from typing import List, Dict, Union, Tuple, Any
 
-from dotty_dict import dotty
+from dotty_dict import dotty, Dotty
+
+from tracardi.config import memory_cache
+from tracardi.service.lru_cache import LRUCache
 from .dot_accessor import DotAccessor
-import datetime
+
+
+class ReshapePlan:
+
+    """
+    Compiled reshape template. Template is flattened once into a list of (target keys, source, optional)
+    instructions, so reshaping does not walk the template and does not build paths on every call.
+    """
+
+    def __init__(self, template: Union[Dict, List]):
+        self.template = template
+        self.instructions = []  # type: List[Tuple[List[str], Any, bool]]
+        splitter = dotty()
+        for key, value, path in self._traverse(template):
+
+            if key is not None:
+                path = path[:-len(key) - 1]
+
+            optional = False
+            if len(key) > 0 and key[-1] == '?':
+                key = key[:-1]
+                optional = True
+
+            if len(path) > 0 and path[-1] == '?':
+                path = path[:-1]
+                optional = True
+
+            self.instructions.append((splitter._split(f"{path}.{key}"), value, optional))
+
+    def __len__(self):
+        return len(self.instructions)
+
+    @classmethod
+    def _traverse(cls, value, key=None, path="root"):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                yield from cls._traverse(v, k, path + "." + k)
+        elif isinstance(value, list):
+            for n, v in enumerate(value):
+                k = str(n)
+                yield from cls._traverse(v, k, path + '.' + k)
+        else:
+            yield key, value, path
+
+
+_plans = LRUCache(memory_cache.reshape_cache_size)
+
+
+def compile_template(template: Union[Dict, List, str]) -> ReshapePlan:
+
+    """
+    Returns compiled plan for template. Template can be a dict, list or its JSON string. Plans are cached
+    by template content.
+    """
+
+    if isinstance(template, str):
+        cache_key = template
+    else:
+        try:
+            cache_key = json.dumps(template)
+        except (TypeError, ValueError):
+            return ReshapePlan(template)
+
+    plan = _plans.get(cache_key)
+    if plan is None:
+        plan = ReshapePlan(json.loads(template) if isinstance(template, str) else template)
+        _plans[cache_key] = plan
+    return plan
+
+
+def _set_list_index(data: list, index: int, value):
+    for _ in range(len(data), index + 1):
+        data.append(None)
+    data[index] = value
+
+
+def _set(data, keys: List[str], value):
+    # Sets value the same way dotty does.
+    last = len(keys) - 1
+    for position, key in enumerate(keys):
+        if position == last:
+            if key.isdigit():
+                _set_list_index(data, int(key), value)
+            else:
+                data[key] = value
+            return
+
+        next_item = [] if keys[position + 1].isdigit() else {}
+        if key.isdigit():
+            key = int(key)
+            try:
+                if not data[key]:
+                    data[key] = next_item
+            except IndexError:
+                _set_list_index(data, key, next_item)
+        elif not data.get(key):
+            data[key] = next_item
+        data = data[key]
+
+
+def _plain(value):
+    # Copies value, so the result does not share data with dot accessor.
+    if isinstance(value, Dotty):
+        value = value._data
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
 
 
 class DictTraverser:
@@ -32,43 +144,23 @@ class DictTraverser:
         return value
 
     def traverse(self, value, key=None, path="root"):
-        if isinstance(value, dict):
-            for k, v in value.items():
-                yield from self.traverse(v, k, path + "." + k)
-        elif isinstance(value, list):
-            for n, v in enumerate(value):
-                k = str(n)
-                yield from self.traverse(v, k, path + '.' + k)
-        else:
-            yield key, value, path
-
-    def reshape(self, reshape_template: Union[Dict, List]):
-        out_dot = dotty()
-        for key, value, path in self.traverse(reshape_template):
+        return ReshapePlan._traverse(value, key, path)
 
-            if key is not None:
-                path = path[:-len(key)-1]
+    def reshape(self, reshape_template: Union[Dict, List, str, ReshapePlan]):
+        plan = reshape_template if isinstance(reshape_template, ReshapePlan) else compile_template(reshape_template)
 
-            optional = False
-            if len(key) > 0 and key[-1] == '?':
-                key = key[:-1]
-                optional = True
-
-            if len(path) > 0 and path[-1] == '?':
-                path = path[:-1]
-                optional = True
+        result = {}
+        for keys, source, optional in plan.instructions:
 
-            value = self._get_value(value, optional)
+            value = self._get_value(source, optional)
 
             if value is None and self.include_none is False:
                 continue
 
             if not value:
                 if not optional:
-                    out_dot[f"{path}.{key}"] = value
+                    _set(result, keys, _plain(value))
             else:
-                out_dot[f"{path}.{key}"] = value
+                _set(result, keys, _plain(value))
 
-        # TODO THIS DOES NOT SUPPORT DATETIME
-        result = out_dot.to_dict()
         return result['root'] if 'root' in result else {}
@@ -3,6 +3,8 @@ import re
 from dotty_dict import dotty
 from pydantic import BaseModel
 
+from tracardi.service.notation.lazy_dotty import LazyDotty
+
 dot_notation_regex = re.compile(
     r"(?:payload|profile|event|session|flow|memory)@([\[\]0-9a-zA-a_\-\.]+(?<![\.\[])|\.\.\.)")
 
@@ -23,6 +25,8 @@ class DotAccessor:
         elif isinstance(data, dict):
             return dotty(data)
         elif isinstance(data, BaseModel):
+            if self.lazy:
+                return LazyDotty(data)
             return dotty(data.dict())
         else:
             raise ValueError("Could not convert {} to dict. Expected: None, dict or BaseModel got {}.".format(
@@ -63,7 +67,14 @@ class DotAccessor:
 
         return NotDotNotation()
 
-    def __init__(self, profile=None, session=None, payload=None, event=None, flow=None, memory=None):
+    def __init__(self, profile=None, session=None, payload=None, event=None, flow=None, memory=None, lazy=False):
+
+        """
+        If lazy is True models are not converted to dicts. Values are read from the current state of the models
+        and a model branch is copied only when it is changed. See LazyDotty.
+        """
+
+        self.lazy = lazy
         self.flow = self._convert(flow, 'flow')
         self.event = self._convert(event, 'event')
         self.payload = self._convert(payload, 'payload')
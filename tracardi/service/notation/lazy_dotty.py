@@ -0,0 +1,207 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from dotty_dict import Dotty, dotty
+from pydantic import BaseModel
+
+# Dotty caches __getitem__ results, LazyDotty resolves paths without this cache.
+_dotty_getitem = getattr(Dotty.__getitem__, '__wrapped__', Dotty.__getitem__)
+
+
+@lru_cache(maxsize=4096)
+def split_path(path: str) -> Optional[Tuple[str, ...]]:
+
+    """
+    Splits dotted path into keys. Returns None for paths with escaped dots, they are handled by dotty.
+    """
+
+    if '\\' in path:
+        return None
+    return tuple(path.split('.'))
+
+
+def to_plain(value):
+
+    """
+    Converts value the same way BaseModel.dict() converts field values. Containers are copied.
+    """
+
+    if isinstance(value, BaseModel):
+        return value.dict()
+    elif isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return type(value)(to_plain(item) for item in value)
+    return value
+
+
+class LazyDotty(Dotty):
+
+    """
+    Dotty view of pydantic model that does not convert the whole model to dict. Paths are resolved against the
+    model. A top level branch (e.g. `traits`) is converted to dict and copied only when it is written to or when
+    a dict or list from it is read (as it may be changed by the reader). The model is never changed.
+
+    Operations that need the whole dict (iteration, to_dict, etc.) convert the whole model once, as
+    dotty(model.dict()) would, so LazyDotty can be used anywhere Dotty is used.
+    """
+
+    def __init__(self, model: BaseModel):
+        self._model = model
+        self._branches = {}
+        self._deleted = set()
+        self._full = None
+        self.separator = '.'
+        self.esc_char = '\\'
+        self.no_list = False
+
+    @property
+    def _data(self) -> dict:
+        if self._full is None:
+            data = {}
+            for key, value in self._model.__dict__.items():
+                if key in self._deleted:
+                    continue
+                data[key] = self._branches[key] if key in self._branches else to_plain(value)
+            for key, value in self._branches.items():
+                if key not in data:
+                    data[key] = value
+            self._full = data
+        return self._full
+
+    @_data.setter
+    def _data(self, value):
+        self._full = value
+
+    def is_materialized(self) -> bool:
+        return self._full is not None
+
+    def _split(self, key):
+        if isinstance(key, str):
+            keys = split_path(key)
+            if keys is not None:
+                return list(keys)
+        return super()._split(key)
+
+    def _has_top(self, key) -> bool:
+        return key in self._branches or (key not in self._deleted and key in self._model.__dict__)
+
+    def _branch(self, key):
+        # Copy on write
+        if key not in self._branches and key not in self._deleted and key in self._model.__dict__:
+            self._branches[key] = to_plain(self._model.__dict__[key])
+        return self._branches
+
+    def _resolve(self, keys: list):
+        top = keys[0]
+        if top in self._branches or top in self._deleted:
+            return _dotty_getitem(dotty(self._branches), ".".join(keys))
+
+        data = self._model.__dict__[top]
+        for key in keys[1:]:
+            if data is None:
+                return None
+            if isinstance(data, BaseModel):
+                data = data.__dict__[key]
+            elif isinstance(data, list) and key.isdigit():
+                data = data[int(key)]
+            elif isinstance(data, dict) and key in data:
+                data = data[key]
+            elif isinstance(data, dict) and all(isinstance(data_key, str) for data_key in data):
+                raise KeyError(key)
+            elif isinstance(data, (dict, list)):
+                # Slices or not string keys. Let dotty resolve it on the copied branch.
+                self._branch(top)
+                return _dotty_getitem(dotty(self._branches), ".".join(keys))
+            else:
+                raise KeyError(f"Can not read {key} from {type(data)}")
+
+        if isinstance(data, (BaseModel, dict, list, tuple, set, frozenset)):
+            # Reader gets a reference to the copied branch, so changes made by the reader are kept.
+            self._branch(top)
+            return _dotty_getitem(dotty(self._branches), ".".join(keys))
+
+        return data
+
+    def __getitem__(self, item):
+        if self._full is not None:
+            return _dotty_getitem(self, item)
+
+        keys = self._split(item)
+        if not isinstance(keys[0], str) or '\\' in item:
+            return _dotty_getitem(self, item)
+
+        if not self._has_top(keys[0]):
+            raise KeyError(keys[0])
+
+        return self._resolve(keys)
+
+    def __contains__(self, item):
+        if self._full is not None:
+            return super().__contains__(item)
+
+        keys = self._split(item)
+        if not isinstance(keys[0], str):
+            return super().__contains__(item)
+
+        if not self._has_top(keys[0]):
+            return False
+
+        if len(keys) == 1:
+            return True
+
+        try:
+            parent = self._resolve(keys[:-1])
+        except (KeyError, IndexError, TypeError):
+            return False
+
+        last = keys[-1]
+        if isinstance(parent, BaseModel):
+            return last in parent.__dict__
+        if last.isdigit() and isinstance(parent, (list, tuple)):
+            # Same as dotty, value at index is checked.
+            index = int(last)
+            return index < len(parent) and bool(parent[index])
+        try:
+            return last in parent
+        except TypeError:
+            return False
+
+    def __setitem__(self, key, value):
+        if self._full is not None:
+            return super().__setitem__(key, value)
+
+        keys = self._split(key)
+        if not isinstance(keys[0], str):
+            return super().__setitem__(key, value)
+
+        if len(keys) == 1 or keys[0] in self._deleted:
+            self._deleted.discard(keys[0])
+            self._branches.setdefault(keys[0], {})
+        dotty(self._branch(keys[0]))[key] = value
+
+    def __delitem__(self, key):
+        if self._full is not None:
+            return super().__delitem__(key)
+
+        keys = self._split(key)
+        if not isinstance(keys[0], str):
+            return super().__delitem__(key)
+
+        if not self._has_top(keys[0]):
+            raise KeyError(keys[0])
+
+        if len(keys) == 1:
+            self._branches.pop(keys[0], None)
+            self._deleted.add(keys[0])
+        else:
+            del dotty(self._branch(keys[0]))[key]
+
+    def __bool__(self):
+        if self._full is not None:
+            return bool(self._full)
+        return bool(self._branches) or any(key not in self._deleted for key in self._model.__dict__)
+
+    def __repr__(self):
+        return 'LazyDotty(dictionary={}, separator={!r}, esc_char={!r})'.format(
+            self._data, self.separator, self.esc_char)
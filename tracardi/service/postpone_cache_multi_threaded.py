@@ -3,7 +3,7 @@ from typing import Optional
 
 from tracardi.config import tracardi
 from tracardi.exceptions.log_handler import log_handler
-from tracardi.service.storage.redis_client import RedisClient
+from tracardi.service.storage.redis_client import AsyncRedisClient
 
 logger = logging.getLogger(__name__)
 logger.setLevel(tracardi.logging_level)
@@ -12,55 +12,60 @@ logger.addHandler(log_handler)
 
 class PostponeCache:
 
+    """
+    Flags kept in redis hash. Methods that change data accept optional pipeline. If it is passed the command is
+    only queued and sent when the pipeline is executed.
+    """
+
     def __init__(self, cache_type):
         logger.info(f"Cache for {cache_type} created")
-        self.redis = RedisClient()
+        self.redis = AsyncRedisClient()
         self.hash = cache_type
 
-    def exists(self, profile_id):
-        return self.redis.client.hexists(self.hash, profile_id)
-
-    def get(self, profile_id) -> bool:
+    def pipeline(self):
+        return self.redis.pipeline()
 
-        if not self.exists(profile_id):
-            self.redis.client.hset(self.hash, profile_id, '1')
-            return False
+    async def exists(self, profile_id):
+        return await self.redis.client.hexists(self.hash, profile_id)
 
-        return True
+    async def get(self, profile_id) -> bool:
+        # Check and set in one round trip. Returns True if flag was already set.
+        return not await self.redis.client.hsetnx(self.hash, profile_id, '1')
 
-    def set(self, profile_id):
-        self.redis.client.hset(self.hash, profile_id, '1')
+    async def set(self, profile_id, pipe=None):
+        client = self.redis.client if pipe is None else pipe
+        return await client.hset(self.hash, profile_id, '1')
 
-    def reset(self, profile_id):
-        self.redis.client.hdel(self.hash, profile_id)
+    async def reset(self, profile_id, pipe=None):
+        client = self.redis.client if pipe is None else pipe
+        return await client.hdel(self.hash, profile_id)
 
 
 class InstanceCache:
 
     def __init__(self, cache_type):
         logger.info(f"Cache for {cache_type} created")
-        self.redis = RedisClient()
+        self.redis = AsyncRedisClient()
         self.hash = cache_type
 
-    def exists(self, profile_id):
-        return self.redis.client.hexists(self.hash, profile_id)
+    def pipeline(self):
+        return self.redis.pipeline()
 
-    def get_instance(self, profile_id, instance_id) -> Optional[str]:
+    async def exists(self, profile_id):
+        return await self.redis.client.hexists(self.hash, profile_id)
 
-        if not self.exists(profile_id):
-            logger.info(f"Create instance {instance_id} for profile {profile_id}")
-            self.redis.client.hset(self.hash, profile_id, instance_id)
+    async def get_instance(self, profile_id) -> Optional[str]:
+        value_bson = await self.redis.client.hget(self.hash, profile_id)
+        if value_bson is None:
             return None
+        return value_bson.decode('utf-8')
 
-        value_bson = self.redis.client.hget(self.hash, profile_id)
-        value = value_bson.decode('utf-8')
-
-        return value
-
-    def set_instance(self, profile_id, instance_id):
+    async def set_instance(self, profile_id, instance_id, pipe=None):
         logger.info(f"Destination sync for profile {profile_id} is going to be sent from worker instance {instance_id}")
-        self.redis.client.hset(self.hash, profile_id, instance_id)
+        client = self.redis.client if pipe is None else pipe
+        return await client.hset(self.hash, profile_id, instance_id)
 
-    def reset(self, profile_id):
+    async def reset(self, profile_id, pipe=None):
         logger.debug(f"Clean profile worker instance {profile_id}")
-        self.redis.client.hdel(self.hash, profile_id)
+        client = self.redis.client if pipe is None else pipe
+        return await client.hdel(self.hash, profile_id)
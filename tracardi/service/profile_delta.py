@@ -0,0 +1,137 @@
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+from dotty_dict import dotty
+from pydantic import BaseModel
+
+from tracardi.service.notation.lazy_dotty import to_plain
+
+
+class Missing:
+
+    """
+    Value of path that does not exist (added or removed key).
+    """
+
+    def __repr__(self):
+        return "<missing>"
+
+    def __bool__(self):
+        return False
+
+
+MISSING = Missing()
+
+
+def _same_items(old: list, new: list) -> bool:
+    # Order of items is ignored.
+    if len(old) != len(new):
+        return False
+    try:
+        return Counter(old) == Counter(new)
+    except TypeError:
+        # Not hashable items
+        remaining = list(new)
+        for item in old:
+            if item not in remaining:
+                return False
+            remaining.remove(item)
+        return True
+
+
+def diff(old, new, path: str = "") -> Iterator[Tuple[str, Any, Any]]:
+
+    """
+    Yields (path, old value, new value) of changed leaves. Models are compared field by field without converting
+    them to dicts, unchanged objects (the same reference) are skipped. Order of list items is ignored.
+    """
+
+    if old is new:
+        return
+
+    if isinstance(old, BaseModel) and type(old) is type(new):
+        old, new = old.__dict__, new.__dict__
+    elif isinstance(old, dict) and isinstance(new, dict):
+        try:
+            if old == new:
+                return
+        except Exception:
+            pass
+    else:
+        if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+            if old == new or _same_items(old, new):
+                return
+        elif old == new:
+            return
+        yield path, old, new
+        return
+
+    prefix = f"{path}." if path else ""
+    for key, value in old.items():
+        if key not in new:
+            yield f"{prefix}{key}", value, MISSING
+        else:
+            yield from diff(value, new[key], f"{prefix}{key}")
+    for key, value in new.items():
+        if key not in old:
+            yield f"{prefix}{key}", MISSING, value
+
+
+class ProfileDelta:
+
+    """
+    Changes of profile: changed dotted paths with old and new values. Paths of fields that were changed in place
+    (see Profile.mark_changed) without known old value have old value MISSING.
+    """
+
+    def __init__(self, changes: Dict[str, Tuple[Any, Any]] = None):
+        self.changes = changes if changes is not None else {}
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __contains__(self, path: str):
+        return path in self.changes
+
+    def __repr__(self):
+        return f"ProfileDelta({self.changed_paths()})"
+
+    def changed_paths(self) -> List[str]:
+        return list(self.changes.keys())
+
+    def changed_fields(self) -> List[str]:
+
+        """
+        Returns changed top level fields of profile, e.g. traits, segments.
+        """
+
+        return list(dict.fromkeys(path.split('.')[0] for path in self.changes))
+
+    def to_dict(self) -> dict:
+
+        """
+        Returns {path: {"old": value, "new": value}}. Missing values are None.
+        """
+
+        return {path: {"old": to_plain(old) if old is not MISSING else None,
+                       "new": to_plain(new) if new is not MISSING else None}
+                for path, (old, new) in self.changes.items()}
+
+    def apply(self, model: BaseModel) -> BaseModel:
+
+        """
+        Returns copy of model (e.g. profile loaded from storage) with changes applied on it.
+        """
+
+        plain = model.dict()
+        data = dotty(plain)
+        for path, (_, new) in self.changes.items():
+            if new is MISSING:
+                if path in data:
+                    del data[path]
+            else:
+                data[path] = to_plain(new)
+        return type(model)(**plain)
@@ -0,0 +1,10 @@
+from kombu import Connection
+from kombu.connection import ConnectionPool
+
+
+async def open_connection_pool(uri: str, timeout: int, limit: int) -> ConnectionPool:
+    return Connection(uri, connect_timeout=timeout).Pool(limit)
+
+
+async def close_connection_pool(pool: ConnectionPool):
+    pool.force_close_all()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import socket
+import threading
+from queue import SimpleQueue, Empty
+from typing import Dict, List
+
+from kombu import Connection, Exchange, Queue
+
+from tracardi.config import tracardi
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.rabbitmq.connection_pool import open_connection_pool, close_connection_pool
+from tracardi.service.track_queue import TrackQueue, QueueMessage
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class _PartitionConsumer:
+
+    """
+    Consumes one partition queue in a thread. Kombu channels are not thread safe, so acks and rejects are
+    passed back to the thread that received the messages.
+    """
+
+    def __init__(self, uri: str, timeout: int, queue: Queue, dead_letter_queue: Queue, prefetch: int,
+                 loop: asyncio.AbstractEventLoop):
+        self.uri = uri
+        self.timeout = timeout
+        self.queue = queue
+        self.dead_letter_queue = dead_letter_queue
+        self.prefetch = prefetch
+        self.loop = loop
+        self.messages = asyncio.Queue()
+        self._actions = SimpleQueue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"tracardi-track-queue-{queue.name}", daemon=True)
+        self._thread.start()
+
+    def _on_message(self, body, message):
+        self.loop.call_soon_threadsafe(self.messages.put_nowait, QueueMessage(body, message))
+
+    def _run_actions(self):
+        while True:
+            try:
+                action, message = self._actions.get_nowait()
+            except Empty:
+                return
+            try:
+                if action == 'ack':
+                    message.ack()
+                else:
+                    # Rejected message goes to dead letter exchange of the queue.
+                    message.reject(requeue=False)
+            except Exception as e:
+                # Message of closed connection. Broker delivers it again.
+                logger.warning(f"Could not {action} track message: {str(e)}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with Connection(self.uri, connect_timeout=self.timeout) as connection:
+                    # Rejected messages are lost if dead letter queue does not exist.
+                    self.dead_letter_queue(connection).declare()
+                    with connection.Consumer([self.queue], callbacks=[self._on_message], accept=['json'],
+                                             prefetch_count=self.prefetch):
+                        while not self._stopped.is_set():
+                            self._run_actions()
+                            try:
+                                connection.drain_events(timeout=0.1)
+                            except socket.timeout:
+                                pass
+                        self._run_actions()
+            except Exception as e:
+                logger.error(f"Track queue {self.queue.name} connection error: {str(e)}")
+                self._stopped.wait(1)
+
+    def ack(self, message: QueueMessage):
+        self._actions.put(('ack', message.delivery))
+
+    def reject(self, message: QueueMessage):
+        self._actions.put(('reject', message.delivery))
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=self.timeout)
+
+
+class RabbitMqTrackQueue(TrackQueue):
+
+    """
+    Track queue in RabbitMQ. Every partition is a durable queue bound to direct exchange with partition number
+    as routing key. Rejected messages go to the dead letter queue <name>.dead. Prefetch limits the number of
+    unacknowledged messages per partition consumer.
+    """
+
+    def __init__(self, uri: str, name: str, partitions: int, prefetch: int, timeout: int = 5, pool_size: int = None):
+        super().__init__(partitions)
+        self.uri = uri
+        self.timeout = timeout
+        self.prefetch = prefetch
+        self.pool_size = pool_size if pool_size is not None else tracardi.resource_pool_size
+        self.exchange = Exchange(name, 'direct', durable=True)
+        dead_letter_exchange = Exchange(f"{name}.dead", 'fanout', durable=True)
+        self.dead_letter_queue = Queue(f"{name}.dead", exchange=dead_letter_exchange, durable=True)
+        self.queues = [Queue(f"{name}.{partition}", exchange=self.exchange, routing_key=str(partition), durable=True,
+                             queue_arguments={'x-dead-letter-exchange': f"{name}.dead"})
+                       for partition in range(partitions)]  # type: List[Queue]
+        self._pool = None
+        self._consumers = {}  # type: Dict[int, _PartitionConsumer]
+
+    def _publish(self, partition: int, body: dict):
+        with self._pool.acquire(block=True, timeout=self.timeout) as connection:
+            producer = connection.Producer(serializer='json')
+            # Declarations are cached per connection.
+            producer.publish(body,
+                             exchange=self.exchange,
+                             routing_key=str(partition),
+                             declare=[self.queues[partition], self.dead_letter_queue],
+                             delivery_mode=2,
+                             retry=True)
+
+    async def publish(self, partition: int, body: dict):
+        if self._pool is None:
+            self._pool = await open_connection_pool(self.uri, self.timeout, self.pool_size)
+        await asyncio.get_running_loop().run_in_executor(None, self._publish, partition, body)
+
+    def _get_consumer(self, partition: int) -> _PartitionConsumer:
+        if partition not in self._consumers:
+            self._consumers[partition] = _PartitionConsumer(self.uri, self.timeout, self.queues[partition],
+                                                            self.dead_letter_queue, self.prefetch,
+                                                            asyncio.get_running_loop())
+        return self._consumers[partition]
+
+    async def get_batch(self, partition: int, size: int, linger: float, timeout: float = 1) -> List[QueueMessage]:
+        return await self._get_batch(self._get_consumer(partition).messages, size, linger, timeout)
+
+    async def ack(self, partition: int, message: QueueMessage):
+        self._get_consumer(partition).ack(message)
+
+    async def dead_letter(self, partition: int, message: QueueMessage):
+        self._get_consumer(partition).reject(message)
+
+    async def close(self):
+        for consumer in self._consumers.values():
+            await asyncio.get_running_loop().run_in_executor(None, consumer.stop)
+        self._consumers = {}
+        if self._pool is not None:
+            await close_connection_pool(self._pool)
+            self._pool = None
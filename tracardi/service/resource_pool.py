@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from hashlib import sha1
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from tracardi.config import tracardi
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.storage.elastic_client import on_close
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class PooledResource:
+
+    def __init__(self, pool: Any, close: Callable[[Any], Awaitable]):
+        self.pool = pool
+        self.close = close
+        self.borrowed = 0
+        self.used_at = time()
+        self.retired = False
+
+
+class ResourcePool:
+
+    """
+    Process wide registry of connection pools of resources (databases, queues, etc.). Pools are keyed by resource
+    id, kind of pool and hash of credentials, so the resource with changed credentials gets a new pool and the pool
+    with old credentials is closed.
+
+    Pools that were not borrowed for idle_ttl seconds are closed, they are checked on borrow and every idle_ttl
+    seconds. If there are more then max_pools pools the least recently used one is closed. Borrowed pools are never
+    closed, they are closed when returned.
+    """
+
+    def __init__(self, max_pools: int, idle_ttl: int):
+        self.max_pools = max_pools
+        self.idle_ttl = idle_ttl
+        self._pools = OrderedDict()  # type: Dict[Tuple[str, str, str], PooledResource]
+        self._opening = {}  # type: Dict[Tuple[str, str, str], asyncio.Future]
+        self._timer = None  # type: Optional[asyncio.TimerHandle]
+        self._timer_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+
+    @staticmethod
+    def hash(credentials: Union[BaseModel, dict]) -> str:
+        if isinstance(credentials, BaseModel):
+            credentials = credentials.dict()
+        return sha1(json.dumps(credentials, sort_keys=True, default=str).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self._pools)
+
+    async def _close(self, entry: PooledResource):
+        try:
+            await entry.close(entry.pool)
+        except Exception as e:
+            logger.error(f"Could not close resource pool. Details: {str(e)}")
+
+    async def _retire(self, key: Tuple[str, str, str]):
+        entry = self._pools.pop(key, None)
+        if entry is None:
+            return
+        entry.retired = True
+        if entry.borrowed == 0:
+            await self._close(entry)
+
+    async def _evict(self):
+        now = time()
+        for key in [key for key, entry in self._pools.items()
+                    if entry.borrowed == 0 and now - entry.used_at > self.idle_ttl]:
+            logger.info(f"Closing idle pool of resource {key[0]}.")
+            await self._retire(key)
+
+        overflow = len(self._pools) - self.max_pools
+        if overflow > 0:
+            for key in [key for key, entry in self._pools.items() if entry.borrowed == 0][:overflow]:
+                await self._retire(key)
+
+    def _start_timer(self):
+        loop = asyncio.get_running_loop()
+        # Timer of the old loop is lost when the loop changes.
+        if self._pools and (self._timer is None or self._timer_loop is not loop):
+            self._timer = loop.call_later(self.idle_ttl, self._on_timer)
+            self._timer_loop = loop
+
+    def _on_timer(self):
+        self._timer = None
+        task = asyncio.ensure_future(self._evict())
+        task.add_done_callback(lambda _: self._start_timer())
+
+    async def _open(self, key: Tuple[str, str, str], open: Callable[[], Awaitable],
+                    close: Callable[[Any], Awaitable]) -> PooledResource:
+        try:
+            # Pools of this resource opened with other credentials are outdated.
+            for outdated in [other for other in self._pools if other[:2] == key[:2]]:
+                await self._retire(outdated)
+
+            entry = PooledResource(await open(), close)
+            self._pools[key] = entry
+            return entry
+        finally:
+            del self._opening[key]
+
+    async def _get(self, key: Tuple[str, str, str], open: Callable[[], Awaitable],
+                   close: Callable[[Any], Awaitable]) -> PooledResource:
+        entry = self._pools.get(key, None)
+        if entry is not None:
+            self._pools.move_to_end(key)
+            return entry
+
+        # Concurrent borrowers of not yet opened pool wait for the same pool.
+        if key not in self._opening:
+            self._opening[key] = asyncio.ensure_future(self._open(key, open, close))
+        return await asyncio.shield(self._opening[key])
+
+    @asynccontextmanager
+    async def borrow(self, resource_id: str, kind: str, credentials: Union[BaseModel, dict],
+                     open: Callable[[], Awaitable], close: Callable[[Any], Awaitable]):
+
+        """
+        Yields pool of given kind for the resource. Callable open must return new pool, it is called only if there
+        is no pool for the resource and credentials. Callable close must close the pool.
+        """
+
+        key = (resource_id, kind, self.hash(credentials))
+        entry = await self._get(key, open, close)
+        while entry.retired:
+            # Pool was closed by other borrower before this borrower got it.
+            entry = await self._get(key, open, close)
+        entry.borrowed += 1
+        try:
+            await self._evict()
+            yield entry.pool
+        finally:
+            entry.borrowed -= 1
+            entry.used_at = time()
+            if entry.retired and entry.borrowed == 0:
+                await self._close(entry)
+            self._start_timer()
+
+    async def close(self, resource_id: str):
+
+        """
+        Closes all pools of resource. Must be called when resource is changed or deleted.
+        """
+
+        for key in [key for key in self._pools if key[0] == resource_id]:
+            await self._retire(key)
+
+    async def close_all(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for key in list(self._pools):
+            await self._retire(key)
+
+
+resource_pool = ResourcePool(max_pools=tracardi.resource_pool_max, idle_ttl=tracardi.resource_pool_idle_ttl)
+# Closed after queued destination deliveries are sent.
+on_close(resource_pool.close_all, last=True)
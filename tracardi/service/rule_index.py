@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from collections import defaultdict
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from tracardi.config import memory_cache, tracardi
+from tracardi.domain.rule import Rule
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.storage.redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class RuleIndex:
+
+    """
+    Process local index of enabled routing rules keyed by (source id, event type). Rules are validated once,
+    when the index is built. Rules that do not validate are kept as raw dicts, so the rules engine reports them
+    as before.
+
+    Every change of rules increments a change marker in redis. The marker is checked in the background every
+    sync_interval seconds and the index is rebuilt only if the marker changed, so the lookup never waits for
+    storage after the first load. As a safety net the index is rebuilt anyway every full_reload syncs
+    (0 turns it off).
+    """
+
+    marker_key = "rule-index-version"
+
+    def __init__(self, sync_interval: int, redis: AsyncRedisClient = None, full_reload: int = 0):
+        self.sync_interval = sync_interval
+        self.full_reload = full_reload
+        self._syncs = 0
+        self._redis = redis
+        self._rules = {}  # type: Dict[Tuple[str, str], List[Union[Rule, dict]]]
+        self._marker = None  # type: Optional[int]
+        self._loaded = False
+        self._checked_at = 0
+        self._sync_task = None  # type: Optional[asyncio.Task]
+
+    @property
+    def redis(self) -> AsyncRedisClient:
+        if self._redis is None:
+            self._redis = AsyncRedisClient()
+        return self._redis
+
+    @staticmethod
+    def _key(rule: dict) -> Optional[Tuple[str, str]]:
+        try:
+            return rule['source']['id'], rule['event']['type']
+        except (KeyError, TypeError, AttributeError):
+            return None
+
+    @staticmethod
+    def _validate(rule: dict) -> Union[Rule, dict]:
+        try:
+            return Rule(**rule)
+        except ValidationError as e:
+            logger.error(f"Rule {rule.get('id', None)} is invalid. Details: {str(e)}")
+            return rule
+
+    def index(self, rules: List[dict]):
+        index = defaultdict(list)
+        for rule in rules:
+            if rule.get('enabled', True) is False:
+                continue
+            key = self._key(rule)
+            if key is None:
+                logger.error(f"Rule {rule.get('id', None)} has no source id or event type.")
+                continue
+            index[key].append(self._validate(rule))
+
+        self._rules = dict(index)
+        self._loaded = True
+
+    def upsert(self, rule: Rule):
+
+        """
+        Updates the index of this process. Other processes rebuild their indices after the marker change.
+        """
+
+        self.remove(rule.id)
+        if rule.enabled is False:
+            return
+        key = (rule.source.id, rule.event.type)
+        self._rules = {**self._rules, key: self._rules.get(key, []) + [rule]}
+
+    def remove(self, id: str):
+        rules = {}
+        for key, key_rules in self._rules.items():
+            key_rules = [rule for rule in key_rules if
+                         (rule.id if isinstance(rule, Rule) else rule.get('id', None)) != id]
+            if key_rules:
+                rules[key] = key_rules
+        self._rules = rules
+
+    async def _read_marker(self) -> Optional[int]:
+        marker = await self.redis.client.get(self.marker_key)
+        return int(marker) if marker is not None else None
+
+    async def mark_changed(self):
+        marker = await self.redis.client.incr(self.marker_key)
+        # Skip own change only. If other process changed rules in the meantime the index must be rebuilt.
+        if self._marker is not None and marker == self._marker + 1:
+            self._marker = marker
+
+    async def load(self, load_rules: Callable):
+        try:
+            marker = await self._read_marker()
+        except Exception as e:
+            logger.error(f"Could not read rule change marker. Details: {str(e)}")
+            marker = None
+        records = await load_rules()
+        self.index(list(records))
+        self._marker = marker
+        self._syncs = 0
+        self._checked_at = time()
+        logger.info(f"Rule index loaded {len(records)} enabled rules.")
+
+    async def _sync(self, load_rules: Callable):
+        try:
+            self._syncs += 1
+            marker = await self._read_marker()
+            if marker != self._marker or 0 < self.full_reload <= self._syncs:
+                await self.load(load_rules)
+        except Exception as e:
+            logger.error(f"Could not sync rule index. Old rules will be used. Details: {str(e)}")
+        finally:
+            self._checked_at = time()
+            self._sync_task = None
+
+    def invalidate(self):
+        self._loaded = False
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    async def get(self, source_id: str, event_types: List[str],
+                  load_rules: Callable) -> Dict[str, List[Union[Rule, dict]]]:
+
+        """
+        Returns rules for given source and event types. Callable load_rules must return all enabled rules. It is
+        awaited only on the first call. Later the index is synced in the background.
+        """
+
+        if not self.is_loaded():
+            await self.load(load_rules)
+        elif time() > self._checked_at + self.sync_interval and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync(load_rules))
+
+        return {event_type: self._rules.get((source_id, event_type.strip()), []) for event_type in event_types}
+
+
+rule_index = RuleIndex(sync_interval=memory_cache.rule_index_sync_interval,
+                       full_reload=memory_cache.rule_index_full_reload)
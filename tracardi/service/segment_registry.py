@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import defaultdict
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tracardi.config import memory_cache, tracardi
+from tracardi.domain.segment import Segment
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.process_engine.tql.condition import Condition
+from tracardi.service.notation.dot_accessor import DotAccessor
+from tracardi.service.storage.redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class IndexedSegment:
+
+    """
+    Enabled segment with pre-parsed condition. If the condition could not be parsed the error is kept and
+    raised on evaluation, so it is reported as any other segmentation error.
+    """
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+        self.id = segment.get_id()
+        self._error = None
+        try:
+            self._predicate = Condition().compile(segment.condition)
+        except Exception as e:
+            self._predicate = None
+            self._error = e
+
+    def evaluate(self, dot: DotAccessor) -> bool:
+        if self._error is not None:
+            raise self._error
+        return self._predicate(dot)
+
+
+class SegmentRegistry:
+
+    """
+    Process local registry of enabled segments indexed by event type. Segments are loaded once and refreshed
+    in the background, so segmentation does not wait for storage.
+
+    Every change of segments increments a change marker in redis. The marker is checked every sync_interval
+    seconds and segments are reloaded if the marker changed, so all processes see the change. Segments older
+    than SEGMENT_TTL are reloaded anyway.
+    """
+
+    marker_key = "segment-registry-version"
+
+    def __init__(self, ttl: int, sync_interval: int, redis: AsyncRedisClient = None):
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._redis = redis
+        self._by_event_type = {}  # type: Dict[str, List[IndexedSegment]]
+        self._for_all_events = []  # type: List[IndexedSegment]
+        self._loaded_at = None  # type: Optional[float]
+        self._marker = None  # type: Optional[int]
+        self._checked_at = 0
+        self._refresh_task = None  # type: Optional[asyncio.Task]
+
+    @property
+    def redis(self) -> AsyncRedisClient:
+        if self._redis is None:
+            self._redis = AsyncRedisClient()
+        return self._redis
+
+    def index(self, segments: List[Segment]):
+        by_event_type = defaultdict(list)
+        for_all_events = []
+        for segment in segments:
+            if segment.enabled is False:
+                continue
+            indexed_segment = IndexedSegment(segment)
+            if segment.eventType:
+                for event_type in set(segment.eventType):
+                    by_event_type[event_type].append(indexed_segment)
+            else:
+                for_all_events.append(indexed_segment)
+
+        self._by_event_type = dict(by_event_type)
+        self._for_all_events = for_all_events
+        self._loaded_at = time()
+
+    async def _read_marker(self) -> Optional[int]:
+        marker = await self.redis.client.get(self.marker_key)
+        return int(marker) if marker is not None else None
+
+    async def mark_changed(self):
+
+        """
+        Makes all processes reload segments. Segments must be searchable (index refreshed) before it is called.
+        """
+
+        await self.redis.client.incr(self.marker_key)
+        self.invalidate()
+
+    async def load(self, load_segments: Callable):
+        try:
+            marker = await self._read_marker()
+        except Exception as e:
+            logger.error(f"Could not read segment change marker. Details: {str(e)}")
+            marker = None
+        records = await load_segments()
+        self.index([Segment(**record) for record in records])
+        self._marker = marker
+        self._checked_at = time()
+        logger.info(f"Segment registry loaded {len(records)} enabled segments.")
+
+    async def _refresh(self, load_segments: Callable):
+        try:
+            if self.expired() or await self._read_marker() != self._marker:
+                await self.load(load_segments)
+        except Exception as e:
+            logger.error(f"Could not refresh segments. Old segments will be used. Details: {str(e)}")
+        finally:
+            self._checked_at = time()
+            self._refresh_task = None
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def expired(self) -> bool:
+        return self._loaded_at is None or time() > self._loaded_at + self.ttl
+
+    async def get(self, event_types: List[str], load_segments: Callable) -> List[Tuple[str, IndexedSegment]]:
+
+        """
+        Returns list of (event type, segment) pairs for given event types. Callable load_segments must return all
+        enabled segments. It is awaited only on the first call. Later the segments are refreshed in background.
+        """
+
+        if not self.is_loaded() and not self._by_event_type and not self._for_all_events:
+            await self.load(load_segments)
+        elif (self.expired() or time() > self._checked_at + self.sync_interval) and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh(load_segments))
+
+        segments = []
+        for event_type in event_types:
+            for segment in self._by_event_type.get(event_type, []):
+                segments.append((event_type, segment))
+            for segment in self._for_all_events:
+                segments.append((event_type, segment))
+        return segments
+
+
+segment_registry = SegmentRegistry(ttl=memory_cache.segment_ttl,
+                                   sync_interval=memory_cache.segment_registry_sync_interval)
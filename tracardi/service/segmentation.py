@@ -4,6 +4,7 @@ from typing import Callable
 from tracardi.config import tracardi
 from tracardi.domain.profile import Profile
 from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.segment_registry import segment_registry
 
 logger = logging.getLogger("Segmentation")
 logger.setLevel(tracardi.logging_level)
@@ -16,9 +17,8 @@ async def segment(profile: Profile, event_types: list, load_segments: Callable)
         # Segmentation
         if profile.operation.needs_update() or profile.operation.needs_segmentation():
             # Segmentation runs only if profile was updated or flow forced it
-            async for event_type, segment_id, error in profile.segment(
-                    event_types,
-                    load_segments):
+            segments = await segment_registry.get(event_types, load_segments)
+            async for event_type, segment_id, error in profile.segment(segments):
                 # Segmentation triggered
                 if error:
                     segmentation_result['errors'].append(error)
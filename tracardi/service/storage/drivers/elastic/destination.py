@@ -3,6 +3,7 @@ from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
 from tracardi.domain.destination import DestinationRecord
 from tracardi.domain.entity import Entity
 from tracardi.domain.storage_record import StorageRecords
+from tracardi.service.destination_registry import destination_registry
 from tracardi.service.storage.factory import storage_manager, StorageFor
 
 
@@ -15,11 +16,15 @@ async def load(id: str) -> DestinationRecord:
 
 
 async def save(destination: DestinationRecord) -> BulkInsertResult:
-    return await StorageFor(destination).index().save()
+    result = await StorageFor(destination).index().save()
+    destination_registry.invalidate()
+    return result
 
 
 async def delete(id: str):
-    return await StorageFor(Entity(id=id)).index("destination").delete()
+    result = await StorageFor(Entity(id=id)).index("destination").delete()
+    destination_registry.invalidate()
+    return result
 
 
 async def refresh():
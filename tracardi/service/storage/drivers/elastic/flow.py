@@ -5,6 +5,7 @@ from tracardi.exceptions.exception import TracardiException
 from tracardi.domain.flow import FlowRecord
 from tracardi.domain.entity import Entity
 from tracardi.service.storage.factory import StorageFor, storage_manager, StorageForBulk
+from tracardi.service.wf.service.compiled_flow_cache import compiled_flow_cache
 
 
 async def load_record(flow_id) -> FlowRecord:
@@ -13,10 +14,12 @@ async def load_record(flow_id) -> FlowRecord:
 
 
 async def save_record(flow_record: FlowRecord) -> BulkInsertResult:
+    compiled_flow_cache.invalidate(flow_record.id)
     return await StorageFor(flow_record).index().save()
 
 
 async def save(flow: NamedEntity) -> BulkInsertResult:
+    compiled_flow_cache.invalidate(flow.id)
     return await storage_manager("flow").upsert(flow)
 
 
@@ -1,36 +1,43 @@
-from typing import List, Optional
+from typing import List, Optional, Dict
 from tracardi.domain.entity import Entity
-from tracardi.config import elastic, tracardi
+from tracardi.config import elastic, tracardi, memory_cache
 from tracardi.domain.profile import Profile
 from tracardi.domain.storage_record import StorageRecord
 from tracardi.exceptions.exception import DuplicatedRecordException
-from tracardi.service.storage.factory import StorageFor, storage_manager
-from tracardi.service.storage.profile_cacher import ProfileCache
+from tracardi.service.storage.factory import StorageFor, storage_manager, StorageForBulk
+from tracardi.service.lru_cache import LRUCache
+from tracardi.service.storage.entity_cache import EntityCache, profile_cache, synced_profile_cache
+
+# Profile id -> id of the profile it was (finally) merged into.
+merged_profile_ids = LRUCache(memory_cache.entity_cache_size)
+
+
+def _get_cache() -> Optional[EntityCache]:
+    if tracardi.cache_profiles is True:
+        return profile_cache
+    if tracardi.sync_profile_tracks is True:
+        # Tracks of the profile are serialized without index refresh, so the next track reads the profile saved by
+        # the previous one from short living cache.
+        return synced_profile_cache
+    return None
 
 
 async def load_by_id(id: str) -> Optional[StorageRecord]:
     return await storage_manager("profile").load(id)
 
 
-async def load_merged_profile(id: str) -> Profile:
-
-    """
-    Loads current profile. If profile was merged then it loads merged profile.
-    """
+async def _load_profile(id: str) -> Optional[Profile]:
+    cache = _get_cache()
+    if cache is not None:
+        profile = await cache.get(id)
+        if profile is not None:
+            return profile
 
-    if tracardi.cache_profiles is True:
-        profile_cache = ProfileCache()
-        if profile_cache.exists(id):
-            return profile_cache.get_profile(id)
     try:
 
         entity = Entity(id=id)
-        profile = await StorageFor(entity).index('profile').load(Profile)  # type: Profile
-        if profile is not None and profile.metadata.merged_with is not None:
-            # Has merged profile
-            profile = await load_merged_profile(profile.metadata.merged_with)
-
-        return profile
+        # Duplicated profiles are merged below.
+        profile = await StorageFor(entity).index('profile').load(Profile, check_duplicates=True)  # type: Profile
 
     except DuplicatedRecordException:
 
@@ -39,16 +46,78 @@ async def load_merged_profile(id: str) -> Profile:
         valid_profile_record = _duplicated_profiles.first() # type: StorageRecord
         profile = valid_profile_record.to_entity(Profile)
 
-        if len(_duplicated_profiles) == 1:
-            # If 1 then there is no duplication
-            return profile
+        if len(_duplicated_profiles) > 1:
+            # We have duplicated records. Delete all but first profile.
+            for _profile_record in _duplicated_profiles[1:]:  # type: StorageRecord
+                if _profile_record.has_meta_data():
+                    await storage_manager('profile').delete(id, index=_profile_record.get_meta_data().index)
 
-        # We have duplicated records. Delete all but first profile.
-        for _profile_record in _duplicated_profiles[1:]:  # type: StorageRecord
-            if _profile_record.has_meta_data():
-                await storage_manager('profile').delete(id, index=_profile_record.get_meta_data().index)
+    if profile is not None and cache is not None:
+        await cache.set(profile)
 
-        return profile
+    return profile
+
+
+async def load_merged_profile(id: str) -> Profile:
+
+    """
+    Loads current profile. If profile was merged then it loads merged profile. Resolved merged_with chains are
+    memoized, so the next load of a merged profile id goes straight to the last known profile in the chain.
+    """
+
+    visited = set()
+    merged_ids = []
+    profile = await _load_profile(merged_profile_ids.get(id, id))
+    while profile is not None and profile.metadata.merged_with is not None and profile.id not in visited:
+        # Has merged profile
+        visited.add(profile.id)
+        merged_ids.append(profile.id)
+        profile = await _load_profile(profile.metadata.merged_with)
+
+    if profile is not None and merged_ids:
+        merged_profile_ids[id] = profile.id
+        for merged_id in merged_ids:
+            merged_profile_ids[merged_id] = profile.id
+
+    return profile
+
+
+async def load_many_merged_profiles(ids: List[str]) -> Dict[str, Profile]:
+
+    """
+    Loads current profiles of ids with one request. Merged profiles are resolved like in load_merged_profile.
+    Returns dict of requested id to profile, missing profiles are not returned.
+    """
+
+    profiles = {}  # type: Dict[str, Profile]
+    cache = _get_cache()
+    if cache is not None:
+        for id in ids:
+            profile = await cache.get(merged_profile_ids.get(id, id))
+            if profile is not None:
+                profiles[id] = profile
+
+    missing_ids = [id for id in ids if id not in profiles]
+    if missing_ids:
+        records = await StorageForBulk(
+            list(dict.fromkeys(merged_profile_ids.get(id, id) for id in missing_ids))).index("profile").load_many()
+        loaded = {}
+        for loaded_id, record in records.items():
+            profile = record.to_entity(Profile)
+            if cache is not None:
+                await cache.set(profile)
+            loaded[loaded_id] = profile
+        for id in missing_ids:
+            profile = loaded.get(merged_profile_ids.get(id, id), None)
+            if profile is not None:
+                profiles[id] = profile
+
+    for id, profile in profiles.items():
+        if profile.metadata.merged_with is not None:
+            # Rare case, chain of merged profiles is loaded one by one.
+            profiles[id] = await load_merged_profile(id)
+
+    return {id: profile for id, profile in profiles.items() if profile is not None}
 
 
 async def load_profiles_to_merge(merge_key_values: List[tuple], limit=1000) -> List[Profile]:
@@ -57,20 +126,22 @@ async def load_profiles_to_merge(merge_key_values: List[tuple], limit=1000) -> L
 
 
 async def save(profile: Profile, refresh_after_save=False):
-
-    # todo check if needed
-    if tracardi.cache_profiles is not False:
-        cache = ProfileCache()
-        cache.save_profile(profile)
-
     result = await StorageFor(profile).index().save()
+    cache = _get_cache()
+    if cache is not None:
+        await cache.set(profile)
     if refresh_after_save or elastic.refresh_profiles_after_save:
         await storage_manager('profile').flush()
     return result
 
 
 async def save_all(profiles: List[Profile]):
-    return await storage_manager("profile").upsert(profiles)
+    result = await storage_manager("profile").upsert(profiles)
+    cache = _get_cache()
+    if cache is not None:
+        for profile in profiles:
+            await cache.set(profile)
+    return result
 
 
 async def refresh():
@@ -82,7 +153,12 @@ async def flush():
 
 
 async def delete(id: str):
-    return await storage_manager('profile').delete(id)
+    result = await storage_manager('profile').delete(id)
+    merged_profile_ids.pop(id)
+    cache = _get_cache()
+    if cache is not None:
+        await cache.delete(id)
+    return result
 
 
 def scan(query: dict = None):
@@ -2,8 +2,10 @@ from tracardi.domain.storage_record import StorageRecords
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
 
 from tracardi.domain.entity import Entity
+from tracardi.service.destination_registry import destination_registry
+from tracardi.service.resource_pool import resource_pool
 from tracardi.service.storage.factory import StorageFor
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict
 from tracardi.domain.resource import Resource, ResourceRecord
 from tracardi.service.storage.factory import storage_manager, StorageForBulk
 
@@ -33,7 +35,11 @@ async def load_record(id: str) -> Optional[ResourceRecord]:
 
 async def save_record(resource: Resource) -> BulkInsertResult:
     resource_record = ResourceRecord.encode(resource)
-    return await StorageFor(resource_record).index().save()
+    result = await StorageFor(resource_record).index().save()
+    # Connections opened with old resource configuration must not be used.
+    await resource_pool.close(resource.id)
+    destination_registry.invalidate()
+    return result
 
 
 async def load_by_tag(tag):
@@ -52,5 +58,18 @@ async def load(id: str) -> Resource:
     return resource_config_record.decode()
 
 
+async def load_many(ids: List[str]) -> Dict[str, Resource]:
+
+    """
+    Loads resources with one request. Missing resources are not returned.
+    """
+
+    records = await StorageForBulk(ids).index("resource").load_many()
+    return {id: ResourceRecord(**record).decode() for id, record in records.items()}
+
+
 async def delete(id: str):
-    return await StorageFor(Entity(id=id)).index("resource").delete()
+    result = await StorageFor(Entity(id=id)).index("resource").delete()
+    await resource_pool.close(id)
+    destination_registry.invalidate()
+    return result
@@ -1,91 +1,38 @@
-import asyncio
 import logging
-from asyncio import Task
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Union
 
 from tracardi.config import tracardi
 from tracardi.domain.entity import Entity
-from tracardi.domain.storage_record import StorageRecords
+from tracardi.domain.storage_record import StorageRecords, StorageRecord
 
 from tracardi.domain.rule import Rule
 
 from tracardi.domain.event import Event
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
-from tracardi.event_server.utils.memory_cache import MemoryCache, CacheItem
 from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.rule_index import rule_index
 from tracardi.service.storage.factory import storage_manager, StorageFor
 
 logger = logging.getLogger(__name__)
 logger.setLevel(tracardi.logging_level)
 logger.addHandler(log_handler)
 
-memory_cache = MemoryCache()
 
+async def load_enabled() -> List[StorageRecord]:
+    # Rules that are not loaded are never run, so all pages are scanned.
+    query = {"query": {"query_string": {"query": "NOT enabled:false"}}}
+    return [record async for record in storage_manager(index="rule").scan(query)]
 
-def _get_cache_key(source_id, event_type):
-    return f"rules-{source_id}-{event_type}"
 
+async def load_rules(source: Entity, events: List[Event]) -> List[Tuple[List[Union[Rule, Dict]], Event]]:
 
-async def _load_rule(event_type, source_id):
-    query = {
-        "query": {
-            "bool": {
-                "must": [
-                    {
-                        "term": {
-                            "event.type": event_type.strip()
-                        }
-                    },
-                    {
-                        "term": {
-                            "source.id": source_id
-                        }
-                    },
-                    {
-                        "match": {
-                            "enabled": True
-                        }
-                    }
-                ]
-            }
-        }
-    }
-    return await storage_manager(index="rule").filter(query)
+    """
+    Returns rules for every event. Rules are read from the rule index. Rules that could not be validated
+    are returned as dicts.
+    """
 
-
-async def _get_rules_for_source_and_event_type(source: Entity, events: List[Event]) -> Dict[str, List[Dict]]:
-    event_types = {event.type for event in events}
-
-    # Cache rules per event types
-
-    event_type_rules = {}
-
-    for event_type in event_types:
-
-        cache_key = _get_cache_key(source.id, event_type)
-        if cache_key not in memory_cache:
-            logger.debug("Loading routing rules for cache key {}".format(cache_key))
-            rules = await _load_rule(event_type, source.id)
-
-            # todo set MemoryCache ttl from env
-            memory_cache[cache_key] = CacheItem(data=rules, ttl=15)
-
-        event_type_rules[event_type] = list(memory_cache[cache_key].data)
-
-    return event_type_rules
-
-
-def _read_rule(event_type: str, rules: Dict[str, List[Dict]]) -> List[Dict]:
-    if event_type not in rules:
-        return []
-
-    return rules[event_type]
-
-
-async def load_rules(source: Entity, events: List[Event]) -> List[Tuple[List[Dict], Event]]:
-    rules = await _get_rules_for_source_and_event_type(source, events)
-
-    return [(_read_rule(event.type, rules), event) for event in events]
+    rules = await rule_index.get(source.id, list({event.type for event in events}), load_enabled)
+    return [(list(rules.get(event.type, [])), event) for event in events]
 
 
 async def load_flow_rules(flow_id: str) -> List[Rule]:
@@ -102,11 +49,21 @@ async def load_by_id(id) -> Rule:
 
 
 async def delete_by_id(id) -> dict:
-    return await StorageFor(Entity(id=id)).index("rule").delete()
+    result = await StorageFor(Entity(id=id)).index("rule").delete()
+    rule_index.remove(id)
+    # Other processes reload rules after the marker change, so the change must be searchable before.
+    await refresh()
+    await rule_index.mark_changed()
+    return result
 
 
 async def save(rule: Rule) -> BulkInsertResult:
-    return await StorageFor(rule).index().save()
+    result = await StorageFor(rule).index().save()
+    rule_index.upsert(rule)
+    # See delete_by_id
+    await refresh()
+    await rule_index.mark_changed()
+    return result
 
 
 async def refresh():
@@ -1,4 +1,7 @@
-from tracardi.domain.storage_record import StorageRecords
+from typing import List
+
+from tracardi.domain.storage_record import StorageRecords, StorageRecord
+from tracardi.service.segment_registry import segment_registry
 from tracardi.service.storage.factory import storage_manager, StorageForBulk
 
 
@@ -7,6 +10,12 @@ async def load_segments(event_type, limit=500) -> StorageRecords:
         load_by_query_string("(NOT _exists_:eventType) OR eventType: \"{}\"".format(event_type, limit))
 
 
+async def load_enabled() -> List[StorageRecord]:
+    # Segments that are not loaded are never evaluated, so all pages are scanned.
+    query = {"query": {"query_string": {"query": "NOT enabled:false"}}}
+    return [record async for record in storage_manager(index="segment").scan(query)]
+
+
 async def load_all(start: int = 0, limit: int = 100) -> StorageRecords:
     return await StorageForBulk().index('segment').load(start, limit)
 
@@ -20,4 +29,8 @@ async def flush():
 
 
 async def save(data: dict):
-    return await storage_manager('segment').upsert(data)
+    result = await storage_manager('segment').upsert(data)
+    # All processes reload segments after the marker change, so the change must be searchable before.
+    await refresh()
+    await segment_registry.mark_changed()
+    return result
@@ -1,17 +1,18 @@
 import logging
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 import elasticsearch
 
-from tracardi.config import tracardi
+from tracardi.config import tracardi, elastic
 from tracardi.domain.profile import Profile
 from tracardi.domain.session import Session
 from tracardi.domain.storage_record import StorageRecord
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
 from tracardi.domain.entity import Entity
 from tracardi.exceptions.log_handler import log_handler
-from tracardi.service.storage.factory import StorageFor, storage_manager, StorageCrud
+from tracardi.service.storage.entity_cache import session_cache
+from tracardi.service.storage.factory import StorageFor, storage_manager, StorageCrud, StorageForBulk
 
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,11 @@ logger.addHandler(log_handler)
 
 
 async def save_sessions(profiles: List[Session]):
-    return await storage_manager("session").upsert(profiles)
+    result = await storage_manager("session").upsert(profiles)
+    if tracardi.cache_sessions is True:
+        for session in profiles:
+            await session_cache.set(session)
+    return result
 
 
 async def update_session_duration(session: Session):
@@ -47,6 +52,8 @@ async def update_session_duration(session: Session):
     }
     try:
         result = await storage.update_by_id(id=session.id, record=record, index=index, retry_on_conflict=3)
+        if tracardi.cache_sessions is True:
+            await session_cache.set(session)
         return result
     except elasticsearch.exceptions.ConflictError as e:
         logger.warning(f"Minor Session Conflict Error: Last session duration could not be updated. "
@@ -66,7 +73,10 @@ async def save_session(session: Session, profile: Optional[Profile], persist_ses
                     if profile is not None:
                         session.profile = Entity(id=profile.id)
                 session_index = StorageFor(session).index()  # type: StorageCrud
-                return await session_index.save()
+                result = await session_index.save()
+                if tracardi.cache_sessions is True:
+                    await session_cache.set(session)
+                return result
             else:
                 # Update session duration
                 await update_session_duration(session)
@@ -75,22 +85,61 @@ async def save_session(session: Session, profile: Optional[Profile], persist_ses
 
 
 async def save(session: Session):
-    return await StorageFor(session).index().save()
+    result = await StorageFor(session).index().save()
+    if tracardi.cache_sessions is True:
+        await session_cache.set(session)
+    return result
 
 
 async def exist(id: str) -> bool:
+    if tracardi.cache_sessions is True and await session_cache.get(id) is not None:
+        return True
     return await storage_manager("session").exists(id)
 
 
 async def load_by_id(id: str) -> Optional[Session]:
-    session_record = await storage_manager("session").load(id)
+    if tracardi.cache_sessions is True:
+        session = await session_cache.get(id)
+        if session is not None:
+            return session
+
+    # Tracker recovers duplicated sessions, see correct_session.
+    session_record = await storage_manager("session").load(id, check_duplicates=True)
     if session_record is None:
         return None
     session = session_record.to_entity(Session)
 
+    if tracardi.cache_sessions is True:
+        await session_cache.set(session)
+
     return session
 
 
+async def load_many(ids: List[str]) -> Dict[str, Session]:
+
+    """
+    Loads sessions with one request. Missing sessions are not returned.
+    """
+
+    sessions = {}  # type: Dict[str, Session]
+    if tracardi.cache_sessions is True:
+        for id in ids:
+            session = await session_cache.get(id)
+            if session is not None:
+                sessions[id] = session
+
+    missing_ids = [id for id in ids if id not in sessions]
+    if missing_ids:
+        records = await StorageForBulk(missing_ids).index("session").load_many()
+        for id, record in records.items():
+            session = record.to_entity(Session)
+            if tracardi.cache_sessions is True:
+                await session_cache.set(session)
+            sessions[id] = session
+
+    return sessions
+
+
 async def load_duplicates(id: str):
     return await storage_manager('session').query({
         "query": {
@@ -105,13 +154,25 @@ async def load_duplicates(id: str):
 
 
 async def delete(id: str):
-    return await storage_manager('session').delete(id)
+    result = await storage_manager('session').delete(id)
+    if tracardi.cache_sessions is True:
+        await session_cache.delete(id)
+    return result
 
 
 async def refresh():
     return await storage_manager('session').refresh()
 
 
+def is_write_behind() -> bool:
+    """
+    Returns True if sessions are saved with write behind buffer and all requests are served by one process
+    (ELASTIC_WRITE_BEHIND_SINGLE_PROCESS). Buffered sessions can be loaded before they are flushed, so they do
+    not need index refresh. The buffer is per process, so other processes still need the refresh.
+    """
+    return storage_manager('session').storage.write_behind and elastic.write_behind_single_process
+
+
 async def flush():
     return await storage_manager('session').flush()
 
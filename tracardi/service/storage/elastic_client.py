@@ -1,4 +1,5 @@
 import logging
+from typing import Awaitable, Callable, List
 from uuid import uuid4
 from elasticsearch import helpers, AsyncElasticsearch
 from elasticsearch.exceptions import NotFoundError
@@ -7,20 +8,48 @@ from tracardi.config import tracardi, ElasticConfig
 from tracardi import config
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
 from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.storage.write_behind_buffer import WriteBehindBuffer
 
 _singleton = None
+# Awaited by close before buffered documents are flushed and the connection is closed.
+_close_callbacks = []  # type: List[Callable[[], Awaitable]]
+# Awaited after the other callbacks, e.g. to close connections that the other callbacks use.
+_last_close_callbacks = []  # type: List[Callable[[], Awaitable]]
 logger = logging.getLogger(__name__)
 logger.setLevel(tracardi.logging_level)
 logger.addHandler(log_handler)
 
 
+def on_close(callback: Callable[[], Awaitable], last: bool = False):
+
+    """
+    Registers callback that is awaited on shutdown (ElasticClient.close), e.g. to send queued data. Callbacks
+    registered with last=True are awaited after the others, so they can close connection pools.
+    """
+
+    if last:
+        _last_close_callbacks.append(callback)
+    else:
+        _close_callbacks.append(callback)
+
+
 class ElasticClient:
 
     def __init__(self, **kwargs):
         self._cache = {}
         self._client = AsyncElasticsearch(**kwargs)
+        self.write_behind = WriteBehindBuffer(self._client,
+                                              batch_size=config.elastic.write_behind_batch_size,
+                                              flush_interval=config.elastic.write_behind_flush_interval)
 
     async def close(self):
+        for callback in _close_callbacks + _last_close_callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Shutdown callback failed. Details: {str(e)}")
+        # Flush buffered documents before shutdown
+        await self.write_behind.close()
         await self._client.close()
 
     async def get(self, index, id):
@@ -68,6 +97,10 @@ class ElasticClient:
     async def search(self, index, query):
         return await self._client.search(index=index, body=query)
 
+    async def mget(self, docs: list):
+        # Docs is a list of {"_index": ..., "_id": ...}. Index must not be an alias to many indices.
+        return await self._client.mget(body={"docs": docs})
+
     def scan(self, index, query, scroll="5m", size=1000):
         return helpers.async_scan(
             self._client,
@@ -81,7 +114,8 @@ class ElasticClient:
     def cluster(self):
         return self._client.cluster
 
-    async def insert(self, index, records) -> BulkInsertResult:
+    @staticmethod
+    def _get_bulk(index, records):
 
         if not isinstance(records, list):
             raise ValueError("Insert expects payload to be list.")
@@ -107,6 +141,10 @@ class ElasticClient:
 
             bulk.append(record)
 
+        return bulk, ids
+
+    async def insert(self, index, records) -> BulkInsertResult:
+        bulk, ids = self._get_bulk(index, records)
         success, errors = await helpers.async_bulk(self._client, bulk)
 
         return BulkInsertResult(
@@ -115,6 +153,16 @@ class ElasticClient:
             ids=ids
         )
 
+    async def insert_write_behind(self, key, index, records) -> BulkInsertResult:
+
+        """
+        Inserts records with the next buffered bulk request. Until then the records can be read with
+        self.write_behind.get(key, id).
+        """
+
+        bulk, _ = self._get_bulk(index, records)
+        return await self.write_behind.insert(key, bulk)
+
     async def update(self, index, id, record, retry_on_conflict=3):
         return await self._client.update(index, body=record, id=id, retry_on_conflict=retry_on_conflict)
 
@@ -1,10 +1,11 @@
 from asyncio import create_task, gather
 from collections import defaultdict
-from typing import List, Optional, Union, AsyncGenerator, Any
+from typing import List, Optional, Union, AsyncGenerator, Any, Dict
 
 import elasticsearch
 from pydantic import BaseModel
 
+from tracardi.config import elastic
 from tracardi.domain.entity import Entity
 from tracardi.domain.storage_record import StorageRecords, StorageRecord, RecordMetadata
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
@@ -12,6 +13,7 @@ from tracardi.exceptions.exception import DuplicatedRecordException
 from tracardi.service.storage import index
 from tracardi.service.storage.elastic_client import ElasticClient
 from tracardi.service.storage.index import Index
+from tracardi.service.storage.index_locator import index_locator
 
 
 class ElasticFiledSort:
@@ -46,16 +48,59 @@ class ElasticStorage:
             raise ValueError("There is no index defined for `{}`.".format(index_key))
         self.index = index.resources[index_key]  # type: Index
         self.index_key = index_key
+        self.write_behind = index_key in elastic.write_behind_indices
+
+    def _load_buffered(self, id) -> Optional[StorageRecord]:
+        buffered = self.storage.write_behind.get(self.index.get_index_alias(), id)
+        if buffered is None:
+            return None
+        index, document = buffered
+        output = StorageRecord.build_from_elastic({"_id": id, "_index": index, "_source": document})
+        output['id'] = id
+        return output
+
+    async def _load_located(self, id) -> Optional[StorageRecord]:
+        alias = self.index.get_index_alias()
+        located_index = index_locator.locate(alias, id)
+        if located_index is None:
+            return None
+        try:
+            result = await self.storage.get(located_index, id)
+        except elasticsearch.exceptions.NotFoundError:
+            # Stale location. Record was deleted or moved.
+            index_locator.forget(alias, id)
+            return None
+
+        output = StorageRecord.build_from_elastic(result)
+        output['id'] = result['_id']
+        return output
 
     async def exists(self, id) -> bool:
+        if self.write_behind and self._load_buffered(id) is not None:
+            return True
         if self.index.multi_index:
+            located_index = index_locator.locate(self.index.get_index_alias(), id)
+            if located_index is not None and await self.storage.exists(located_index, id):
+                return True
             return await self.load(id) is not None
         return await self.storage.exists(self.index.get_index_alias(), id)
 
     async def count(self, query: dict = None) -> bool:
         return await self.storage.count(self.index.get_index_alias(), query)
 
-    async def load(self, id) -> Optional[StorageRecord]:
+    async def load(self, id, check_duplicates: bool = False) -> Optional[StorageRecord]:
+
+        """
+        Loads record by id. Record of multi index alias is loaded with realtime GET if its index is known. GET
+        returns one document, so with check_duplicates the record is always searched for and
+        DuplicatedRecordException is raised if there are many records with the id.
+        """
+
+        if self.write_behind:
+            # Read your writes. Record can be saved but not flushed yet.
+            output = self._load_buffered(id)
+            if output is not None:
+                return output
         try:
             index = self.index.get_index_alias()
             if not self.index.multi_index:
@@ -65,6 +110,12 @@ class ElasticStorage:
                 output['id'] = result['_id']
 
             else:
+                if not check_duplicates:
+                    # Realtime GET if we know the index that holds the record.
+                    output = await self._load_located(id)
+                    if output is not None:
+                        return output
+
                 query = {
                     "query": {
                         "term": {
@@ -82,11 +133,78 @@ class ElasticStorage:
                     raise DuplicatedRecordException(f"Duplicated record {id} in index {index}. Search result: {records}")
 
                 output = records.first()
+                index_locator.remember(index, id, output.get_meta_data().index)
 
             return output
         except elasticsearch.exceptions.NotFoundError:
             return None
 
+    async def load_many(self, ids: List[str], indices: Dict[str, str] = None) -> Dict[str, StorageRecord]:
+
+        """
+        Loads records with one multi get. Returns dict of id to record, ids that were not found are skipped.
+        Indices may map id to the concrete index of the record (e.g. RecordMetadata.index). Records of multi
+        index alias with unknown index are searched for with one _id query.
+        """
+
+        ids = list(dict.fromkeys(ids))
+        alias = self.index.get_index_alias()
+        output = {}  # type: Dict[str, StorageRecord]
+
+        if self.write_behind:
+            for id in ids:
+                record = self._load_buffered(id)
+                if record is not None:
+                    output[id] = record
+
+        docs = []
+        for id in ids:
+            if id in output:
+                continue
+            if not self.index.multi_index:
+                docs.append({"_index": alias, "_id": id})
+            else:
+                index = indices.get(id) if indices else None
+                if index is None:
+                    index = index_locator.locate(alias, id)
+                if index is not None:
+                    docs.append({"_index": index, "_id": id})
+
+        if docs:
+            result = await self.storage.mget(docs)
+            for doc in result['docs']:
+                if doc.get('found') is True:
+                    record = StorageRecord.build_from_elastic(doc)
+                    record['id'] = doc['_id']
+                    output[doc['_id']] = record
+                    if self.index.multi_index:
+                        index_locator.remember(alias, doc['_id'], doc['_index'])
+                elif self.index.multi_index:
+                    index_locator.forget(alias, doc['_id'])
+
+        missing = [id for id in ids if id not in output]
+        if self.index.multi_index and missing:
+            query = {
+                # Room for duplicated records
+                "size": 2 * len(missing),
+                "query": {
+                    "ids": {
+                        "values": missing
+                    }
+                }
+            }
+            records = StorageRecords.build_from_elastic(await self.storage.search(alias, query))
+            found = {}
+            for record in records:
+                meta = record.get_meta_data()
+                if meta.id in found:
+                    raise DuplicatedRecordException(f"Duplicated record {meta.id} in index {alias}.")
+                found[meta.id] = record
+                index_locator.remember(alias, meta.id, meta.index)
+            output.update(found)
+
+        return output
+
     @staticmethod
     def _get_storage_record(record, replace_id, exclude=None) -> StorageRecord:
 
@@ -147,9 +265,24 @@ class ElasticStorage:
             index = self.get_storage_index(record)
             records = [record]
 
-        return await self.storage.insert(index, records)
+        if self.write_behind:
+            result = await self.storage.insert_write_behind(self.index.get_index_alias(), index, records)
+        else:
+            result = await self.storage.insert(index, records)
+
+        if self.index.multi_index:
+            alias = self.index.get_index_alias()
+            for id in result.ids:
+                index_locator.remember(alias, id, index)
+
+        return result
+
+    async def _evict_buffered(self, id: Optional[str] = None):
+        if self.write_behind:
+            await self.storage.write_behind.evict(self.index.get_index_alias(), id)
 
     async def delete(self, id, index: str = None):
+        await self._evict_buffered(id)
         if index is None:
             index = self.index.get_index_alias()
 
@@ -157,6 +290,7 @@ class ElasticStorage:
             # This function does not work on aliases
             return await self.storage.delete(index, id)
         else:
+            index_locator.forget(self.index.get_index_alias(), id)
             return await self.delete_by("_id", id, index)
 
     async def search(self, query) -> StorageRecords:
@@ -240,6 +374,7 @@ class ElasticStorage:
         if index is None:
             index = self.index.get_index_alias()
 
+        await self._evict_buffered(value if field == '_id' else None)
         return await self.storage.delete_by_query(index, query)
 
     async def load_by_values(self, fields_and_values: List[tuple], sort_by: Optional[List[ElasticFiledSort]] = None,
@@ -277,15 +412,20 @@ class ElasticStorage:
         return await self.storage.flush(self.index.get_write_index(), params, headers)
 
     async def update_by_query(self, query):
+        await self._evict_buffered()
         return await self.storage.update_by_query(index=self.index.get_index_alias(), query=query)
 
     async def update(self, id, record, index, retry_on_conflict=3):
+        await self._evict_buffered(id)
+        if self.index.multi_index:
+            index_locator.remember(self.index.get_index_alias(), id, index)
         return await self.storage.update(index=index,
                                          record=record,
                                          id=id,
                                          retry_on_conflict=retry_on_conflict)
 
     async def delete_by_query(self, query):
+        await self._evict_buffered()
         return await self.storage.delete_by_query(index=self.index.get_index_alias(), body=query)
 
     async def get_mapping(self, index):
@@ -0,0 +1,100 @@
+import json
+from typing import Optional, Type, Tuple
+from uuid import uuid4
+
+from tracardi.config import memory_cache, tracardi
+from tracardi.domain.entity import Entity
+from tracardi.domain.profile import Profile
+from tracardi.domain.session import Session
+from tracardi.domain.storage_record import RecordMetadata
+from tracardi.service.lru_cache import LRUCache
+from tracardi.service.storage.redis_client import AsyncRedisClient
+
+
+class EntityCache:
+
+    """
+    Two tier read-through cache of entities. Entities are kept in redis (shared by all workers) and in local LRU
+    cache. Every write stores a new version token in redis. Local copy is used only if its version is still the
+    current version, so a write on any worker invalidates local copies on all workers. Entity index
+    (RecordMetadata) is cached together with the entity so the entity is saved back to the same index.
+    Every entity has its own redis keys that expire ttl seconds after the last write.
+    """
+
+    def __init__(self, name: str, entity_class: Type[Entity], local_size: int, ttl: int,
+                 redis: AsyncRedisClient = None):
+        self.entity_class = entity_class
+        self.ttl = ttl
+        self._redis = redis
+        self._local = LRUCache(local_size)  # type: LRUCache
+        self._data_prefix = f"{name}-cache:"
+        self._version_prefix = f"{name}-cache-version:"
+
+        storage_info = entity_class.storage_info()
+        self._exclude = storage_info.exclude if storage_info is not None else None
+
+    @property
+    def redis(self) -> AsyncRedisClient:
+        if self._redis is None:
+            self._redis = AsyncRedisClient()
+        return self._redis
+
+    def _to_entity(self, id: str, index: Optional[str], data: str) -> Entity:
+        entity = self.entity_class(**json.loads(data))
+        if index is not None:
+            entity.set_meta_data(RecordMetadata(id=id, index=index))
+        return entity
+
+    async def get(self, id: str) -> Optional[Entity]:
+        local = self._local.get(id)  # type: Optional[Tuple[str, Optional[str], str]]
+        if local is not None:
+            version = await self.redis.client.get(f"{self._version_prefix}{id}")
+            if version is not None and version.decode() == local[0]:
+                return self._to_entity(id, local[1], local[2])
+            self._local.pop(id)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            await pipe.get(f"{self._version_prefix}{id}")
+            await pipe.get(f"{self._data_prefix}{id}")
+            version, item = await pipe.execute()
+
+        if version is None or item is None:
+            return None
+
+        item = json.loads(item)
+        if item['version'] != version.decode():
+            # Other worker is writing this entity right now.
+            return None
+
+        self._local[id] = (item['version'], item['index'], item['data'])
+        return self._to_entity(id, item['index'], item['data'])
+
+    async def set(self, entity: Entity):
+        version = uuid4().hex
+        metadata = entity.get_meta_data()
+        index = metadata.index if metadata is not None else None
+        data = entity.json(exclude=self._exclude)
+        item = json.dumps({"version": version, "index": index, "data": data})
+
+        async with self.redis.pipeline() as pipe:
+            await pipe.set(f"{self._version_prefix}{entity.id}", version, ex=self.ttl)
+            await pipe.set(f"{self._data_prefix}{entity.id}", item, ex=self.ttl)
+            await pipe.execute()
+
+        self._local[entity.id] = (version, index, data)
+
+    async def delete(self, id: str):
+        self._local.pop(id)
+        async with self.redis.pipeline() as pipe:
+            await pipe.delete(f"{self._version_prefix}{id}")
+            await pipe.delete(f"{self._data_prefix}{id}")
+            await pipe.execute()
+
+
+profile_cache = EntityCache("profile", Profile, local_size=memory_cache.entity_cache_size,
+                            ttl=memory_cache.entity_cache_ttl)
+session_cache = EntityCache("session", Session, local_size=memory_cache.entity_cache_size,
+                            ttl=memory_cache.entity_cache_ttl)
+# Profiles saved by serialized tracks (SYNC_PROFILE_TRACKS). Kept only until the profile index is refreshed.
+synced_profile_cache = EntityCache("synced-profile", Profile, local_size=memory_cache.entity_cache_size,
+                                   ttl=max(1, int(tracardi.sync_profile_tracks_lock_ttl)))
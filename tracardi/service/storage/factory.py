@@ -1,12 +1,12 @@
 import elasticsearch
-from typing import Union, List, Optional, TypeVar
+from typing import Union, List, Optional, TypeVar, Dict
 from tracardi.service.storage.elastic_storage import ElasticStorage, ElasticFiledSort
 from tracardi.service.storage.persistence_service import PersistenceService
 from tracardi.domain.entity import Entity
 from pydantic import BaseModel
 from tracardi.domain.agg_result import AggResult
 from tracardi.exceptions.exception import TracardiException, StorageException
-from tracardi.domain.storage_record import StorageRecords
+from tracardi.domain.storage_record import StorageRecords, StorageRecord
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
 import tracardi.domain.entity as domain
 
@@ -33,9 +33,9 @@ class BaseStorageCrud:
 
 class EntityStorageCrud(BaseStorageCrud):
 
-    async def load(self, domain_class_ref = None) -> Optional[Entity]:
+    async def load(self, domain_class_ref = None, check_duplicates: bool = False) -> Optional[Entity]:
         service = self._get_storage_service()
-        data = await service.load(self.entity.id)
+        data = await service.load(self.entity.id, check_duplicates)
         if data:
 
             if domain_class_ref is None:
@@ -138,6 +138,28 @@ class CollectionCrud:
                 raise StorageException(str(e), message=message, details=details)
             raise StorageException(str(e))
 
+    async def load_many(self) -> Dict[str, StorageRecord]:
+
+        """
+        Loads records of entities (or ids) in payload with one request. Entities with metadata are loaded
+        from the index they were read from.
+        """
+
+        if not isinstance(self.payload, list):
+            raise TracardiException("CollectionCrud data payload must be list.")
+
+        ids = []
+        indices = {}
+        for row in self.payload:
+            if isinstance(row, Entity):
+                ids.append(row.id)
+                if row.has_meta_data():
+                    indices[row.id] = row.get_meta_data().index
+            else:
+                ids.append(row)
+
+        return await self.storage.load_many(ids, indices)
+
     async def uniq_field_value(self, field, search=None, limit=500) -> AggResult:
         try:
             query = {
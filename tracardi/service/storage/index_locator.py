@@ -0,0 +1,32 @@
+from typing import Optional
+
+from tracardi.config import memory_cache
+from tracardi.service.lru_cache import LRUCache
+
+
+class IndexLocator:
+
+    """
+    Remembers the concrete (e.g. monthly) index that holds a document of a multi index alias. Documents with known
+    index can be read with GET instead of searching for _id across all indices of the alias. Location is only
+    a hint, if the document is not found in the remembered index it must be forgotten and searched for.
+    """
+
+    def __init__(self, size: int):
+        self._locations = LRUCache(size)
+
+    def remember(self, alias: str, id: str, index: str):
+        if index is not None and index != alias:
+            self._locations[(alias, id)] = index
+
+    def locate(self, alias: str, id: str) -> Optional[str]:
+        return self._locations.get((alias, id))
+
+    def forget(self, alias: str, id: str):
+        self._locations.pop((alias, id))
+
+    def clear(self):
+        self._locations.clear()
+
+
+index_locator = IndexLocator(size=memory_cache.index_locator_size)
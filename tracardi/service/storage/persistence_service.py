@@ -30,7 +30,10 @@ _logger.addHandler(log_handler)
 
 class SqlSearchQueryParser(metaclass=Singleton):
     def __init__(self):
-        self.parser = Parser(Parser.read('grammar/filter_condition.lark'), start='expr')
+        self.parser = Parser(Parser.read('grammar/filter_condition_lalr.lark'),
+                             start='expr',
+                             parser='lalr',
+                             fallback=Parser.read('grammar/filter_condition.lark'))
 
     def parse(self, query) -> Optional[dict]:
         if not query:
@@ -364,9 +367,19 @@ class PersistenceService:
                 raise StorageException(str(e), message=message, details=details)
             raise StorageException(str(e))
 
-    async def load(self, id: str) -> Optional[StorageRecord]:
+    async def load(self, id: str, check_duplicates: bool = False) -> Optional[StorageRecord]:
         try:
-            return await self.storage.load(id)
+            return await self.storage.load(id, check_duplicates)
+        except elasticsearch.exceptions.ElasticsearchException as e:
+            _logger.error(str(e))
+            if len(e.args) == 2:
+                message, details = e.args
+                raise StorageException(str(e), message=message, details=details)
+            raise StorageException(str(e))
+
+    async def load_many(self, ids: List[str], indices: Dict[str, str] = None) -> Dict[str, StorageRecord]:
+        try:
+            return await self.storage.load_many(ids, indices)
         except elasticsearch.exceptions.ElasticsearchException as e:
             _logger.error(str(e))
             if len(e.args) == 2:
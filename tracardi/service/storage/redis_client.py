@@ -1,7 +1,9 @@
 import logging
+from typing import Dict
 
 import aioredis
 import redis
+from aioredis.client import Script
 
 from tracardi.exceptions.log_handler import log_handler
 from tracardi.service.singleton import Singleton
@@ -13,8 +15,42 @@ logger.addHandler(log_handler)
 
 
 class AsyncRedisClient(metaclass=Singleton):
-    def __init__(self, host):
-        self.client = aioredis.from_url(host)
+
+    """
+    Asyncio redis client. Connections are taken from a shared connection pool, so the client can be used
+    concurrently from many request handlers without blocking the event loop.
+    """
+
+    def __init__(self, host=None):
+        if host is None:
+            host = redis_config.redis_host
+        password = redis_config.redis_password
+
+        if password is None:
+            self.client = aioredis.from_url(host, max_connections=redis_config.redis_max_connections)
+        else:
+            self.client = aioredis.from_url(host, password=password,
+                                            max_connections=redis_config.redis_max_connections)
+
+        self._scripts = {}  # type: Dict[str, Script]
+
+        logger.info(f"Async redis at {host} connected.")
+
+    def register_script(self, script: str) -> Script:
+        """
+        Returns lua script registered once per client. Script is called with EVALSHA and loaded again only if
+        redis does not have it.
+        """
+        if script not in self._scripts:
+            self._scripts[script] = self.client.register_script(script)
+        return self._scripts[script]
+
+    def pipeline(self, transaction: bool = True) -> aioredis.client.Pipeline:
+        """
+        Returns pipeline that sends all queued commands in one round trip. If transaction is True the commands
+        are wrapped in MULTI/EXEC. Use it as async context manager and await pipeline.execute().
+        """
+        return self.client.pipeline(transaction=transaction)
 
 
 class RedisClient(metaclass=Singleton):
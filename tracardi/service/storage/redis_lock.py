@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Optional
+from uuid import uuid4
+
+from tracardi.config import tracardi
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.storage.redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+# Deletes the lock only if it is still owned by the caller and wakes up the waiting workers.
+_release_script = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+    redis.call('publish', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Extends TTL of the lock only if it is still owned by the caller.
+_extend_script = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisLock:
+
+    """
+    Distributed lock. The lock is a key set with SET NX and TTL, so a lock of a dead worker expires. Every
+    acquisition stores a random token as the key value. Only the owner of the token can release the lock. Waiting
+    workers are woken up by a pub/sub message sent on release instead of polling. TTL of the acquired lock is
+    extended every ttl / 3 seconds until it is released, so the lock does not expire while its owner still works.
+    """
+
+    def __init__(self, name: str, ttl: float, redis: AsyncRedisClient = None):
+        self.redis = redis if redis is not None else AsyncRedisClient()
+        self.key = f"lock:{name}"
+        self.channel = f"lock-released:{name}"
+        self.ttl = ttl
+        self.token = None  # type: Optional[str]
+        self._renewal = None  # type: Optional[asyncio.Task]
+
+    async def _try_acquire(self) -> bool:
+        token = uuid4().hex
+        if await self.redis.client.set(self.key, token, px=int(self.ttl * 1000), nx=True):
+            self.token = token
+            self._renewal = asyncio.create_task(self._renew(token))
+            return True
+        return False
+
+    async def _renew(self, token: str):
+        script = self.redis.register_script(_extend_script)
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                extended = await script(keys=[self.key], args=[token, int(self.ttl * 1000)])
+            except Exception as e:
+                # Lock expires after ttl if it can not be extended.
+                logger.warning(f"Could not extend lock {self.key}. Details: {str(e)}")
+                continue
+            if not extended:
+                logger.warning(f"Lock {self.key} expired before it was released.")
+                return
+
+    async def _stop_renewal(self):
+        if self._renewal is not None:
+            self._renewal.cancel()
+            try:
+                await self._renewal
+            except asyncio.CancelledError:
+                pass
+            self._renewal = None
+
+    async def acquire(self, timeout: float) -> bool:
+
+        """
+        Waits at most timeout seconds for the lock. Returns True if lock was acquired.
+        """
+
+        if await self._try_acquire():
+            return True
+
+        deadline = monotonic() + timeout
+        pubsub = self.redis.client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            while True:
+                # Try again after subscription, the lock could be released in the meantime.
+                if await self._try_acquire():
+                    return True
+
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return False
+
+                # Wait for release message. Lock can also expire without a message, so do not wait forever.
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(remaining, self.ttl))
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def release(self) -> bool:
+        if self.token is None:
+            return False
+        await self._stop_renewal()
+        script = self.redis.register_script(_release_script)
+        result = await script(keys=[self.key, self.channel], args=[self.token])
+        self.token = None
+        return bool(result)
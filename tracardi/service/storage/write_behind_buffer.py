@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from collections import defaultdict
+from time import monotonic
+from typing import List, Tuple, Optional, Dict
+
+from elasticsearch import helpers
+from elasticsearch.helpers import BulkIndexError
+
+from tracardi.config import tracardi
+from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
+from tracardi.exceptions.log_handler import log_handler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class WriteBehindBuffer:
+
+    """
+    Coalesces bulk inserts of concurrent requests into one bulk request. Buffer is flushed when it has batch_size
+    documents or flush_interval seconds after the first buffered insert. Every insert waits for the flush and gets
+    its own result (or exception), so callers still await the result of their save.
+
+    Buffered documents are kept in an overlay, so they can be read before they are flushed. After the flush they
+    stay in the overlay for overlay_ttl seconds, the time elastic needs to make them searchable.
+    """
+
+    def __init__(self, client, batch_size: int = 500, flush_interval: float = 0.05, overlay_ttl: float = 2):
+        self._client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overlay_ttl = overlay_ttl
+        self._pending = []  # type: List[Tuple[str, List[dict], asyncio.Future]]
+        self._pending_size = 0
+        self._overlay = defaultdict(dict)  # type: Dict[str, Dict[str, Tuple[str, dict, Optional[float]]]]
+        self._timer = None  # type: Optional[asyncio.TimerHandle]
+        self._flush_tasks = set()
+
+    def __len__(self):
+        return self._pending_size
+
+    async def insert(self, key: str, actions: List[dict]) -> BulkInsertResult:
+
+        """
+        Buffers bulk actions. Key is the name (e.g. index alias) the documents can be read with from overlay.
+        """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self._pending.append((key, actions, future))
+        self._pending_size += len(actions)
+        for action in actions:
+            self._overlay[key][action['_id']] = (action['_index'], action['_source'], None)
+
+        if self._pending_size >= self.batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+
+        return await future
+
+    def get(self, key: str, id: str) -> Optional[Tuple[str, dict]]:
+
+        """
+        Returns (index, document) of buffered or recently flushed document.
+        """
+
+        documents = self._overlay.get(key)
+        if not documents or id not in documents:
+            return None
+        index, document, expires = documents[id]
+        if expires is not None and monotonic() > expires:
+            del documents[id]
+            return None
+        return index, document
+
+    async def evict(self, key: str, id: Optional[str] = None):
+
+        """
+        Flushes buffered document (all documents of key if id is None) and removes it from overlay. Must be called
+        before the document is updated or deleted directly, otherwise the buffered copy would overwrite the change
+        or be read instead of it.
+        """
+
+        if any(pending_key == key and (id is None or any(action['_id'] == id for action in actions))
+               for pending_key, actions, _ in self._pending):
+            await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+        if id is None:
+            self._overlay.pop(key, None)
+        elif key in self._overlay:
+            self._overlay[key].pop(id, None)
+
+    def _schedule_flush(self):
+        task = asyncio.ensure_future(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending, self._pending_size = self._pending, [], 0
+        if not pending:
+            return
+
+        self._remove_expired()
+
+        actions = [action for _, key_actions, _ in pending for action in key_actions]
+
+        try:
+            _, errors = await helpers.async_bulk(self._client, actions, chunk_size=self.batch_size,
+                                                 raise_on_error=False)
+        except Exception as e:
+            logger.error(f"Write behind flush failed. Details: {str(e)}")
+            for key, key_actions, future in pending:
+                self._expire_overlay(key, key_actions, set(action['_id'] for action in key_actions))
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        failed_ids = defaultdict(list)
+        for error in errors:
+            for item in error.values():
+                failed_ids[item.get('_id')].append(error)
+
+        for key, key_actions, future in pending:
+            ids = [action['_id'] for action in key_actions]
+            key_errors = [error for id in ids for error in failed_ids.get(id, [])]
+            self._expire_overlay(key, key_actions, set(id for id in ids if id in failed_ids))
+            if future.done():
+                continue
+            if key_errors:
+                future.set_exception(BulkIndexError(f"{len(key_errors)} document(s) failed to index.", key_errors))
+            else:
+                future.set_result(BulkInsertResult(saved=len(ids), errors=[], ids=ids))
+
+    def _expire_overlay(self, key: str, actions: List[dict], failed_ids: set):
+        documents = self._overlay[key]
+        expires = monotonic() + self.overlay_ttl
+        for action in actions:
+            id = action['_id']
+            # Newer version of the document could be buffered in the meantime.
+            if id in documents and documents[id][1] is action['_source']:
+                if id in failed_ids:
+                    del documents[id]
+                else:
+                    documents[id] = (action['_index'], action['_source'], expires)
+
+    def _remove_expired(self):
+        now = monotonic()
+        for documents in self._overlay.values():
+            for id in [id for id, (_, _, expires) in documents.items() if expires is not None and now > expires]:
+                del documents[id]
+
+    async def close(self):
+        await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
@@ -1,90 +1,98 @@
 import asyncio
 import logging
-from typing import Optional
+from typing import Optional, Dict
 from tracardi.domain.entity import Entity
-from tracardi.config import redis_config, tracardi
+from tracardi.config import tracardi
 from tracardi.exceptions.log_handler import log_handler
-from tracardi.service.storage.driver import storage
-from tracardi.service.storage.redis_client import AsyncRedisClient, RedisClient
+from tracardi.service.storage.redis_lock import RedisLock
 
 logger = logging.getLogger('tracardi.api.event_server')
 logger.setLevel(tracardi.logging_level)
 logger.addHandler(log_handler)
 
 
-# todo try to use this.
-class AsyncProfileTracksSynchronizer:
-    def __init__(self, profile: Optional[Entity], wait=0.1):
-        self.wait = wait
-        self.profile = profile
-        self.redis = AsyncRedisClient(redis_config.redis_host)
-        self.hash = "profile-blocker"
+class _LocalProfileLocks:
 
-    async def __aenter__(self):
-        max_repeats = 10
-        while True:
-            if await self._is_profile_processed() and max_repeats > 0:
-                logger.info(f"Waiting for /track/{self.profile.id} to finish. Repeat {max_repeats}")
-                await asyncio.sleep(self.wait)
-                max_repeats -= 1
-            else:
-                await self._set_profile_process_id()
-                return self
+    """
+    In-process locks. Requests for the same profile that land on the same worker wait here and do not compete for
+    the distributed lock.
+    """
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self._delete_profile_process_id()
+    def __init__(self):
+        self._locks = {}  # type: Dict[str, asyncio.Lock]
+        self._waiting = {}  # type: Dict[str, int]
 
-    def _has_profile(self):
-        return self.profile is not None and self.profile.id is not None
+    async def acquire(self, profile_id: str):
+        lock = self._locks.get(profile_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[profile_id] = lock
+            self._waiting[profile_id] = 0
+        self._waiting[profile_id] += 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._forget(profile_id)
+            raise
+
+    def release(self, profile_id: str):
+        self._locks[profile_id].release()
+        self._forget(profile_id)
+
+    def has_waiters(self, profile_id: str) -> bool:
+        return self._waiting.get(profile_id, 0) > 1
 
-    async def _is_profile_processed(self):
-        if self._has_profile():
-            return await self.redis.client.hexists(self.hash, self.profile.id)
-        return False
+    def _forget(self, profile_id: str):
+        self._waiting[profile_id] -= 1
+        if self._waiting[profile_id] == 0:
+            del self._waiting[profile_id]
+            del self._locks[profile_id]
 
-    async def _delete_profile_process_id(self):
-        if self._has_profile():
-            return await self.redis.client.hdel(self.hash, self.profile.id)
+    def __len__(self):
+        return len(self._locks)
 
-    async def _set_profile_process_id(self):
-        if self._has_profile():
-            return await self.redis.client.hset(self.hash, self.profile.id, '1')
+
+local_profile_locks = _LocalProfileLocks()
 
 
 class ProfileTracksSynchronizer:
-    def __init__(self, profile: Optional[Entity], wait=0.1, max_repeats=20):
+
+    """
+    Serializes /track requests of the same profile. Requests on the same worker wait on local lock, requests on
+    different workers on distributed redis lock that wakes up waiting workers on release. If the lock can not be
+    acquired in wait * max_repeats seconds the request is processed anyway. Profile index is not refreshed, the next
+    request reads the saved profile from cache (see profile storage driver).
+    """
+
+    def __init__(self, profile: Optional[Entity], wait=0.1, max_repeats=20, ttl=None):
         self.wait = wait
         self.profile = profile
-        self.redis = RedisClient()
-        self.hash = "profile-blocker"
         self.max_repeats = max_repeats
+        self.ttl = ttl if ttl is not None else tracardi.sync_profile_tracks_lock_ttl
+        self.lock = None  # type: Optional[RedisLock]
 
     async def __aenter__(self):
-        while True:
-            if self._is_profile_processed() and self.max_repeats > 0:
-                logger.info(f"Waiting for /track/{self.profile.id} to finish. Left repeats {self.max_repeats}")
-                await asyncio.sleep(self.wait)
-                self.max_repeats -= 1
-            else:
-                self._set_profile_process_id()
-                return self
+        if not self._has_profile():
+            return self
+
+        await local_profile_locks.acquire(self.profile.id)
+        try:
+            self.lock = RedisLock(f"profile:{self.profile.id}", ttl=self.ttl)
+            if not await self.lock.acquire(timeout=self.wait * self.max_repeats):
+                logger.warning(f"Could not lock profile {self.profile.id}. /track is processed without lock.")
+        except BaseException:
+            local_profile_locks.release(self.profile.id)
+            raise
+        return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await storage.driver.profile.refresh()
-        self._delete_profile_process_id()
+        if not self._has_profile():
+            return
+
+        try:
+            await self.lock.release()
+        finally:
+            local_profile_locks.release(self.profile.id)
 
     def _has_profile(self):
         return self.profile is not None and self.profile.id is not None
-
-    def _is_profile_processed(self):
-        if self._has_profile():
-            return self.redis.client.hexists(self.hash, self.profile.id)
-        return False
-
-    def _delete_profile_process_id(self):
-        if self._has_profile():
-            return self.redis.client.hdel(self.hash, self.profile.id)
-
-    def _set_profile_process_id(self):
-        if self._has_profile():
-            return self.redis.client.hset(self.hash, self.profile.id, '1')
@@ -1,12 +1,90 @@
+import asyncio
+
 import aiohttp
-from typing import Union, Tuple, Callable, List
+from typing import Union, Tuple, Callable, List, Optional
 from contextlib import asynccontextmanager
+from yarl import URL
+
+from tracardi.config import tracardi
+from tracardi.service.resource_pool import ResourcePool
+from tracardi.service.storage.elastic_client import on_close
+
+
+async def _open_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=tracardi.http_pool_limit_per_host,
+                                     limit_per_host=tracardi.http_pool_limit_per_host,
+                                     ttl_dns_cache=tracardi.http_dns_cache_ttl,
+                                     keepalive_timeout=tracardi.http_keepalive_timeout)
+    # Session is shared by all clients. Cookies are kept by every HttpClient in its own cookie jar.
+    return aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+
+
+async def _close_session(session: aiohttp.ClientSession):
+    await session.close()
+
+
+class HttpSessionPool:
+
+    """
+    Keep-alive sessions shared by all outbound http requests of the process. Every host has its own session with
+    bounded connection pool and DNS cache, so a slow host can not take connections of other hosts. Sessions of
+    hosts that were not called for idle_ttl seconds are closed.
+    """
+
+    def __init__(self, max_hosts: int, idle_ttl: int):
+        self._sessions = ResourcePool(max_pools=max_hosts, idle_ttl=idle_ttl)
+
+    @staticmethod
+    def host(url: Union[str, URL]) -> str:
+        url = URL(str(url))
+        return f"{url.scheme}://{url.host}:{url.port}"
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def borrow(self, url: Union[str, URL]):
+
+        """
+        Returns async context manager that yields session for the host of url.
+        """
+
+        # Sessions are bound to event loop. Session of the old loop is closed when the loop changes.
+        return self._sessions.borrow(self.host(url), "http", {"loop": id(asyncio.get_running_loop())},
+                                     open=_open_session, close=_close_session)
+
+    async def close(self):
+
+        """
+        Closes all sessions. It is called on shutdown.
+        """
+
+        await self._sessions.close_all()
+
+
+http_session_pool = HttpSessionPool(max_hosts=tracardi.http_pool_max_hosts, idle_ttl=tracardi.http_pool_idle_ttl)
+# Closed after queued destination deliveries are sent.
+on_close(http_session_pool.close, last=True)
 
 
 class HttpClient:
 
+    """
+    Http client with retries. Requests are sent with keep-alive sessions from http_session_pool. Session
+    parameters headers, cookies, auth and timeout are used as defaults of every request. Cookies set by responses
+    are kept in the cookie jar of the client and sent with its next requests, as with its own session. If the
+    client is created with other session parameters (e.g. connector) it opens its own session.
+    """
+
+    request_defaults = ('headers', 'cookies', 'auth', 'timeout')
+
     def __init__(self, retries: int = 1, accept_status: Union[int, Tuple[int], List[int]] = 200, *args, **kwargs):
-        self.client = aiohttp.ClientSession(*args, **kwargs)
+        if args or any(key not in self.request_defaults for key in kwargs):
+            self.client = aiohttp.ClientSession(*args, **kwargs)
+            self.defaults = {}
+        else:
+            self.client = None
+            self.defaults = kwargs
+        self.cookie_jar = None  # type: Optional[aiohttp.CookieJar]
         self.retries = retries if retries >= 1 else 1
         self.accept_status = tuple([accept_status]) if isinstance(accept_status, int) else accept_status
 
@@ -15,33 +93,62 @@ class HttpClient:
             response = await func(*args, **kwargs)
             if response.status in self.accept_status or retry == self.retries - 1:
                 return response
+            response.release()
 
-    @asynccontextmanager
-    async def request(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.request, *args, **kwargs)
+    def _with_defaults(self, url: Union[str, URL], kwargs: dict) -> dict:
+        for key, value in self.defaults.items():
+            if kwargs.get(key, None) is None:
+                kwargs[key] = value
+            elif key in ('headers', 'cookies') and value:
+                kwargs[key] = {**value, **kwargs[key]}
 
-    @asynccontextmanager
-    async def get(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.get, *args, **kwargs)
+        if self.cookie_jar is None:
+            # Cookie jar is bound to the running event loop.
+            self.cookie_jar = aiohttp.CookieJar()
+        cookies = {name: morsel.value for name, morsel in self.cookie_jar.filter_cookies(URL(str(url))).items()}
+        if cookies:
+            kwargs['cookies'] = {**cookies, **(kwargs.get('cookies', None) or {})}
+        return kwargs
 
-    @asynccontextmanager
-    async def put(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.put, *args, **kwargs)
+    def _update_cookies(self, response: aiohttp.ClientResponse):
+        for redirect in response.history:
+            self.cookie_jar.update_cookies(redirect.cookies, redirect.url)
+        self.cookie_jar.update_cookies(response.cookies, response.url)
 
     @asynccontextmanager
-    async def post(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.post, *args, **kwargs)
+    async def request(self, method: str, url: Union[str, URL], **kwargs):
+        if self.client is not None:
+            response = await self._run_with_retries(self.client.request, method, url, **kwargs)
+            yield response
+            return
 
-    @asynccontextmanager
-    async def delete(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.delete, *args, **kwargs)
+        async with http_session_pool.borrow(url) as session:
+            response = await self._run_with_retries(session.request, method, url, **self._with_defaults(url, kwargs))
+            self._update_cookies(response)
+            try:
+                yield response
+            finally:
+                # Returns connection to the pool.
+                response.release()
 
-    @asynccontextmanager
-    async def patch(self, *args, **kwargs):
-        yield await self._run_with_retries(self.client.patch, *args, **kwargs)
+    def get(self, url: Union[str, URL], **kwargs):
+        return self.request(aiohttp.hdrs.METH_GET, url, **kwargs)
+
+    def put(self, url: Union[str, URL], **kwargs):
+        return self.request(aiohttp.hdrs.METH_PUT, url, **kwargs)
+
+    def post(self, url: Union[str, URL], **kwargs):
+        return self.request(aiohttp.hdrs.METH_POST, url, **kwargs)
+
+    def delete(self, url: Union[str, URL], **kwargs):
+        return self.request(aiohttp.hdrs.METH_DELETE, url, **kwargs)
+
+    def patch(self, url: Union[str, URL], **kwargs):
+        return self.request(aiohttp.hdrs.METH_PATCH, url, **kwargs)
 
     async def __aenter__(self) -> 'HttpClient':
         return self
 
     async def __aexit__(self, exc_t, exc_v, exc_tb) -> None:
-        await self.client.close()
+        if self.client is not None:
+            await self.client.close()
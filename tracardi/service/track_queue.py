@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from tracardi.config import tracardi
+from tracardi.domain.event_metadata import EventPayloadMetadata
+from tracardi.domain.payload.tracker_payload import TrackerPayload
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.batch_tracker import BatchTracker
+from tracardi.service.tracker import validate_payload_source, get_track_shard_key
+from tracardi.service.tracker_shards import HashRing, get_shard_key
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class QueueMessage:
+
+    """
+    Message received from track queue. Delivery is the message of the queue implementation (e.g. kombu message).
+    """
+
+    def __init__(self, body: dict, delivery: Any = None):
+        self.body = body
+        self.delivery = delivery
+
+
+class TrackQueue(ABC):
+
+    """
+    Durable queue of tracker payloads split into partitions. Messages of one partition are consumed in order by
+    one consumer.
+    """
+
+    def __init__(self, partitions: int, replicas: int = 64):
+        self.partitions = partitions
+        self.ring = HashRing(partitions, replicas)
+
+    def get_partition(self, tracker_payload: TrackerPayload) -> int:
+        return self.get_key_partition(get_shard_key(
+            tracker_payload.profile.id if tracker_payload.profile is not None else None,
+            tracker_payload.session.id if tracker_payload.session is not None else None
+        ))
+
+    def get_key_partition(self, key: Optional[str]) -> int:
+        return self.ring.get(key) if key is not None else 0
+
+    @abstractmethod
+    async def publish(self, partition: int, body: dict):
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_batch(self, partition: int, size: int, linger: float, timeout: float = 1) -> List[QueueMessage]:
+
+        """
+        Returns at most size messages. Waits up to timeout for the first message and then up to linger for
+        the rest of the batch. Returns empty list if there are no messages.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def ack(self, partition: int, message: QueueMessage):
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def dead_letter(self, partition: int, message: QueueMessage):
+        raise NotImplementedError()
+
+    async def close(self):
+        pass
+
+    @staticmethod
+    async def _get_batch(messages: asyncio.Queue, size: int, linger: float, timeout: float) -> List[QueueMessage]:
+        try:
+            batch = [await asyncio.wait_for(messages.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + linger
+        while len(batch) < size:
+            if not messages.empty():
+                batch.append(messages.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(messages.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+
+class MemoryTrackQueue(TrackQueue):
+
+    """
+    Local in-memory track queue. It is not durable. Use it in tests and single process setups.
+    """
+
+    def __init__(self, partitions: int, replicas: int = 64):
+        super().__init__(partitions, replicas)
+        self._messages = {}  # type: Dict[int, asyncio.Queue]
+        self.acked = []  # type: List[QueueMessage]
+        self.dead_letters = []  # type: List[QueueMessage]
+
+    def _get_messages(self, partition: int) -> asyncio.Queue:
+        if partition not in self._messages:
+            self._messages[partition] = asyncio.Queue()
+        return self._messages[partition]
+
+    def size(self, partition: int) -> int:
+        return self._get_messages(partition).qsize()
+
+    async def publish(self, partition: int, body: dict):
+        self._get_messages(partition).put_nowait(QueueMessage(body))
+
+    async def get_batch(self, partition: int, size: int, linger: float, timeout: float = 1) -> List[QueueMessage]:
+        return await self._get_batch(self._get_messages(partition), size, linger, timeout)
+
+    async def ack(self, partition: int, message: QueueMessage):
+        self.acked.append(message)
+
+    async def dead_letter(self, partition: int, message: QueueMessage):
+        self.dead_letters.append(message)
+
+
+def get_track_queue() -> TrackQueue:
+    # Kombu is imported only when RabbitMQ queue is used.
+    from tracardi.service.rabbitmq.track_queue import RabbitMqTrackQueue
+    return RabbitMqTrackQueue(
+        uri=tracardi.track_queue_uri,
+        name=tracardi.track_queue_name,
+        partitions=tracardi.track_queue_partitions,
+        prefetch=tracardi.track_queue_prefetch
+    )
+
+
+async def enqueue_event_tracking(queue: TrackQueue, tracker_payload: TrackerPayload, host: str, profile_less: bool,
+                                 allowed_bridges: List[str]) -> int:
+
+    """
+    Validates the source and appends the tracker payload to the queue. The payload is tracked later by
+    TrackQueueConsumer, so the collector can respond with 202 Accepted. Collector calls it instead of
+    synchronized_event_tracking. Returns the partition.
+    """
+
+    await validate_payload_source(tracker_payload, allowed_bridges)
+
+    # Session id is needed for partitioning, and all tracks of the new session must use the same id.
+    tracker_payload.force_there_is_a_session()
+
+    # Tracks of the profile go to one partition, also the ones without profile id of the existing session.
+    partition = queue.get_key_partition(await get_track_shard_key(tracker_payload))
+    await queue.publish(partition, {
+        "payload": json.loads(tracker_payload.json()),
+        "ip": host,
+        "profile_less": profile_less,
+        "allowed_bridges": allowed_bridges
+    })
+    return partition
+
+
+class TrackQueueConsumer:
+
+    """
+    Consumes partitions of track queue. Batches of messages are tracked with BatchTracker and acknowledged after
+    they are saved. Failed tracks are retried in place, with growing backoff, up to retries times and then sent to
+    dead letter queue. The partition waits for the retries, so failed tracks are not moved behind the later messages
+    of the partition. Messages can be delivered again if the consumer stops before acknowledging them.
+    """
+
+    def __init__(self, queue: TrackQueue, partitions: List[int] = None, batch_size: int = None,
+                 linger: float = None, retries: int = None, backoff: float = None, tracker: BatchTracker = None):
+        self.queue = queue
+        if partitions is None:
+            partitions = tracardi.track_queue_consume_partitions
+        self.partitions = partitions if partitions is not None else list(range(queue.partitions))
+        self.batch_size = batch_size if batch_size is not None else tracardi.track_queue_batch_size
+        self.linger = linger if linger is not None else tracardi.track_queue_batch_linger
+        self.retries = retries if retries is not None else tracardi.track_queue_retries
+        self.backoff = backoff if backoff is not None else tracardi.track_queue_retry_backoff
+        self.tracker = tracker if tracker is not None else BatchTracker()
+        self._running = False
+
+    @staticmethod
+    def _to_tracker_payload(body: dict) -> TrackerPayload:
+        tracker_payload = TrackerPayload(**body['payload'])
+        # Keep the time of collection. TrackerPayload sets it to now.
+        if body['payload'].get('metadata', None) is not None:
+            tracker_payload.metadata = EventPayloadMetadata(**body['payload']['metadata'])
+        return tracker_payload
+
+    async def _track(self, partition: int, batch: List[tuple], profile_less: bool,
+                     allowed_bridges: List[str]) -> List[tuple]:
+
+        """
+        Tracks the batch of (message, tracker payload) and acknowledges saved messages. Returns the failed
+        ones as (message, tracker payload, error).
+        """
+
+        try:
+            results = await self.tracker.track(
+                [tracker_payload for _, tracker_payload in batch],
+                [message.body['ip'] for message, _ in batch],
+                profile_less,
+                allowed_bridges
+            )
+        except Exception as e:
+            return [(message, tracker_payload, str(e)) for message, tracker_payload in batch]
+
+        failed = []
+        for (message, tracker_payload), result in zip(batch, results):
+            if result.error is None:
+                await self.queue.ack(partition, message)
+            else:
+                failed.append((message, tracker_payload, result.error))
+        return failed
+
+    async def process(self, partition: int, messages: List[QueueMessage]):
+
+        # Messages with the same tracking options are tracked in one batch.
+        batches = {}  # type: Dict[tuple, List[tuple]]
+        for message in messages:
+            try:
+                tracker_payload = self._to_tracker_payload(message.body)
+                options = (message.body['profile_less'], tuple(message.body['allowed_bridges']))
+            except Exception as e:
+                # Invalid message will never succeed.
+                logger.error(f"Invalid track message was sent to dead letter queue. Error: {str(e)}")
+                await self.queue.dead_letter(partition, message)
+                continue
+            batches.setdefault(options, []).append((message, tracker_payload))
+
+        for (profile_less, allowed_bridges), batch in batches.items():
+            failed = await self._track(partition, batch, profile_less, list(allowed_bridges))
+
+            # Failed tracks are retried before the next messages of the partition are consumed.
+            for retry in range(self.retries):
+                if not failed:
+                    break
+                logger.warning(f"{len(failed)} track(s) failed and will be retried. Error: {failed[0][2]}")
+                await asyncio.sleep(self.backoff * 2 ** retry)
+                failed = await self._track(partition, [(message, tracker_payload)
+                                                       for message, tracker_payload, _ in failed],
+                                           profile_less, list(allowed_bridges))
+
+            for message, _, error in failed:
+                logger.error(f"Track failed and was sent to dead letter queue. Error: {error}")
+                await self.queue.dead_letter(partition, message)
+
+    async def _consume(self, partition: int):
+        while self._running:
+            try:
+                messages = await self.queue.get_batch(partition, self.batch_size, self.linger)
+                if messages:
+                    await self.process(partition, messages)
+            except Exception as e:
+                logger.error(f"Track queue partition {partition} consumer error: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def run(self):
+        self._running = True
+        await asyncio.gather(*[self._consume(partition) for partition in self.partitions])
+
+    def stop(self):
+        # Consumers stop after the current batch.
+        self._running = False
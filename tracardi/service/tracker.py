@@ -3,8 +3,7 @@ import logging
 from datetime import datetime
 from typing import List, Optional
 
-import redis
-from deepdiff import DeepDiff
+import aioredis
 
 from tracardi.config import tracardi
 from tracardi.domain.entity import Entity
@@ -17,6 +16,7 @@ from tracardi.exceptions.log_handler import log_handler
 from tracardi.service.destination_manager import DestinationManager
 from tracardi.service.merging import merge
 from tracardi.service.notation.dot_accessor import DotAccessor
+from tracardi.service.profile_delta import diff, ProfileDelta
 
 from tracardi.domain.event_payload_validator import EventTypeManager
 from tracardi.domain.value_object.bulk_insert_result import BulkInsertResult
@@ -37,7 +37,9 @@ from tracardi.service.segmentation import segment
 from tracardi.service.consistency.session_corrector import correct_session
 from tracardi.service.storage.driver import storage
 from tracardi.service.storage.helpers.source_cacher import source_cache
+from tracardi.service.storage.elastic_client import on_close
 from tracardi.service.synchronizer import ProfileTracksSynchronizer
+from tracardi.service.tracker_shards import TrackerShards, get_shard_key
 from tracardi.service.wf.domain.flow_response import FlowResponses
 from tracardi.service.event_props_reshaper import EventPropsReshaper, EventPropsReshapingError
 from tracardi.service.event_manager_cache import EventManagerCache
@@ -64,13 +66,14 @@ async def _save_session(tracker_payload, session, profile):
     try:
         persist_session = tracker_payload.is_on('saveSession', default=True)
         result = await storage.driver.session.save_session(session, profile, persist_session)
-        if session.operation.new:
+        if session.operation.new and not storage.driver.session.is_write_behind():
             """
             Until the session is saved and it is usually within 1s the system can create many profiles for 1 session. 
             System checks if the session exists by loading it from ES. If it is a new session then is does not exist 
             and must be saved before it can be read. So there is a 1s when system thinks that the session does not exist.
 
-            If session is new we will refresh the session in ES.
+            If session is new we will refresh the session in ES. Sessions saved with write behind buffer in single 
+            process deployment are loaded from the buffer, so there is no need to refresh.
             """
 
             await storage.driver.session.refresh()
@@ -79,36 +82,41 @@ async def _save_session(tracker_payload, session, profile):
         raise FieldTypeConflictException("Could not save session. Error: {}".format(str(e)), rows=e.details)
 
 
-async def _save_events(tracker_payload, console_log, events):
-    try:
-        persist_events = tracker_payload.is_on('saveEvents', default=True)
+async def _prepare_events(tracker_payload, console_log, events) -> List[Event]:
 
-        # Set statuses
-        log_event_journal = console_log.get_indexed_event_journal()
+    # Set statuses
+    log_event_journal = console_log.get_indexed_event_journal()
 
-        for event in events:
+    for event in events:
 
-            event.metadata.time.process_time = datetime.timestamp(datetime.utcnow()) - datetime.timestamp(
-                event.metadata.time.insert)
+        event.metadata.time.process_time = datetime.timestamp(datetime.utcnow()) - datetime.timestamp(
+            event.metadata.time.insert)
 
-            # Reset session id if session is not saved
+        # Reset session id if session is not saved
 
-            if tracker_payload.is_on('saveSession', default=True) is False:
-                # DO NOT remove session if it already exists in db
-                if not isinstance(event.session, Entity) or not await storage.driver.session.exist(event.session.id):
-                    event.session = None
+        if tracker_payload.is_on('saveSession', default=True) is False:
+            # DO NOT remove session if it already exists in db
+            if not isinstance(event.session, Entity) or not await storage.driver.session.exist(event.session.id):
+                event.session = None
 
-            if event.id in log_event_journal:
-                log = log_event_journal[event.id]
-                if log.is_error():
-                    event.metadata.error = True
-                    continue
-                elif log.is_warning():
-                    event.metadata.warning = True
-                    continue
-                else:
-                    event.metadata.status = PROCESSED
+        if event.id in log_event_journal:
+            log = log_event_journal[event.id]
+            if log.is_error():
+                event.metadata.error = True
+                continue
+            elif log.is_warning():
+                event.metadata.warning = True
+                continue
+            else:
+                event.metadata.status = PROCESSED
 
+    return events
+
+
+async def _save_events(tracker_payload, console_log, events):
+    try:
+        persist_events = tracker_payload.is_on('saveEvents', default=True)
+        events = await _prepare_events(tracker_payload, console_log, events)
         return await storage.driver.event.save_events(events, persist_events)
 
     except StorageException as e:
@@ -146,17 +154,18 @@ async def validate_and_reshape_events(events, profile: Optional[Profile], sessio
             payload=None,
             event=event,
             flow=None,
-            memory=None
+            memory=None,
+            lazy=True
         )
 
         event_type = dot.event['type']
-        event_type_manager = event_manager_cache.get_item(event_type)
+        event_type_manager = await event_manager_cache.get_item(event_type)
 
         if event_type_manager is None:
             event_type_manager = await storage.driver.event_management.load_event_type_metadata(
                 dot.event['type'])  # type: EventTypeManager
             if event_type_manager is not None:
-                event_manager_cache.upsert_item(event_type_manager)
+                await event_manager_cache.upsert_item(event_type_manager)
 
         if event_type_manager is not None:
             try:
@@ -194,10 +203,33 @@ async def validate_and_reshape_events(events, profile: Optional[Profile], sessio
     return console_log
 
 
+def get_profile_delta(tracked_profile: Profile, profile: Profile) -> ProfileDelta:
+
+    """
+    Returns changes of tracked profile. Destinations are triggered if there are any.
+    """
+
+    if tracked_profile is profile:
+        return profile.get_changes()
+
+    # Profile was replaced with other object in workflow.
+    profile_delta = tracked_profile.get_changes()
+    for path, old, new in diff(tracked_profile, profile):
+        if not path.startswith('operation.'):
+            profile_delta.changes[path] = (old, new)
+    return profile_delta
+
+
 async def invoke_track_process(tracker_payload: TrackerPayload, source, profile_less: bool, profile=None, session=None,
-                               ip='0.0.0.0'):
+                               ip='0.0.0.0', persist=None):
+
+    """
+    Runs rules and segmentation and saves profile, session, events and console log. Optional awaitable
+    persist(console_log, session, events, tracker_payload, profile) -> CollectResult replaces saving, then it is
+    responsible also for saving console log (e.g. batch tracking saves all tracks at once).
+    """
+
     console_log = ConsoleLog()
-    profile_copy = None
 
     has_profile = not profile_less and isinstance(profile, Profile)
 
@@ -214,7 +246,9 @@ async def invoke_track_process(tracker_payload: TrackerPayload, source, profile_
         logger.warning("Something is wrong - profile less events should not have profile attached.")
 
     if has_profile:
-        profile_copy = profile.dict(exclude={"operation": ...})
+        # Track changes made from now on. They trigger destinations.
+        profile.reset_changes()
+    tracked_profile = profile
 
     # Get events
     events = tracker_payload.get_events(session, profile, has_profile, ip)
@@ -280,7 +314,7 @@ async def invoke_track_process(tracker_payload: TrackerPayload, source, profile_
             # Segment
             segmentation_result = await segment(profile,
                                                 ran_event_types,
-                                                storage.driver.segment.load_segments)
+                                                storage.driver.segment.load_enabled)
 
     except Exception as e:
         message = 'Rules engine or segmentation returned an error `{}`'.format(str(e))
@@ -367,44 +401,44 @@ async def invoke_track_process(tracker_payload: TrackerPayload, source, profile_
 
             events = synced_events
 
-        collect_result = await _persist(console_log, session, events, tracker_payload, profile)
-
-        # Save console log
-        if console_log:
-            encoded_console_log = list(console_log.get_encoded())
-            save_tasks.append(asyncio.create_task(storage.driver.console_log.save_all(encoded_console_log)))
+        if persist is not None:
+            collect_result = await persist(console_log, session, events, tracker_payload, profile)
+        else:
+            collect_result = await _persist(console_log, session, events, tracker_payload, profile)
 
     # Send to destination
 
-    if has_profile and profile_copy is not None:
-        new_profile = profile.dict(exclude={"operation": ...})
-
-        if profile_copy != new_profile:
-            profile_delta = DeepDiff(profile_copy, new_profile, ignore_order=True)
-            if profile_delta:
-                logger.info("Profile changed. Destination scheduled to run.")
-                try:
-                    destination_manager = DestinationManager(profile_delta,
-                                                             profile,
-                                                             session,
-                                                             payload=None,
-                                                             event=None,
-                                                             flow=None,
-                                                             memory=None)
-                    # todo performance - could be not awaited add to save_task
-                    await destination_manager.send_data(profile.id, events, debug=False)
-                except Exception as e:
-                    # todo - this appends error to the same profile - it rather should be en event error
-                    console_log.append(Console(
-                        profile_id=get_profile_id(profile),
-                        origin='destination',
-                        class_name='DestinationManager',
-                        module='tracker',
-                        type='error',
-                        message=str(e),
-                        traceback=get_traceback(e)
-                    ))
-                    logger.error(str(e))
+    if has_profile and isinstance(profile, Profile):
+        profile_delta = get_profile_delta(tracked_profile, profile)
+        if profile_delta:
+            logger.info("Profile changed. Destination scheduled to run.")
+            try:
+                destination_manager = DestinationManager(profile_delta,
+                                                         profile,
+                                                         session,
+                                                         payload=None,
+                                                         event=None,
+                                                         flow=None,
+                                                         memory=None)
+                # If DESTINATION_QUEUE is on, data is queued and destinations are called in the background.
+                await destination_manager.send_data(profile.id, events, debug=False)
+            except Exception as e:
+                # todo - this appends error to the same profile - it rather should be en event error
+                console_log.append(Console(
+                    profile_id=get_profile_id(profile),
+                    origin='destination',
+                    class_name='DestinationManager',
+                    module='tracker',
+                    type='error',
+                    message=str(e),
+                    traceback=get_traceback(e)
+                ))
+                logger.error(str(e))
+
+    # Save console log. It is saved after destinations are called, so it has their errors.
+    if persist is None and console_log:
+        encoded_console_log = list(console_log.get_encoded())
+        save_tasks.append(asyncio.create_task(storage.driver.console_log.save_all(encoded_console_log)))
 
     if save_tasks:
         # Run tasks
@@ -449,19 +483,22 @@ async def invoke_track_process(tracker_payload: TrackerPayload, source, profile_
     return result
 
 
-async def track_event(tracker_payload: TrackerPayload, ip: str, profile_less: bool, allowed_bridges: List[str],
-                      internal_source=None):
+async def validate_payload_source(tracker_payload: TrackerPayload, allowed_bridges: List[str], internal_source=None):
     try:
         if internal_source is not None:
             if internal_source.id != tracker_payload.source.id:
                 raise ValueError(f"Invalid event source `{tracker_payload.source.id}`")
-            source = internal_source
-        else:
-            source = await source_cache.validate_source(source_id=tracker_payload.source.id,
-                                                        allowed_bridges=allowed_bridges)
+            return internal_source
+        return await source_cache.validate_source(source_id=tracker_payload.source.id,
+                                                  allowed_bridges=allowed_bridges)
     except ValueError as e:
         raise UnauthorizedException(e)
 
+
+async def track_event(tracker_payload: TrackerPayload, ip: str, profile_less: bool, allowed_bridges: List[str],
+                      internal_source=None):
+    source = await validate_payload_source(tracker_payload, allowed_bridges, internal_source)
+
     tracker_payload.set_transitional(source)
     tracker_payload.set_return_profile(source)
     tracker_payload.force_there_is_a_session()
@@ -504,16 +541,62 @@ async def track_event(tracker_payload: TrackerPayload, ip: str, profile_less: bo
     return await invoke_track_process(tracker_payload, source, profile_less, profile, session, ip)
 
 
+tracker_shards = TrackerShards(tracardi.track_workers, tracardi.track_worker_replicas, handler=track_event)
+on_close(tracker_shards.shutdown)
+
+
+async def get_track_shard_key(tracker_payload: TrackerPayload) -> Optional[str]:
+
+    """
+    Returns shard key of the profile that the track changes. Payload with profile id is routed by it. Session is
+    loaded only if the payload has no profile id, so the first tracks of the client (before it knows its profile
+    id) get the key of the profile of the existing session, see get_profile_and_session.
+    """
+
+    if tracker_payload.profile is not None and tracker_payload.profile.id:
+        return get_shard_key(tracker_payload.profile.id, None)
+
+    session_id = tracker_payload.session.id if tracker_payload.session is not None else None
+    profile_id = None
+    if session_id is not None:
+        try:
+            session = await storage.driver.session.load_by_id(session_id)
+        except DuplicatedRecordException:
+            # Track recovers the session and creates the new one.
+            session = None
+        if session is not None and session.profile is not None:
+            profile_id = session.profile.id
+    return get_shard_key(profile_id, session_id)
+
+
+async def _synchronized_track_event(tracker_payload: TrackerPayload, host: str, profile_less: bool,
+                                    allowed_bridges: List[str], internal_source=None):
+    if tracker_shards.is_enabled():
+        # Tracks of the same profile are processed one by one by the same worker process.
+        tracker_payload.force_there_is_a_session()
+        key = await get_track_shard_key(tracker_payload)
+        return await tracker_shards.submit(key, tracker_payload, host, profile_less, allowed_bridges,
+                                           internal_source)
+    return await track_event(tracker_payload, ip=host, profile_less=profile_less, allowed_bridges=allowed_bridges,
+                             internal_source=internal_source)
+
+
 async def synchronized_event_tracking(tracker_payload: TrackerPayload, host: str, profile_less: bool,
                                       allowed_bridges: List[str], internal_source=None):
-    if tracardi.sync_profile_tracks:
+
+    """
+    Shard workers (TRACK_WORKERS) serialize tracks of a profile only within one dispatcher process. The distributed
+    lock (SYNC_PROFILE_TRACKS) is skipped only if TRACK_WORKERS_SINGLE_DISPATCHER says there is one dispatcher.
+    """
+
+    if tracardi.sync_profile_tracks and not (tracker_shards.is_enabled() and tracardi.track_workers_single_dispatcher):
         try:
             async with ProfileTracksSynchronizer(tracker_payload.profile, wait=tracardi.sync_profile_tracks_wait,
                                                  max_repeats=tracardi.sync_profile_tracks_max_repeats):
-                return await track_event(tracker_payload, ip=host, profile_less=profile_less,
-                                         allowed_bridges=allowed_bridges, internal_source=internal_source)
-        except redis.exceptions.ConnectionError as e:
+                return await _synchronized_track_event(tracker_payload, host, profile_less, allowed_bridges,
+                                                       internal_source)
+        except aioredis.exceptions.ConnectionError as e:
             raise TracardiException(f"Could not connect to Redis server. Connection returned error {str(e)}")
     else:
-        return await track_event(tracker_payload, ip=host, profile_less=profile_less, allowed_bridges=allowed_bridges,
-                                 internal_source=internal_source)
+        return await _synchronized_track_event(tracker_payload, host, profile_less, allowed_bridges,
+                                               internal_source)
@@ -0,0 +1,256 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import pickle
+import threading
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tracardi.config import tracardi
+from tracardi.exceptions.exception import TracardiException
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.storage.elastic_client import ElasticClient
+from tracardi.service.synchronizer import local_profile_locks
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+# Set in shard worker processes. Workers process tracks themselves and do not dispatch them again.
+_is_shard_worker = False
+
+
+def _hash(key: str) -> int:
+    # Python hash is randomized per process, so it can not be used to route between processes.
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+class HashRing:
+
+    """
+    Consistent hash ring. Every shard has replicas points on the ring. A key belongs to the shard of the first point
+    after the hash of the key, so changing the number of shards moves only a part of the keys.
+    """
+
+    def __init__(self, shards: int, replicas: int):
+        self.shards = shards
+        ring = sorted((_hash(f"{shard}:{replica}"), shard) for shard in range(shards) for replica in range(replicas))
+        self._points = [point for point, _ in ring]
+        self._shards = [shard for _, shard in ring]
+
+    def get(self, key: str) -> int:
+        position = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._shards[position]
+
+
+def _picklable_exception(e: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return TracardiException(f"{type(e).__name__}: {str(e)}")
+
+
+async def _handle(connection, lock: threading.Lock, handler: Callable[..., Awaitable], request_id: int,
+                  key: Optional[str], args: tuple):
+    if key is not None:
+        # Requests of the same key are processed in order of arrival.
+        await local_profile_locks.acquire(key)
+    try:
+        response = (request_id, True, await handler(*args))
+    except Exception as e:
+        response = (request_id, False, _picklable_exception(e))
+    finally:
+        if key is not None:
+            local_profile_locks.release(key)
+
+    try:
+        with lock:
+            connection.send(response)
+    except Exception as e:
+        with lock:
+            connection.send((request_id, False, _picklable_exception(e)))
+
+
+async def _stop_worker():
+    # Tracks in progress are finished and buffered documents are saved before the worker stops.
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        await ElasticClient.instance().close()
+    finally:
+        asyncio.get_running_loop().stop()
+
+
+def _worker_main(connection, handler: Callable[..., Awaitable]):
+
+    """
+    Main function of shard worker process. Messages are received in a thread and processed concurrently in the
+    event loop of the process.
+    """
+
+    global _is_shard_worker
+    _is_shard_worker = True
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    lock = threading.Lock()
+
+    def receive():
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                asyncio.run_coroutine_threadsafe(_stop_worker(), loop)
+                return
+            request_id, key, args = message
+            # Tasks are created in order of messages, so the local locks are acquired in this order.
+            loop.call_soon_threadsafe(loop.create_task, _handle(connection, lock, handler, request_id, key, args))
+
+    threading.Thread(target=receive, daemon=True).start()
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+class _Shard:
+
+    def __init__(self, number: int, handler: Callable[..., Awaitable]):
+        self.number = number
+        self.handler = handler
+        self.process = None  # type: Optional[multiprocessing.Process]
+        self.connection = None
+        self.pending = {}  # type: Dict[int, asyncio.Future]
+        self._lock = threading.Lock()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(worker_connection, self.handler),
+                                       name=f"tracardi-track-shard-{self.number}", daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.connection = connection
+        # Every process has its own pending requests, so the requests of a restarted process are not failed when
+        # the previous process is gone.
+        self.pending = {}
+        threading.Thread(target=self._receive, args=(connection, self.pending), daemon=True).start()
+
+    def _receive(self, connection, pending: Dict[int, asyncio.Future]):
+        while True:
+            try:
+                request_id, ok, value = connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = pending.pop(request_id, None)
+            if future is not None:
+                future.get_loop().call_soon_threadsafe(self._resolve, future, ok, value)
+
+        # Worker is gone. Fail requests that wait for it.
+        with self._lock:
+            futures = list(pending.values())
+            pending.clear()
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(
+                self._resolve, future, False, TracardiException(f"Track shard {self.number} stopped."))
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, ok: bool, value):
+        if future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def submit(self, request_id: int, key: Optional[str], args: tuple) -> asyncio.Future:
+        if not self.is_alive():
+            logger.warning(f"Starting track shard {self.number}.")
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self.pending[request_id] = future
+        try:
+            self.connection.send((request_id, key, args))
+        except Exception:
+            with self._lock:
+                self.pending.pop(request_id, None)
+            raise
+        return future
+
+    def close(self, timeout: float):
+        if self.connection is not None:
+            try:
+                self.connection.send(None)
+            except Exception:
+                pass
+        if self.process is not None:
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.connection is not None:
+            self.connection.close()
+        self.process, self.connection = None, None
+
+
+class TrackerShards:
+
+    """
+    Routes tracks to worker processes by consistent hash of a key (profile id or session id). Tracks of the same key
+    are always processed by the same process, one after another in order of arrival. It serializes only the tracks
+    dispatched by this process, other dispatchers (api workers) still need distributed lock. Worker processes are
+    started on first use.
+
+    Callable handler(*args) processes the track in worker process. It must be a module level function, so it can
+    be passed to the process.
+    """
+
+    def __init__(self, workers: int, replicas: int, handler: Callable[..., Awaitable]):
+        self.workers = workers
+        self.ring = HashRing(workers, replicas) if workers > 0 else None
+        self._shards = [_Shard(number, handler) for number in range(workers)]  # type: List[_Shard]
+        self._request_ids = count()
+
+    def is_enabled(self) -> bool:
+        return self.workers > 0 and not _is_shard_worker
+
+    def get_shard(self, key: Optional[str]) -> int:
+        if key is None:
+            # Requests without key are spread evenly.
+            return next(self._request_ids) % self.workers
+        return self.ring.get(key)
+
+    async def submit(self, key: Optional[str], *args) -> Any:
+        shard = self._shards[self.get_shard(key)]
+        return await shard.submit(next(self._request_ids), key, args)
+
+    def close(self, timeout: float = 30):
+
+        """
+        Stops worker processes. Workers finish the tracks they got and save buffered data.
+        """
+
+        for shard in self._shards:
+            shard.close(timeout)
+
+    async def shutdown(self):
+        # Processes are joined in a thread, so the event loop is not blocked.
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def get_shard_key(profile_id: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    if profile_id:
+        return f"profile:{profile_id}"
+    if session_id:
+        return f"session:{session_id}"
+    return None
@@ -1,4 +1,6 @@
 from typing import Optional
+from pydantic import PrivateAttr
+
 from .flow_graph_data import FlowGraphData
 from .flow_response import FlowResponse
 from .named_entity import NamedEntity
@@ -8,3 +10,11 @@ class Flow(NamedEntity):
     description: Optional[str] = None
     flowGraph: Optional[FlowGraphData] = None
     response: Optional[FlowResponse] = FlowResponse()
+    _revision: Optional[str] = PrivateAttr(None)
+
+    def set_revision(self, revision: Optional[str]) -> 'Flow':
+        self._revision = revision
+        return self
+
+    def get_revision(self) -> Optional[str]:
+        return self._revision
@@ -1,12 +1,13 @@
 import asyncio
+import heapq
 import inspect
-import json
 from collections import defaultdict
 
 from time import time
-from typing import List, Union, Tuple, Optional, Dict, AsyncIterable
-from pydantic import BaseModel
+from typing import List, Union, Tuple, Optional, Dict, AsyncIterable, Set
+from pydantic import BaseModel, PrivateAttr
 
+from tracardi.config import tracardi
 from tracardi.domain.event import Event, EventSession
 from tracardi.domain.payload.tracker_payload import TrackerPayload
 from tracardi.domain.profile import Profile
@@ -22,13 +23,15 @@ from .debug_info import DebugInfo, DebugNodeInfo
 from .entity import Entity
 from .error_debug_info import ErrorDebugInfo
 from .input_params import InputParams
+from ..service.background_runner import background_runner, save_background_changes
 from ..service.excetions import get_traceback
 import tracardi.service.wf.service.life_cycle as life_cycle
+from ..utils.copy_on_write import copy_on_write
 from ..utils.dag_error import DagError, DagExecError
 from .edge import Edge
 from .node import Node
 from .tasks_results import ActionsResults
-from ...notation.dict_traverser import DictTraverser
+from ...notation.dict_traverser import DictTraverser, compile_template
 from ...notation.dot_accessor import DotAccessor
 from ...value_threshold_manager import ValueThresholdManager
 
@@ -67,10 +70,29 @@ class InputEdges:
         return len(self.edges)
 
 
+class NodeExecution:
+
+    """
+    Outcome of node run that is applied to the flow after the node finished.
+    """
+
+    def __init__(self, sequence_number: int):
+        self.sequence_number = sequence_number
+        self.debug_info = None  # type: Optional[DebugNodeInfo]
+        self.executed = False
+        self.failed = False
+        self.profile = None  # type: Optional[Profile]
+        self.session = None  # type: Optional[Session]
+        self.input_edges = []  # type: List[InputEdges]
+        self.logs = []  # type: List[Log]
+
+
 class GraphInvoker(BaseModel):
     graph: List[Node]
     start_nodes: list
     debug: bool = False
+    concurrency: int = tracardi.workflow_concurrency
+    _background: Set[int] = PrivateAttr(set())
 
     @staticmethod
     def _add_to_event_loop(tasks, coroutine, port, params, edge: Edge, active) -> list:
@@ -142,7 +164,8 @@ class GraphInvoker(BaseModel):
                                       # this is fine, input params has only one value
                                       event=node.object.event,
                                       flow=node.object.flow,
-                                      memory=node.object.memory)
+                                      memory=node.object.memory,
+                                      lazy=True)
 
                     if node.run_once.type == 'value':
                         value = dot[node.run_once.value]
@@ -254,12 +277,15 @@ class GraphInvoker(BaseModel):
 
                     else:
 
-                        upstream_result_copy = upstream_result.copy(deep=True)
-
                         # Do not trigger for None values
 
-                        params = {end_port: upstream_result_copy.value}
-                        if upstream_result_copy.value is not None:
+                        if upstream_result.value is not None:
+
+                            # Upstream result is shared by all downstream nodes. Every node gets its own
+                            # copy-on-write view of it.
+
+                            value = copy_on_write(upstream_result.value)
+                            params = {end_port: value}
 
                             # Run spec with every downstream message (param)
                             # Runs as many times as downstream edges
@@ -269,7 +295,7 @@ class GraphInvoker(BaseModel):
                                 node,
                                 params,
                                 end_port,
-                                upstream_result.value,
+                                value,
                                 in_edge=edge)
 
                         else:
@@ -288,6 +314,9 @@ class GraphInvoker(BaseModel):
                                                             active=False
                                                             )
 
+                # This node is the only consumer of the edge.
+                ready_upstream_results.release(edge.id)
+
         # Yield async tasks results
 
         joined_output_results = defaultdict(dict)
@@ -389,10 +418,11 @@ class GraphInvoker(BaseModel):
                 # todo template per port
 
                 if node.object.join.has_reshape_templates():
-                    output = json.loads(node.object.join.get_reshape_template(out_port).template)
-                    if output:
+                    # Compiled template is cached, so it is not parsed on every run.
+                    output = compile_template(node.object.join.get_reshape_template(out_port).template)
+                    if output.template:
                         dot = DotAccessor(node.object.profile, node.object.session,
-                                          out_payload if isinstance(out_payload, dict) else None)
+                                          out_payload if isinstance(out_payload, dict) else None, lazy=True)
 
                         if node.object.join.get_reshape_template(out_port).default is True:
                             template = DictTraverser(dot, default=None)
@@ -411,9 +441,9 @@ class GraphInvoker(BaseModel):
 
     @staticmethod
     def _add_results(task_results: ActionsResults, node: Node, result: Result) -> ActionsResults:
+        # Result is not copied. Downstream nodes get copy-on-write views of its value.
         for _, edge, _ in node.graph.out_edges:
-            result_copy = result.copy(deep=True)
-            task_results.add(edge.id, result_copy)
+            task_results.add(edge.id, result)
         return task_results
 
     async def init(self, debug_info: DebugInfo, log_list: List[Log], flow, flow_history, event, session, profile,
@@ -479,14 +509,19 @@ class GraphInvoker(BaseModel):
 
         return debug_info
 
-    async def close(self):
+    async def _close_nodes(self, positions):
         tasks = []
-        for node in self.graph:
+        for position in positions:
+            node = self.graph[position]
             if isinstance(node.object, ActionRunner):
                 task = asyncio.create_task(node.object.close())
                 tasks.append(task)
         await asyncio.gather(*tasks)
 
+    async def close(self):
+        # Nodes that run in background are closed when they finish.
+        await self._close_nodes([position for position in range(len(self.graph)) if position not in self._background])
+
     @staticmethod
     def _get_input_params(input_port, input_params):
         if input_port:
@@ -499,206 +534,394 @@ class GraphInvoker(BaseModel):
         """
         return event.metadata.debug is True or self.debug is True
 
-    async def run(self, payload, event: Event, profile: Profile, session: Session, debug_info: DebugInfo,
-                  log_list: List[Log]) -> Tuple[
-        DebugInfo, List[Log], Profile, Session]:
+    async def _execute_node(self, node: Node, sequence_number: int, payload, event: Event,
+                            actions_results: ActionsResults, flow_start_time) -> NodeExecution:
 
-        actions_results = ActionsResults()
-        flow_start_time = debug_info.timestamp
+        """
+        Runs one node and passes its results to the out edges. Debug information, logs and profile and session
+        references are collected in NodeExecution and applied to the flow later in graph order.
+        """
 
-        sequence_number = 0
-        execution_number = 0
-        for node in self.graph:  # type: Node
-            task_start_time = time()
-            sequence_number += 1
-            executed_node = False
-
-            node_debug_info = DebugNodeInfo(
-                id=node.id,
-                name=node.name,
-                sequenceNumber=sequence_number,
-                executionNumber=None,
-                errors=0,
-                warnings=0,
-                profiler=Profiler(
-                    startTime=task_start_time,
-                    endTime=task_start_time,
-                    runTime=task_start_time
-                ),
-            )
+        task_start_time = time()
+        execution = NodeExecution(sequence_number)
+
+        node_debug_info = DebugNodeInfo(
+            id=node.id,
+            name=node.name,
+            sequenceNumber=sequence_number,
+            executionNumber=None,
+            errors=0,
+            warnings=0,
+            profiler=Profiler(
+                startTime=task_start_time,
+                endTime=task_start_time,
+                runTime=task_start_time
+            ),
+        )
+        execution.debug_info = node_debug_info
 
-            try:
+        try:
 
-                # Skip debug nodes when not debugging
-                if not self.debug and node.debug:
-                    continue
+            # Skip debug nodes when not debugging
+            if not self.debug and node.debug:
+                return execution
 
-                # Skip tasks that are marked to be skipped
-                if node.block_flow is True:
-                    continue
+            # Skip tasks that are marked to be skipped
+            if node.block_flow is True:
+                return execution
 
-                async for result, \
-                          task_start_time, \
-                          _profile_reference_to_update, _session_reference_to_update, \
-                          node_console_status, input_edges in \
-                        self.run_node(node, payload, ready_upstream_results=actions_results):
+            async for result, \
+                      task_start_time, \
+                      _profile_reference_to_update, _session_reference_to_update, \
+                      node_console_status, input_edges in \
+                    self.run_node(node, payload, ready_upstream_results=actions_results):
 
-                    # If the profile or session changed during node execution change its reference in graph invoker
+                # If the profile or session changed during node execution change its reference in graph invoker
 
-                    if _profile_reference_to_update:
-                        profile = _profile_reference_to_update
+                if _profile_reference_to_update:
+                    execution.profile = _profile_reference_to_update
 
-                    if _session_reference_to_update:
-                        session = _session_reference_to_update
+                if _session_reference_to_update:
+                    execution.session = _session_reference_to_update
 
-                    executed_node = input_edges.has_active_edges() | executed_node
+                execution.executed = input_edges.has_active_edges() | execution.executed
 
-                    # Add information if ony of the input edge is active
+                # Add information if ony of the input edge is active
 
-                    debug_info.add_debug_edge_info(input_edges)
+                execution.input_edges.append(input_edges)
 
-                    # Process result
-
-                    if result is None:
-                        # Result is None
-                        pass
-                    elif isinstance(result, Result):
-                        if result.value is not None:
-                            actions_results = self._add_results(actions_results, node, result)
-                    elif isinstance(result, tuple):
-                        for sub_result in result:  # type: Result
-                            if sub_result is None:
-                                # This is None result
-                                pass
-                            elif isinstance(sub_result, Result):
-                                if sub_result.value is not None:
-                                    # Result is proper object
-                                    actions_results = self._add_results(actions_results, node, sub_result)
-                            else:
-                                _edge = input_edges.get_first_edge()
-                                raise DagError(
-                                    "Action did not return Result or tuple of Results. Expected Result got {}".format(
-                                        type(result)),
-                                    port=_edge.port,
-                                    input=_edge.params,
-                                    edge=_edge.id
-                                )
-                    else:
-                        # result can be DagExecError this means that this node raised exception
-                        if isinstance(result, DagExecError):
-                            raise result
-
-                        _edge = input_edges.get_first_edge()
-
-                        raise DagError(
-                            "Action did not return Result or tuple of Results. Expected Result got {}".format(
-                                type(result)),
-                            port=_edge.port,
-                            input=_edge.params,
-                            edge=_edge.id
-                        )
+                # Process result
 
-                    if self.is_in_debug_mode(event):
-                        for input_edge_id, input_edge in input_edges.edges.items():  # type: str, InputEdge
-                            node_debug_info.append_call_info(
-                                flow_start_time,
-                                task_start_time,
-                                node,
-                                input_edge=Entity(id=input_edge_id) if input_edge_id is not None else None,
-                                input_params=self._get_input_params(input_edge.port, input_edge.params),
-                                output_edge=None,
-                                output_params=[result] if isinstance(result, Result) else result,
-                                active=input_edge.active,
-                                errors=node_console_status.errors,
-                                warnings=node_console_status.warnings
-                            )
-
-                    if executed_node:
-                        for input_edge_id, _ in input_edges.edges.items():  # type: str, InputEdge
-                            log_list.append(
-                                Log(
-                                    module=node.object.console.module,
-                                    class_name=node.object.console.class_name,
-                                    type='info',
-                                    message=f"Node `{node_debug_info.name}` edge {input_edge_id} executed without errors."
-                                )
+                if result is None:
+                    # Result is None
+                    pass
+                elif isinstance(result, Result):
+                    if result.value is not None:
+                        self._add_results(actions_results, node, result)
+                elif isinstance(result, tuple):
+                    for sub_result in result:  # type: Result
+                        if sub_result is None:
+                            # This is None result
+                            pass
+                        elif isinstance(sub_result, Result):
+                            if sub_result.value is not None:
+                                # Result is proper object
+                                self._add_results(actions_results, node, sub_result)
+                        else:
+                            _edge = input_edges.get_first_edge()
+                            raise DagError(
+                                "Action did not return Result or tuple of Results. Expected Result got {}".format(
+                                    type(result)),
+                                port=_edge.port,
+                                input=_edge.params,
+                                edge=_edge.id
                             )
-
-            except (DagError, DagExecError) as e:
-
-                error_log = Log(
-                    module=__name__,
-                    class_name='GraphInvoker',
-                    type='error',
-                    message=str(e)
-                )
-
-                if isinstance(e, DagExecError):
-                    error_log.traceback = e.traceback
-                elif isinstance(e, DagError):
-                    error_log.traceback = get_traceback(e)
-
-                log_list.append(error_log)
+                else:
+                    # result can be DagExecError this means that this node raised exception
+                    if isinstance(result, DagExecError):
+                        raise result
+
+                    _edge = input_edges.get_first_edge()
+
+                    raise DagError(
+                        "Action did not return Result or tuple of Results. Expected Result got {}".format(
+                            type(result)),
+                        port=_edge.port,
+                        input=_edge.params,
+                        edge=_edge.id
+                    )
 
                 if self.is_in_debug_mode(event):
-                    if e.input is not None and e.port is not None:
-
+                    for input_edge_id, input_edge in input_edges.edges.items():  # type: str, InputEdge
                         node_debug_info.append_call_info(
                             flow_start_time,
                             task_start_time,
                             node,
-                            input_edge=Entity(id=e.edge) if e.edge is not None else None,
-                            input_params=InputParams(port=e.port, value=e.input),
+                            input_edge=Entity(id=input_edge_id) if input_edge_id is not None else None,
+                            input_params=self._get_input_params(input_edge.port, input_edge.params),
                             output_edge=None,
-                            output_params=None,
-                            active=True,
-                            error=str(e),
-                            errors=1,
-                            warnings=0
+                            output_params=[result] if isinstance(result, Result) else result,
+                            active=input_edge.active,
+                            errors=node_console_status.errors,
+                            warnings=node_console_status.warnings
                         )
 
-                    else:
-
-                        node_debug_info.append_call_info(
-                            flow_start_time,
-                            task_start_time,
-                            node,
-                            input_edge=Entity(id=e.edge) if e.edge is not None else None,
-                            input_params=None,
-                            output_edge=None,
-                            output_params=None,
-                            active=True,
-                            error=str(e),
-                            errors=1,
-                            warnings=0
+                if execution.executed:
+                    for input_edge_id, _ in input_edges.edges.items():  # type: str, InputEdge
+                        execution.logs.append(
+                            Log(
+                                module=node.object.console.module,
+                                class_name=node.object.console.class_name,
+                                type='info',
+                                message=f"Node `{node_debug_info.name}` edge {input_edge_id} executed without errors."
+                            )
                         )
 
-                # Stop workflow when there is an error
-                break
+        except (DagError, DagExecError) as e:
 
-            finally:
-                if self.is_in_debug_mode(event):
-                    node_debug_info.profiler.endTime = time() - flow_start_time
-                    node_debug_info.profiler.runTime = time() - flow_start_time - task_start_time
+            error_log = Log(
+                module=__name__,
+                class_name='GraphInvoker',
+                type='error',
+                message=str(e)
+            )
 
-                    # If node had call that means it was running
+            if isinstance(e, DagExecError):
+                error_log.traceback = e.traceback
+            elif isinstance(e, DagError):
+                error_log.traceback = get_traceback(e)
+
+            execution.logs.append(error_log)
+
+            if self.is_in_debug_mode(event):
+                if e.input is not None and e.port is not None:
+
+                    node_debug_info.append_call_info(
+                        flow_start_time,
+                        task_start_time,
+                        node,
+                        input_edge=Entity(id=e.edge) if e.edge is not None else None,
+                        input_params=InputParams(port=e.port, value=e.input),
+                        output_edge=None,
+                        output_params=None,
+                        active=True,
+                        error=str(e),
+                        errors=1,
+                        warnings=0
+                    )
 
-                    if executed_node:
-                        execution_number += 1
-                        node_debug_info.executionNumber = execution_number
-                        # debug_info.nodes[node_debug_info.id] = node_debug_info
-                        debug_info.add_node_info(node_debug_info)
+                else:
 
-                # Collect console logs set inside plugins
-                if isinstance(node.object, ActionRunner):
-                    for log in node.object.console.get_logs():  # type: Log
-                        log_list.append(log)
+                    node_debug_info.append_call_info(
+                        flow_start_time,
+                        task_start_time,
+                        node,
+                        input_edge=Entity(id=e.edge) if e.edge is not None else None,
+                        input_params=None,
+                        output_edge=None,
+                        output_params=None,
+                        active=True,
+                        error=str(e),
+                        errors=1,
+                        warnings=0
+                    )
+
+            # Stop workflow when there is an error
+            execution.failed = True
+
+        finally:
+            if self.is_in_debug_mode(event):
+                node_debug_info.profiler.endTime = time() - flow_start_time
+                node_debug_info.profiler.runTime = time() - flow_start_time - task_start_time
+
+            # Collect console logs set inside plugins
+            if isinstance(node.object, ActionRunner):
+                execution.logs += node.object.console.get_logs()
+
+        return execution
+
+    def _get_dependencies(self) -> Tuple[List[int], List[List[int]]]:
+
+        """
+        Returns number of upstream nodes and list of downstream nodes for every node in graph (by node position).
+        """
+
+        positions = {node.id: position for position, node in enumerate(self.graph)}
+        upstream = [set() for _ in self.graph]
+        downstream = [[] for _ in self.graph]
+        for position, node in enumerate(self.graph):
+            for _, edge, _ in node.graph.in_edges:  # type: str, Edge, str
+                upstream_position = positions.get(edge.source.node_id, None)
+                if upstream_position is not None and upstream_position not in upstream[position]:
+                    upstream[position].add(upstream_position)
+                    downstream[upstream_position].append(position)
+        return [len(nodes) for nodes in upstream], downstream
+
+    def _get_background_positions(self, downstream: List[List[int]]) -> Set[int]:
+
+        """
+        Returns positions of nodes marked to run in background and all nodes downstream of them.
+        """
+
+        background = set()
+        stack = [position for position, node in enumerate(self.graph) if node.run_in_background is True]
+        while stack:
+            position = stack.pop()
+            if position not in background:
+                background.add(position)
+                stack += downstream[position]
+        return background
+
+    async def _schedule(self, ready: List[int], waiting_for: List[int], downstream: List[List[int]],
+                        excluded: Set[int], payload, event: Event, actions_results: ActionsResults,
+                        flow_start_time) -> Tuple[Dict[int, NodeExecution], bool]:
+
+        """
+        Runs ready nodes and then the nodes that become ready when their upstream nodes finish. Excluded nodes are
+        not run. Returns node executions by node position and information if any node failed.
+        """
+
+        heapq.heapify(ready)
+        running = {}  # type: Dict[asyncio.Task, int]
+        executions = {}  # type: Dict[int, NodeExecution]
+        concurrency = max(1, self.concurrency)
+        failed = False
+
+        try:
+            while ready or running:
+                while ready and not failed and len(running) < concurrency:
+                    position = heapq.heappop(ready)
+                    task = asyncio.create_task(self._execute_node(self.graph[position], position + 1, payload, event,
+                                                                  actions_results, flow_start_time))
+                    running[task] = position
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    position = running.pop(task)
+                    execution = task.result()
+                    executions[position] = execution
+                    failed = failed or execution.failed
+                    for downstream_position in downstream[position]:
+                        waiting_for[downstream_position] -= 1
+                        if waiting_for[downstream_position] == 0 and downstream_position not in excluded:
+                            heapq.heappush(ready, downstream_position)
+        finally:
+            for task in running:
+                task.cancel()
+
+        return executions, failed
+
+    def _commit(self, executions: Dict[int, NodeExecution], event: Event, debug_info: Optional[DebugInfo],
+                log_list: List[Log], profile: Optional[Profile], session: Optional[Session]) -> Tuple[
+        Optional[Profile], Optional[Session]]:
+
+        """
+        Applies node executions to the flow in graph order. Returns current profile and session.
+        """
+
+        execution_number = 0
+        for position in sorted(executions):
+            execution = executions[position]
+
+            if execution.profile:
+                profile = execution.profile
+
+            if execution.session:
+                session = execution.session
+
+            if debug_info is not None:
+                for input_edges in execution.input_edges:
+                    debug_info.add_debug_edge_info(input_edges)
+
+                # If node had call that means it was running
+
+                if self.is_in_debug_mode(event) and execution.executed:
+                    execution_number += 1
+                    execution.debug_info.executionNumber = execution_number
+                    debug_info.add_node_info(execution.debug_info)
+
+            log_list += execution.logs
+
+        return profile, session
+
+    def _snapshot(self, positions: Set[int], event: Event, profile: Optional[Profile],
+                  session: Optional[Session]) -> Tuple[Event, Optional[Profile]]:
+
+        """
+        Gives nodes their own copies of event, profile and session, so they do not change the objects that are
+        saved when the flow returns.
+        """
+
+        event = event.copy(deep=True)
+        if isinstance(profile, Profile):
+            profile = profile.copy(deep=True)
+            profile.reset_changes()
+        if isinstance(session, Session):
+            session = session.copy(deep=True)
+
+        for position in positions:
+            node = self.graph[position]
+            if isinstance(node.object, ActionRunner):
+                node.object.event = event
+                node.object.profile = profile
+                node.object.session = session
+
+        return event, profile
+
+    async def _run_in_background(self, ready: List[int], waiting_for: List[int], downstream: List[List[int]],
+                                 payload, event: Event, profile: Optional[Profile], actions_results: ActionsResults,
+                                 flow_start_time):
+        positions = self._background
+        flow = next((self.graph[position].object.flow for position in positions
+                     if isinstance(self.graph[position].object, ActionRunner)), None)
+        try:
+            executions, _ = await self._schedule(ready, waiting_for, downstream, set(), payload, event,
+                                                 actions_results, flow_start_time)
+            log_list = []
+            profile, _ = self._commit(executions, event, None, log_list, profile, None)
+            await save_background_changes(flow.id if flow is not None else None, event.id, profile, log_list)
+        finally:
+            await self._close_nodes(positions)
+
+    async def run(self, payload, event: Event, profile: Profile, session: Session, debug_info: DebugInfo,
+                  log_list: List[Log]) -> Tuple[
+        DebugInfo, List[Log], Profile, Session]:
+
+        """
+        Runs the graph. A node is started as soon as all its upstream nodes have finished, so independent branches
+        run concurrently (up to self.concurrency nodes at once). If many nodes are ready the one that is first in
+        graph order is started first, so concurrency of 1 runs nodes one by one in graph order. When a node fails
+        no new nodes are started.
+
+        Debug information, logs and profile and session references are applied in graph order, so they do not
+        depend on the order in which the nodes finished.
+
+        Nodes marked to run in background and their downstream nodes are run after this method returns (except in
+        debug mode). They get copies of event, profile, session and their input, and their profile changes are saved
+        separately.
+        """
+
+        actions_results = ActionsResults()
+        flow_start_time = debug_info.timestamp
+
+        waiting_for, downstream = self._get_dependencies()
+        background = set() if self.is_in_debug_mode(event) else self._get_background_positions(downstream)
+        ready = [position for position, count in enumerate(waiting_for) if count == 0 and position not in background]
+
+        executions, failed = await self._schedule(ready, waiting_for, downstream, background, payload, event,
+                                                  actions_results, flow_start_time)
+        profile, session = self._commit(executions, event, debug_info, log_list, profile, session)
+
+        if background and not failed:
+            self._background = background
+            background_event, background_profile = self._snapshot(background, event, profile, session)
+            ready = [position for position in background if waiting_for[position] == 0]
+            args = (ready, waiting_for, downstream, payload, background_event, background_profile, actions_results,
+                    flow_start_time)
+            if not background_runner.submit(self._run_in_background, *args):
+                # Too many branches in background. Run it now.
+                await self._run_in_background(*args)
 
         return debug_info, log_list, profile, session
 
     def serialize(self):
         return self.dict()
 
+    def clone(self) -> 'GraphInvoker':
+        """
+        Returns a copy of the graph with fresh node state. Node configuration and edges are shared with
+        the original graph, so the clone must be initialized before it is run.
+        """
+        return GraphInvoker.construct(
+            graph=[node.copy(update={"object": None}) for node in self.graph],
+            start_nodes=self.start_nodes,
+            debug=self.debug,
+            concurrency=self.concurrency
+        )
+
     def get_node_by_id(self, node_id) -> Node:
         for node in self.graph:
             if node.id == node_id:
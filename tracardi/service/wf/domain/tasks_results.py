@@ -43,5 +43,13 @@ class ActionsResults:
         ts._results = self._results
         return ts
 
+    def release(self, edge_id):
+
+        """
+        Removes results of edge. Must be called when the downstream node of the edge has read the results.
+        """
+
+        self._results.pop(edge_id, None)
+
     def has_edge_value(self, edge_id) -> bool:
         return edge_id in self._results
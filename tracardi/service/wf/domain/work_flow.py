@@ -6,6 +6,8 @@ from tracardi.domain.payload.tracker_payload import TrackerPayload
 from .debug_info import DebugInfo, FlowDebugInfo
 from .flow import Flow
 from .flow_history import FlowHistory
+from .graph_invoker import GraphInvoker
+from ..service.compiled_flow_cache import compiled_flow_cache
 from ..utils.dag_error import DagGraphError
 from ..utils.dag_processor import DagProcessor
 from ..utils.flow_graph_converter import FlowGraphConverter
@@ -17,6 +19,36 @@ class WorkFlow:
         self.tracker_payload = tracker_payload
         self.flow_history = flow_history
 
+    @staticmethod
+    def compile(flow: Flow, debug=False) -> GraphInvoker:
+
+        """
+        Converts editor graph to execution graph.
+        """
+
+        converter = FlowGraphConverter(flow.flowGraph.dict())
+        dag_graph = converter.convert_to_dag_graph()
+        dag = DagProcessor(dag_graph)
+
+        try:
+            return dag.make_execution_dag(debug=debug)
+        except DagGraphError as e:
+            raise DagGraphError("Flow `{}` returned the following error: `{}`".format(flow.id, str(e)))
+
+    def get_execution_graph(self, flow: Flow, debug=False) -> GraphInvoker:
+
+        """
+        Returns execution graph with fresh node state. Production flows are compiled once per revision and
+        cloned on every invocation.
+        """
+
+        template = compiled_flow_cache.get(flow, debug)
+        if template is None:
+            template = self.compile(flow, debug)
+            compiled_flow_cache.set(flow, template, debug)
+
+        return template.clone()
+
     async def invoke(self, flow: Flow, event: Event, profile, session, ux: list, debug=False) -> FlowInvokeResult:
 
         """
@@ -34,14 +66,7 @@ class WorkFlow:
         if self.flow_history.is_acyclic(flow.id):
 
             # Convert Editor graph to exec graph
-            converter = FlowGraphConverter(flow.flowGraph.dict())
-            dag_graph = converter.convert_to_dag_graph()
-            dag = DagProcessor(dag_graph)
-
-            try:
-                exec_dag = dag.make_execution_dag(debug=debug)
-            except DagGraphError as e:
-                raise DagGraphError("Flow `{}` returned the following error: `{}`".format(flow.id, str(e)))
+            exec_dag = self.get_execution_graph(flow, debug=debug)
 
             flow_start_time = time()
             debug_info = DebugInfo(
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Set
+
+from tracardi.config import tracardi
+from tracardi.domain.console import Console
+from tracardi.domain.entity import Entity
+from tracardi.domain.profile import Profile
+from tracardi.exceptions.log_handler import log_handler
+from tracardi.service.plugin.domain.console import Log
+from tracardi.service.storage.driver import storage
+from tracardi.service.storage.elastic_client import on_close
+from tracardi.service.synchronizer import ProfileTracksSynchronizer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(tracardi.logging_level)
+logger.addHandler(log_handler)
+
+
+class BackgroundRunner:
+
+    """
+    Local pool of flow branches that run in background (nodes marked as run in background and their downstream
+    nodes). Up to concurrency branches run at once, others wait for their turn. If max_pending branches are already
+    running or waiting, submit returns False and the caller must run the branch itself.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._tasks = set()  # type: Set[asyncio.Task]
+        self._semaphore = None  # type: Optional[asyncio.Semaphore]
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Semaphore and tasks are bound to the event loop.
+            self._semaphore, self._tasks, self._loop = asyncio.Semaphore(self.concurrency), set(), loop
+        return self._semaphore
+
+    def submit(self, function: Callable[..., Awaitable], *args) -> bool:
+        semaphore = self._get_semaphore()
+        if len(self._tasks) >= self.max_pending:
+            logger.warning(f"Too many flow branches running in background ({len(self._tasks)}).")
+            return False
+
+        task = asyncio.create_task(self._run(semaphore, function, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    @staticmethod
+    async def _run(semaphore: asyncio.Semaphore, function: Callable[..., Awaitable], *args):
+        async with semaphore:
+            try:
+                await function(*args)
+            except Exception as e:
+                logger.error(f"Flow branch running in background failed. Details: {repr(e)}")
+
+    async def join(self):
+
+        """
+        Waits until all submitted branches are finished. It is called on shutdown.
+        """
+
+        if self._loop is not asyncio.get_running_loop():
+            # Tasks of the other loop can not be awaited.
+            return
+
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+background_runner = BackgroundRunner(
+    concurrency=tracardi.workflow_background_concurrency,
+    max_pending=tracardi.workflow_background_queue_size
+)
+# Branches save their profile changes before buffered documents are flushed.
+on_close(background_runner.join)
+
+
+async def _save_profile_changes(profile: Profile):
+    delta = profile.get_changes()
+    if not delta:
+        return
+
+    # Changes are applied to the current profile, so the changes saved meanwhile by other requests are not lost.
+    current_profile = await storage.driver.profile.load_merged_profile(profile.id)
+    if current_profile is not None:
+        profile = delta.apply(current_profile)
+
+    await storage.driver.profile.save(profile)
+
+
+async def save_background_changes(flow_id: Optional[str], event_id: Optional[str], profile: Optional[Profile],
+                                  log_list: List[Log]):
+
+    """
+    Saves profile changes and logs of flow branch that run in background. Branch works on its own copy of
+    profile, its changes are applied to the profile loaded from storage and saved again.
+    """
+
+    if isinstance(profile, Profile) and profile.has_changes():
+        if tracardi.sync_profile_tracks:
+            async with ProfileTracksSynchronizer(Entity(id=profile.id), wait=tracardi.sync_profile_tracks_wait,
+                                                 max_repeats=tracardi.sync_profile_tracks_max_repeats):
+                await _save_profile_changes(profile)
+        else:
+            await _save_profile_changes(profile)
+
+    if log_list:
+        await storage.driver.console_log.save_all([
+            Console(
+                origin="node",
+                event_id=event_id,
+                flow_id=flow_id,
+                profile_id=profile.id if isinstance(profile, Profile) else None,
+                module=log.module,
+                class_name=log.class_name,
+                type=log.type,
+                message=log.message,
+                traceback=log.traceback
+            ).encode_record() for log in log_list
+        ])
@@ -0,0 +1,56 @@
+from typing import Tuple, Optional
+
+from tracardi.config import memory_cache
+from tracardi.service.lru_cache import LRUCache
+from ..domain.flow import Flow
+
+
+class CompiledFlowCache:
+
+    """
+    Process local cache of compiled execution graphs (GraphInvoker templates). Graphs are keyed by flow id and
+    production revision, so a re-deployed flow is compiled again. Only flows with revision (production flows)
+    are cached.
+    """
+
+    def __init__(self, max_size: int):
+        self._cache = LRUCache(max_size)
+
+    @staticmethod
+    def _get_key(flow: Flow, debug: bool) -> Optional[Tuple[str, str, bool]]:
+        revision = flow.get_revision()
+        if revision is None:
+            return None
+        return flow.id, revision, debug
+
+    def get(self, flow: Flow, debug: bool = False):
+        key = self._get_key(flow, debug)
+        if key is None:
+            return None
+        return self._cache.get(key)
+
+    def set(self, flow: Flow, graph, debug: bool = False):
+        key = self._get_key(flow, debug)
+        if key is None:
+            return
+
+        # Remove graphs of previous revisions
+        for cached_key in self._cache:
+            if cached_key[0] == flow.id and cached_key[1] != key[1]:
+                del self._cache[cached_key]
+
+        self._cache[key] = graph
+
+    def invalidate(self, flow_id: str):
+        for key in self._cache:
+            if key[0] == flow_id:
+                del self._cache[key]
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+compiled_flow_cache = CompiledFlowCache(max_size=memory_cache.flow_cache_size)
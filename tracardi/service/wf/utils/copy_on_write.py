@@ -0,0 +1,227 @@
+from copy import deepcopy
+from datetime import date, datetime, time
+from decimal import Decimal
+
+_IMMUTABLE = (str, int, float, bool, bytes, Decimal, date, datetime, time, type(None))
+
+
+def copy_on_write(value):
+
+    """
+    Returns value that can be changed without changing the original value. Dicts and lists are not copied at once.
+    Their nested dicts and lists are copied (also as copy-on-write) when they are read for the first time, so the
+    data that is only passed through or read is not copied. Immutable values are returned as they are, other
+    objects are deep copied.
+    """
+
+    if isinstance(value, dict):
+        return CopyOnWriteDict(value)
+    if isinstance(value, list):
+        return CopyOnWriteList(list.__iter__(value))
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return deepcopy(value)
+
+
+class CopyOnWriteDict(dict):
+
+    """
+    Dict with shallow copy of the original dict. Nested values are shared with the original until they are read.
+    """
+
+    __slots__ = ('_owned',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._owned = set()
+
+    def _own(self, key, value):
+        if key in self._owned:
+            return value
+        value = copy_on_write(value)
+        dict.__setitem__(self, key, value)
+        self._owned.add(key)
+        return value
+
+    def __getitem__(self, key):
+        return self._own(key, dict.__getitem__(self, key))
+
+    # Dict with its own __iter__ is copied (dict(view), {**view}, f(**view)) with keys() and __getitem__,
+    # not with the fast path that reads shared values directly.
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._owned.add(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._owned.discard(key)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, *args, **kwargs):
+        if args:
+            other = args[0]
+            for key, value in (other.items() if hasattr(other, 'keys') else other):
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def clear(self):
+        dict.clear(self)
+        self._owned.clear()
+
+    def copy(self):
+        # Values of the copy are not owned, so they are copied when read.
+        return CopyOnWriteDict(self)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return {deepcopy(key, memo): deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+
+class CopyOnWriteList(list):
+
+    """
+    List with shallow copy of the original list. Nested values are shared with the original until they are read.
+    """
+
+    __slots__ = ('_owned',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._owned = [False] * len(self)
+
+    def _own(self, index, value):
+        if self._owned[index]:
+            return value
+        value = copy_on_write(value)
+        list.__setitem__(self, index, value)
+        self._owned[index] = True
+        return value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._own(index, list.__getitem__(self, index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._own_all()
+            list.__setitem__(self, index, value)
+            self._owned = [True] * len(self)
+            return
+        list.__setitem__(self, index, value)
+        self._owned[index] = True
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        del self._owned[index]
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def _own_all(self):
+        for index in range(len(self)):
+            self[index]
+
+    def append(self, value):
+        list.append(self, value)
+        self._owned.append(True)
+
+    def extend(self, values):
+        values = list(values)
+        list.extend(self, values)
+        self._owned += [True] * len(values)
+
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        self._owned.insert(index, True)
+
+    def pop(self, index=-1):
+        value = self[index]
+        list.pop(self, index)
+        self._owned.pop(index)
+        return value
+
+    def remove(self, value):
+        del self[self.index(value)]
+
+    def clear(self):
+        list.clear(self)
+        self._owned = []
+
+    def sort(self, *args, **kwargs):
+        self._own_all()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        list.reverse(self)
+        self._owned.reverse()
+
+    def __add__(self, other):
+        result = self.copy()
+        result.extend(other)
+        return result
+
+    def copy(self):
+        # Values of the copy are not owned, so they are copied when read.
+        return CopyOnWriteList(list.__iter__(self))
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
@@ -18,3 +18,9 @@ class DagExecError(ValueError):
         self.input = kwargs['input'] if 'input' in kwargs else None
         self.edge = kwargs['edge'] if 'edge' in kwargs else None
         self.traceback = kwargs['traceback'] if 'traceback' in kwargs else None
+
+
+class DagCycleError(DagGraphError):
+    def __init__(self, *args, path=None):
+        super().__init__(*args)
+        self.path = path if path is not None else []
@@ -1,5 +1,7 @@
 from collections import defaultdict
 
+from .dag_error import DagCycleError
+
 
 class DagGraphSorter:
 
@@ -10,21 +12,43 @@ class DagGraphSorter:
     def add_edge(self, u, v):
         self.graph[u].append(v)
 
-    def _topological_sort(self, v, visited, stack):
-        visited[v] = True
-
-        for i in self.graph[v]:
-            if not visited[i]:
-                self._topological_sort(i, visited, stack)
-
-        stack.insert(0, v)
-
     def topological_sort(self):
-        visited = {node: False for node in self.V}
-        stack = []
-
-        for i in self.V:
-            if not visited[i]:
-                self._topological_sort(i, visited, stack)
 
-        return stack
+        """
+        Returns nodes in topological order (reversed depth-first post-order). Graph is traversed iteratively, so
+        the depth of graph is not limited by recursion limit. Raises DagCycleError with the path of the cycle if
+        the graph is not acyclic.
+        """
+
+        visited = set()
+        order = []
+
+        for root in self.V:
+            if root in visited:
+                continue
+
+            visited.add(root)
+            path = [root]
+            on_path = {root}
+            stack = [iter(self.graph[root])]
+
+            while stack:
+                for child in stack[-1]:
+                    if child in on_path:
+                        cycle = path[path.index(child):] + [child]
+                        raise DagCycleError("Graph has a cycle: {}".format(" -> ".join(map(str, cycle))),
+                                            path=cycle)
+                    if child not in visited:
+                        visited.add(child)
+                        path.append(child)
+                        on_path.add(child)
+                        stack.append(iter(self.graph[child]))
+                        break
+                else:
+                    # All children visited
+                    stack.pop()
+                    on_path.discard(path[-1])
+                    order.append(path.pop())
+
+        order.reverse()
+        return order
@@ -1,6 +1,7 @@
-from typing import List, Union, Tuple
+from collections import defaultdict
+from typing import List, Union, Tuple, Dict
 
-from .dag_error import DagError, DagGraphError
+from .dag_error import DagError, DagGraphError, DagCycleError
 from ..domain.edge import Edge
 from ..domain.edges import Edges
 from ..domain.graph_invoker import GraphInvoker
@@ -21,15 +22,20 @@ class DagProcessor:
         self._edges.validate(self._nodes)
         self._last_nodes = set()
 
-    def _find_out_edges(self, node: Node) -> List[Tuple[str, Edge]]:
+        # Adjacency indexes
+        self._out_edges = defaultdict(list)  # type: Dict[str, List[Edge]]
+        self._in_edges = defaultdict(list)  # type: Dict[str, List[Edge]]
         for _, edge in self._edges.items():  # type: str, Edge
-            if node.id == edge.source.node_id:
-                yield edge.source.param, edge
+            self._out_edges[edge.source.node_id].append(edge)
+            self._in_edges[edge.target.node_id].append(edge)
+
+    def _find_out_edges(self, node: Node) -> List[Tuple[str, Edge]]:
+        for edge in self._out_edges.get(node.id, []):  # type: Edge
+            yield edge.source.param, edge
 
     def _find_in_edges(self, node) -> List[Tuple[str, Edge]]:
-        for _, edge in self._edges.items():  # type: str, Edge
-            if node.id == edge.target.node_id:
-                yield edge.target.param, edge
+        for edge in self._in_edges.get(node.id, []):  # type: Edge
+            yield edge.target.param, edge
 
     def _find_node(self, node_id) -> Node:
         return self._nodes[node_id] if node_id in self._nodes else None
@@ -40,8 +46,21 @@ class DagProcessor:
                 yield node
 
     def _forward_pass(self, start_node_ids):
-        for start_node_id in start_node_ids:
-            node = self._find_node(start_node_id)  # type: Node
+
+        """
+        Sets out edges of nodes reachable from start nodes and collects nodes without out edges (last nodes).
+        Every node is visited once.
+        """
+
+        visited = set()
+        stack = list(start_node_ids)
+        while stack:
+            node_id = stack.pop()
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+
+            node = self._find_node(node_id)  # type: Node
             if node:
 
                 # Get edges
@@ -53,23 +72,35 @@ class DagProcessor:
 
                             node.graph.out_edges.add(edge)
 
-                            self._forward_pass([edge.target.node_id])
+                            stack.append(edge.target.node_id)
                 else:
                     self._last_nodes.add(node.id)
             else:
-                self._last_nodes.add(start_node_id)
+                self._last_nodes.add(node_id)
 
         return self._last_nodes
 
     def _back_pass(self, last_node_ids):
-        for last_node_id in last_node_ids:
-            node = self._find_node(last_node_id)
+
+        """
+        Sets in edges of nodes that lead to last nodes. Every node is visited once.
+        """
+
+        visited = set()
+        stack = list(last_node_ids)
+        while stack:
+            node_id = stack.pop()
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+
+            node = self._find_node(node_id)
             if node:
                 for edge_end_port, edge in self._find_in_edges(node):  # type: str, Edge
 
                     node.graph.in_edges.add(edge)
 
-                    self._back_pass([edge.source.node_id])
+                    stack.append(edge.source.node_id)
 
     def make_execution_dag(self, debug=False) -> GraphInvoker:
         self._last_nodes = set()
@@ -86,12 +117,17 @@ class DagProcessor:
         self._back_pass(self._last_nodes)
 
         # Sort graph
-        nodes = set(self._nodes.keys())
+        nodes = list(self._nodes.keys())
         graph = DagGraphSorter(nodes)
         for _, edge in self._edges.items():  # type: Edge
             graph.add_edge(edge.source.node_id, edge.target.node_id)
 
-        sorted = graph.topological_sort()
+        try:
+            sorted = graph.topological_sort()
+        except DagCycleError as e:
+            path = " -> ".join("`{}`".format(self._nodes[node_id].name or node_id) for node_id in e.path)
+            raise DagCycleError("Workflow has a cycle: {}.".format(path), path=e.path)
+
         sorted_nodes = [self._nodes[s] for s in sorted if s in self._nodes]
 
         return GraphInvoker(graph=sorted_nodes, start_nodes=start_node_ids, debug=debug)